@@ -9,14 +9,22 @@ from datetime import datetime, timedelta
 import os
 import sys
 import json
-import csv
 import threading
 import time
 from database import db
+from cache_util import LRUCache
+from bill_dates import get_bill_timestamp, day_timestamp_range, format_bill_date
+from bill_export import BillExportWorker, iter_pages, EXPORT_PAGE_SIZE
+from tree_sync import sync_treeview
+from bill_settings import bill_settings
+from receipt_layout import get_receipt_template, ReceiptCanvasRenderer, SAMPLE_BILL_ITEMS
+from receipt_cache import get_receipt_cache
+from barcode_util import LABEL_STOCKS, DEFAULT_LABEL_STOCK
 from config import (
-    SHOP_NAME, SHOP_TAGLINE, SHOP_ADDRESS, DEFAULT_BILL_WIDTH_MM, DEFAULT_BILL_HEIGHT_MM, 
+    SHOP_NAME, DEFAULT_BILL_WIDTH_MM, DEFAULT_BILL_HEIGHT_MM, 
     DEFAULT_CHARACTER_WIDTH, PAPER_WIDTH_PRESETS, DEFAULT_ALIGNMENT, DEFAULT_MARGIN_TOP,
-    DEFAULT_MARGIN_BOTTOM, DEFAULT_MARGIN_LEFT, DEFAULT_MARGIN_RIGHT, COLUMN_WIDTH_OPTIONS_80MM
+    DEFAULT_MARGIN_BOTTOM, DEFAULT_MARGIN_LEFT, DEFAULT_MARGIN_RIGHT, COLUMN_WIDTH_OPTIONS_80MM,
+    DEFAULT_RECEIPT_PRINTER
 )
 
 class AdminPanel:
@@ -51,6 +59,8 @@ class AdminPanel:
         # Date range variables for custom date filter
         self.start_date_var = tk.StringVar(value="")
         self.end_date_var = tk.StringVar(value="")
+        # Filtered bill lists keyed by (filters, data version) - repeat queries and exports are free
+        self._filtered_bills_cache = LRUCache(maxsize=16)
         # Bill settings variables
         self.bill_width_var = tk.StringVar(value="80")
         self.bill_height_var = tk.StringVar(value="210")
@@ -61,6 +71,9 @@ class AdminPanel:
         self.margin_bottom_var = tk.StringVar(value="0")
         self.margin_left_var = tk.StringVar(value="0")
         self.margin_right_var = tk.StringVar(value="0")
+        self.printer_var = tk.StringVar(value="")
+        # Label stock barcodes are printed on
+        self.label_stock_var = tk.StringVar(value=DEFAULT_LABEL_STOCK)
         
         # Create UI
         self._create_header()
@@ -223,8 +236,8 @@ class AdminPanel:
         total_sales = sum(bill['total'] for bill in bills)
         total_bills = len(bills)
         
-        today = datetime.now().date()
-        today_bills = [b for b in bills if datetime.fromisoformat(b['date']).date() == today]
+        today_start, today_end = day_timestamp_range(datetime.now().date())
+        today_bills = [b for b in bills if today_start <= get_bill_timestamp(b) < today_end]
         today_sales = sum(b['total'] for b in today_bills)
         
         # Summary cards
@@ -307,11 +320,11 @@ class AdminPanel:
         bills_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
         
         # Load latest bills
-        latest_bills = sorted(bills, key=lambda x: x['date'], reverse=True)[:50]
+        latest_bills = sorted(bills, key=get_bill_timestamp, reverse=True)[:50]
         for index, bill in enumerate(latest_bills, start=1):
             staff_user = db.get_user(bill['user_id'])
             staff_name = staff_user['name'] if staff_user else 'Unknown'
-            date_str = datetime.fromisoformat(bill['date']).strftime("%Y-%m-%d %H:%M")
+            date_str = format_bill_date(bill)
             bill_id = bill.get('id', 'N/A')
             # Ensure bill ID is in DR0201 format
             if isinstance(bill_id, (int, float)):
@@ -533,7 +546,7 @@ class AdminPanel:
         bill_id_entry = tk.Entry(
             filter_frame,
             textvariable=self.bill_id_search_var,
-            width=12,
+            width=16,
             font=('Arial', 10)
         )
         bill_id_entry.pack(side=tk.LEFT, padx=5)
@@ -566,7 +579,7 @@ class AdminPanel:
             relief=tk.FLAT,
             padx=15,
             pady=6,
-            command=self._refresh_bills
+            command=lambda: self._refresh_bills(force=True)
         ).pack(side=tk.LEFT, padx=5)
         
         # Bills list
@@ -1418,13 +1431,7 @@ To use Firebase, see FIREBASE_SETUP.md
         # Populate bills
         for bill in db_data.get('bills', []):
             bill_id = bill.get('id', 'N/A')
-            date_str = bill.get('date', 'N/A')
-            if date_str != 'N/A':
-                try:
-                    date_obj = datetime.fromisoformat(date_str)
-                    date_str = date_obj.strftime("%Y-%m-%d %H:%M")
-                except:
-                    pass
+            date_str = format_bill_date(bill)
             
             # Get staff name
             user_id = bill.get('user_id')
@@ -1813,6 +1820,16 @@ For support, contact your administrator.
         button_frame = tk.Frame(title_frame, bg='#F5F5F5')
         button_frame.pack(side=tk.RIGHT)
         
+        # Label stock the selected barcodes are printed on
+        tk.Label(button_frame, text="Labels:", font=('Arial', 10), bg='#F5F5F5', fg='#2C3E50').pack(side=tk.LEFT)
+        ttk.Combobox(
+            button_frame,
+            textvariable=self.label_stock_var,
+            values=list(LABEL_STOCKS),
+            state='readonly',
+            width=34
+        ).pack(side=tk.LEFT, padx=5)
+        
         tk.Button(
             button_frame,
             text="🖨️ Print Selected",
@@ -1926,52 +1943,44 @@ For support, contact your administrator.
             messagebox.showerror("Error", f"Failed to load items: {str(e)}")
     
     def _print_selected_barcodes(self):
-        """Print selected barcodes"""
+        """Print selected barcodes as one label sheet (one SVG, or one ESC/POS job on a label roll)"""
         selection = self.barcode_tree.selection()
         if not selection:
             messagebox.showwarning("Warning", "Please select items to print")
             return
         
         try:
-            from barcode_util import generate_barcode, BARCODE_AVAILABLE
+            from barcode_util import get_barcode_dir, write_label_sheet_svg, render_label_escpos
             
-            if not BARCODE_AVAILABLE:
-                messagebox.showerror(
-                    "Barcode Library Missing",
-                    "The python-barcode library is not installed.\n\n"
-                    "Please install: pip install python-barcode"
-                )
+            stock = LABEL_STOCKS[self.label_stock_var.get()]
+            labels = self._get_selected_label_items(selection)
+            printer = bill_settings.get().get('printer')
+            
+            # One-column label rolls go straight to the ESC/POS printer as a single job
+            if printer and stock['roll'] and stock['columns'] == 1:
+                from print_spooler import get_print_spooler
+                get_print_spooler().submit_raw(printer, render_label_escpos(labels, stock), f"{len(labels)} barcode label(s)")
+                messagebox.showinfo("Success", f"Sent {len(labels)} barcode label(s) to the printer as one print job.")
                 return
             
-            # Generate barcodes for selected items
-            barcode_files = []
-            for item_id in selection:
-                values = self.barcode_tree.item(item_id)['values']
-                item_id_val = int(values[0])
-                item_name = values[1]
-                
-                # Generate barcode
-                barcode_file = generate_barcode(item_id_val, item_name)
-                if barcode_file:
-                    barcode_files.append(barcode_file)
+            sheet_path = write_label_sheet_svg(
+                labels,
+                os.path.join(get_barcode_dir(), f"labels_{datetime.now().strftime('%Y%m%d_%H%M%S')}.svg"),
+                stock
+            )
             
-            if barcode_files:
-                # Open SVG files for printing (user can print from browser)
+            # Open the sheet for printing (user can print from browser)
+            if sys.platform == 'win32':
+                os.startfile(sheet_path)
+            else:
                 import webbrowser
-                import platform
-                
-                if platform.system() == "Windows":
-                    for file in barcode_files:
-                        os.startfile(file)
-                else:
-                    for file in barcode_files:
-                        webbrowser.open(f"file://{os.path.abspath(file)}")
-                
-                messagebox.showinfo(
-                    "Success",
-                    f"Opened {len(barcode_files)} barcode(s) for printing.\n\n"
-                    "Print the SVG files from your browser or image viewer."
-                )
+                webbrowser.open(f"file://{os.path.abspath(sheet_path)}")
+            
+            messagebox.showinfo(
+                "Success",
+                f"Opened a sheet of {len(labels)} barcode label(s) for printing.\n\n"
+                "Print it from your browser at 100% scale with no margins."
+            )
         except Exception as e:
             messagebox.showerror("Error", f"Failed to print barcodes:\n\n{str(e)}")
     
@@ -1988,36 +1997,8 @@ For support, contact your administrator.
             if not save_dir:
                 return
             
-            from barcode_util import generate_barcode, BARCODE_AVAILABLE
-            
-            if not BARCODE_AVAILABLE:
-                messagebox.showerror(
-                    "Barcode Library Missing",
-                    "The python-barcode library is not installed.\n\n"
-                    "Please install: pip install python-barcode"
-                )
-                return
-            
-            saved_count = 0
-            for item_id in selection:
-                values = self.barcode_tree.item(item_id)['values']
-                item_id_val = int(values[0])
-                item_name = values[1]
-                
-                # Clean filename
-                safe_name = "".join(c for c in item_name if c.isalnum() or c in (' ', '-', '_')).strip()
-                safe_name = safe_name.replace(' ', '_')
-                filename = f"DROP_{safe_name}_{item_id_val}"
-                save_path = os.path.join(save_dir, filename)
-                
-                # Generate and save barcode
-                barcode_file = generate_barcode(item_id_val, item_name, save_path)
-                if barcode_file:
-                    saved_count += 1
-            
-            messagebox.showinfo(
-                "Success",
-                f"Saved {saved_count} barcode(s) to:\n{save_dir}"
+            self._run_barcode_batch(
+                self._get_selected_barcode_items(selection), save_dir, "Saving Barcodes", self._show_barcodes_saved
             )
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save barcodes:\n\n{str(e)}")
@@ -2030,46 +2011,99 @@ For support, contact your administrator.
             if not save_dir:
                 return
             
-            from barcode_util import generate_barcode, BARCODE_AVAILABLE
-            
-            if not BARCODE_AVAILABLE:
-                messagebox.showerror(
-                    "Barcode Library Missing",
-                    "The python-barcode library is not installed.\n\n"
-                    "Please install: pip install python-barcode"
-                )
-                return
-            
             # Get all items from database
-            items = db.get_all_inventory()
-            saved_count = 0
-            
-            for item in items:
-                item_id = item.get('id', 0)
-                item_name = item.get('name', 'Unknown')
-                
-                # Clean filename
-                safe_name = "".join(c for c in item_name if c.isalnum() or c in (' ', '-', '_')).strip()
-                safe_name = safe_name.replace(' ', '_')
-                filename = f"DROP_{safe_name}_{item_id}"
-                save_path = os.path.join(save_dir, filename)
-                
-                # Generate and save barcode
-                try:
-                    barcode_file = generate_barcode(item_id, item_name, save_path)
-                    if barcode_file:
-                        saved_count += 1
-                except Exception as e:
-                    print(f"Error saving barcode for {item_name}: {e}")
-                    continue
-            
-            messagebox.showinfo(
-                "Success",
-                f"Saved {saved_count} barcode(s) to:\n{save_dir}"
-            )
+            items = [(item.get('id', 0), item.get('name', 'Unknown')) for item in db.get_all_inventory()]
+            self._run_barcode_batch(items, save_dir, "Saving Barcodes", self._show_barcodes_saved)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save barcodes:\n\n{str(e)}")
     
+    def _get_selected_barcode_items(self, selection):
+        """Get (item ID, item name) pairs of the selected barcode rows"""
+        items = []
+        for row_id in selection:
+            values = self.barcode_tree.item(row_id)['values']
+            items.append((int(values[0]), str(values[1])))
+        return items
+    
+    def _get_selected_label_items(self, selection):
+        """Get (item ID, item name, price) of the selected barcode rows"""
+        labels = []
+        for row_id in selection:
+            values = self.barcode_tree.item(row_id)['values']
+            try:
+                price = float(str(values[4]).replace('₹', '').replace(',', ''))
+            except ValueError:
+                price = 0.0
+            labels.append((int(values[0]), str(values[1]), price))
+        return labels
+    
+    def _show_barcodes_saved(self, worker):
+        """Report the result of a barcode save batch"""
+        stats = worker.stats
+        save_dir = worker.save_dir
+        saved_count = stats['rendered'] + stats['skipped']
+        message = f"Saved {saved_count} barcode(s) to:\n{save_dir}"
+        if stats['skipped']:
+            message += f"\n\n{stats['skipped']} were already up to date."
+        if stats['failed']:
+            message += f"\n\n{len(stats['failed'])} failed (first error: {stats['failed'][0][1]})"
+        messagebox.showinfo("Success", message)
+    
+    def _run_barcode_batch(self, items, save_dir, title, on_done):
+        """Generate barcodes in the background with a progress dialog; on_done(worker) runs when finished"""
+        from barcode_util import BarcodeBatchWorker
+        
+        worker = BarcodeBatchWorker(items, save_dir)
+        worker.start()
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title(title)
+        dialog.geometry("420x170")
+        dialog.resizable(False, False)
+        dialog.configure(bg='#FFFFFF')
+        dialog.transient(self.root)
+        dialog.grab_set()
+        dialog.protocol("WM_DELETE_WINDOW", worker.cancel)
+        
+        main_frame = tk.Frame(dialog, bg='#FFFFFF', padx=20, pady=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        status_label = tk.Label(main_frame, text="Generating barcodes...", bg='#FFFFFF', fg='#2C3E50', font=('Arial', 10))
+        status_label.pack(anchor='w', pady=(0, 10))
+        
+        progress = ttk.Progressbar(main_frame, mode='determinate', maximum=max(worker.total, 1), length=380)
+        progress.pack(fill=tk.X, pady=(0, 15))
+        
+        tk.Button(
+            main_frame,
+            text="Cancel",
+            font=('Arial', 10),
+            bg='#E74C3C',
+            fg='#FFFFFF',
+            relief=tk.FLAT,
+            padx=20,
+            pady=5,
+            cursor='hand2',
+            command=worker.cancel
+        ).pack()
+        
+        def poll():
+            if not worker.done:
+                progress['value'] = worker.processed
+                status_label.config(text=f"Generated {worker.processed} of {worker.total} barcode(s)")
+                dialog.after(100, poll)
+                return
+            
+            dialog.destroy()
+            if worker.error:
+                messagebox.showerror("Error", f"Failed to generate barcodes:\n\n{str(worker.error)}")
+            elif worker.cancelled:
+                messagebox.showinfo("Cancelled", f"Cancelled after {worker.processed} barcode(s).")
+            else:
+                on_done(worker)
+        
+        poll()
+    
     def _show_bill(self):
         """Show bill customization interface with dimension settings and format preview"""
         self.current_view = 'bill'
@@ -2191,6 +2225,17 @@ For support, contact your administrator.
         alignment_combo.pack(side=tk.LEFT, padx=5)
         tk.Label(alignment_frame, text="(Left recommended)", bg='#F8F9FA', fg='#7F8C8D', font=('Arial', 9)).pack(side=tk.LEFT, padx=5)
         
+        # ESC/POS printer target (empty: print with the system print command)
+        printer_frame = tk.Frame(config_frame, bg='#F8F9FA')
+        printer_frame.pack(fill=tk.X, pady=8)
+        tk.Label(printer_frame, text="Receipt Printer:", bg='#F8F9FA', fg='#2C3E50', font=('Arial', 10), width=20, anchor='w').pack(side=tk.LEFT)
+        tk.Entry(printer_frame, textvariable=self.printer_var, font=('Arial', 10), width=28).pack(side=tk.LEFT, padx=5)
+        tk.Label(
+            printer_frame,
+            text="(e.g. tcp://192.168.1.50:9100, win32:Printer Name, COM3; empty: system print)",
+            bg='#F8F9FA', fg='#7F8C8D', font=('Arial', 9)
+        ).pack(side=tk.LEFT, padx=5)
+        
         # Separator
         tk.Frame(config_frame, bg='#D0D0D0', height=1).pack(fill=tk.X, pady=15)
         
@@ -2360,59 +2405,22 @@ For support, contact your administrator.
             preview_w = int(width_mm * 3.78)
             preview_h = min(int(height_mm * 3.78), 600)  # Limit height for display
             
-            # Create preview frame with calculated dimensions
-            preview_inner = tk.Frame(preview_scrollable, bg='#FFFFFF', width=preview_w, height=preview_h, relief=tk.SOLID, bd=2)
+            # Draw the sample bill with the receipt template and canvas renderer the bill preview uses
+            try:
+                margins = (int(self.margin_top_var.get()), int(self.margin_right_var.get()),
+                           int(self.margin_bottom_var.get()), int(self.margin_left_var.get()))
+            except ValueError:
+                margins = (DEFAULT_MARGIN_TOP, DEFAULT_MARGIN_RIGHT, DEFAULT_MARGIN_BOTTOM, DEFAULT_MARGIN_LEFT)
+            preview_inner = tk.Canvas(preview_scrollable, bg='#FFFFFF', width=preview_w, height=preview_h,
+                                      relief=tk.SOLID, bd=2, highlightthickness=0)
             preview_inner.pack(padx=20, pady=20)
-            preview_inner.pack_propagate(False)
-            
-            # Draw bill preview
-            header_frame = tk.Frame(preview_inner, bg='#FFFFFF')
-            header_frame.pack(fill=tk.X, padx=10, pady=(10, 5))
-            
-            tk.Label(header_frame, text=SHOP_NAME, font=('Arial', 14, 'bold'), bg='#FFFFFF', fg='#000000').pack()
-            tk.Label(header_frame, text=SHOP_TAGLINE, font=('Arial', 8, 'italic'), bg='#FFFFFF', fg='#000000').pack()
-            tk.Label(header_frame, text=SHOP_ADDRESS[:char_width-5], font=('Arial', 7), bg='#FFFFFF', fg='#000000', wraplength=char_width*6).pack(pady=(2, 5))
-            
-            tk.Frame(preview_inner, bg='#000000', height=1).pack(fill=tk.X, padx=10, pady=5)
-            
-            info_frame = tk.Frame(preview_inner, bg='#FFFFFF')
-            info_frame.pack(fill=tk.X, padx=10, pady=2)
-            tk.Label(info_frame, text="DATE: 2025-01-15", font=('Arial', 8), bg='#FFFFFF', anchor='w').pack(side=tk.LEFT, fill=tk.X, expand=True)
-            tk.Label(info_frame, text="BILL NO: DR0001", font=('Arial', 8), bg='#FFFFFF', anchor='e').pack(side=tk.RIGHT)
-            
-            tk.Frame(preview_inner, bg='#000000', height=1).pack(fill=tk.X, padx=10, pady=5)
-            
-            # Table
-            table_frame = tk.Frame(preview_inner, bg='#FFFFFF')
-            table_frame.pack(fill=tk.X, padx=10, pady=5)
-            
-            header_row = tk.Frame(table_frame, bg='#FFFFFF')
-            header_row.pack(fill=tk.X)
-            tk.Label(header_row, text="PRODUCT", font=('Arial', 8, 'bold'), bg='#FFFFFF', anchor='w', width=20).pack(side=tk.LEFT)
-            tk.Label(header_row, text="QTY", font=('Arial', 8, 'bold'), bg='#FFFFFF', anchor='center', width=5).pack(side=tk.LEFT)
-            tk.Label(header_row, text="PRICE", font=('Arial', 8, 'bold'), bg='#FFFFFF', anchor='center', width=8).pack(side=tk.LEFT)
-            tk.Label(header_row, text="TOTAL", font=('Arial', 8, 'bold'), bg='#FFFFFF', anchor='center', width=8).pack(side=tk.LEFT)
-            
-            tk.Frame(preview_inner, bg='#000000', height=1).pack(fill=tk.X, padx=10, pady=2)
-            
-            # Sample items
-            for item in [("Test Item 1", 2, 25.00, 50.00), ("Test Item 2", 1, 40.00, 40.00)]:
-                item_row = tk.Frame(table_frame, bg='#FFFFFF')
-                item_row.pack(fill=tk.X)
-                tk.Label(item_row, text=item[0][:18], font=('Arial', 7), bg='#FFFFFF', anchor='w', width=20).pack(side=tk.LEFT)
-                tk.Label(item_row, text=str(item[1]), font=('Arial', 7), bg='#FFFFFF', anchor='center', width=5).pack(side=tk.LEFT)
-                tk.Label(item_row, text=f"₹{item[2]:.2f}", font=('Arial', 7), bg='#FFFFFF', anchor='center', width=8).pack(side=tk.LEFT)
-                tk.Label(item_row, text=f"₹{item[3]:.2f}", font=('Arial', 7), bg='#FFFFFF', anchor='center', width=8).pack(side=tk.LEFT)
-            
-            tk.Frame(preview_inner, bg='#000000', height=1).pack(fill=tk.X, padx=10, pady=5)
-            
-            total_frame = tk.Frame(preview_inner, bg='#FFFFFF')
-            total_frame.pack(fill=tk.X, padx=10, pady=5)
-            tk.Label(total_frame, text="TOTAL:", font=('Arial', 9, 'bold'), bg='#FFFFFF', anchor='e').pack(side=tk.LEFT, fill=tk.X, expand=True)
-            tk.Label(total_frame, text="₹90.00", font=('Arial', 9, 'bold'), bg='#FFFFFF', anchor='e').pack(side=tk.RIGHT)
-            
-            tk.Label(preview_inner, text="Payment: Cash", font=('Arial', 8), bg='#FFFFFF').pack(pady=5)
-            tk.Label(preview_inner, text="Thank you!", font=('Arial', 7), bg='#FFFFFF').pack(pady=2)
+            sample_total = sum(item['total'] for item in SAMPLE_BILL_ITEMS)
+            ReceiptCanvasRenderer(preview_inner).render(
+                get_receipt_template(char_width).layout('DR0001', SAMPLE_BILL_ITEMS, sample_total, 'Cash'),
+                char_width,
+                self.alignment_var.get(),
+                margins
+            )
             
             # Dimensions label
             dim_label = tk.Label(
@@ -2433,57 +2441,27 @@ For support, contact your administrator.
         update_preview()
     
     def _load_bill_settings(self):
-        """Load bill settings from file"""
-        import json
-        settings_file = os.path.join('data', 'bill_settings.json')
-        
-        try:
-            if os.path.exists(settings_file):
-                with open(settings_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
-                    self.bill_width_var.set(str(settings.get('width_mm', DEFAULT_BILL_WIDTH_MM)))
-                    self.bill_height_var.set(str(settings.get('height_mm', DEFAULT_BILL_HEIGHT_MM)))
-                    self.bill_char_width_var.set(str(settings.get('char_width', DEFAULT_CHARACTER_WIDTH)))
-                    
-                    # Load new settings with defaults
-                    paper_preset = settings.get('paper_width_preset', '80mm')
-                    if paper_preset in PAPER_WIDTH_PRESETS:
-                        self.paper_width_preset_var.set(paper_preset)
-                    else:
-                        self.paper_width_preset_var.set('80mm')
-                    
-                    self.alignment_var.set(settings.get('alignment', DEFAULT_ALIGNMENT))
-                    self.margin_top_var.set(str(settings.get('margin_top', DEFAULT_MARGIN_TOP)))
-                    self.margin_bottom_var.set(str(settings.get('margin_bottom', DEFAULT_MARGIN_BOTTOM)))
-                    self.margin_left_var.set(str(settings.get('margin_left', DEFAULT_MARGIN_LEFT)))
-                    self.margin_right_var.set(str(settings.get('margin_right', DEFAULT_MARGIN_RIGHT)))
-            else:
-                # Use defaults
-                self.bill_width_var.set(str(DEFAULT_BILL_WIDTH_MM))
-                self.bill_height_var.set(str(DEFAULT_BILL_HEIGHT_MM))
-                self.bill_char_width_var.set(str(DEFAULT_CHARACTER_WIDTH))
-                self.paper_width_preset_var.set('80mm')
-                self.alignment_var.set(DEFAULT_ALIGNMENT)
-                self.margin_top_var.set(str(DEFAULT_MARGIN_TOP))
-                self.margin_bottom_var.set(str(DEFAULT_MARGIN_BOTTOM))
-                self.margin_left_var.set(str(DEFAULT_MARGIN_LEFT))
-                self.margin_right_var.set(str(DEFAULT_MARGIN_RIGHT))
-        except Exception:
-            # Use defaults on error
-            self.bill_width_var.set(str(DEFAULT_BILL_WIDTH_MM))
-            self.bill_height_var.set(str(DEFAULT_BILL_HEIGHT_MM))
-            self.bill_char_width_var.set(str(DEFAULT_CHARACTER_WIDTH))
+        """Load bill settings from the settings service"""
+        settings = bill_settings.get()
+        self.bill_width_var.set(str(settings['width_mm']))
+        self.bill_height_var.set(str(settings['height_mm']))
+        self.bill_char_width_var.set(str(settings['char_width']))
+        
+        paper_preset = settings['paper_width_preset']
+        if paper_preset in PAPER_WIDTH_PRESETS:
+            self.paper_width_preset_var.set(paper_preset)
+        else:
             self.paper_width_preset_var.set('80mm')
-            self.alignment_var.set(DEFAULT_ALIGNMENT)
-            self.margin_top_var.set(str(DEFAULT_MARGIN_TOP))
-            self.margin_bottom_var.set(str(DEFAULT_MARGIN_BOTTOM))
-            self.margin_left_var.set(str(DEFAULT_MARGIN_LEFT))
-            self.margin_right_var.set(str(DEFAULT_MARGIN_RIGHT))
+        
+        self.alignment_var.set(settings['alignment'])
+        self.margin_top_var.set(str(settings['margin_top']))
+        self.margin_bottom_var.set(str(settings['margin_bottom']))
+        self.margin_left_var.set(str(settings['margin_left']))
+        self.margin_right_var.set(str(settings['margin_right']))
+        self.printer_var.set(settings.get('printer') or '')
     
     def _save_bill_settings(self):
         """Save bill settings to file"""
-        import json
-        
         try:
             width_mm = int(self.bill_width_var.get())
             height_mm = int(self.bill_height_var.get())
@@ -2518,13 +2496,11 @@ For support, contact your administrator.
                 'margin_top': margin_top,
                 'margin_bottom': margin_bottom,
                 'margin_left': margin_left,
-                'margin_right': margin_right
+                'margin_right': margin_right,
+                'printer': self.printer_var.get().strip()
             }
             
-            os.makedirs('data', exist_ok=True)
-            settings_file = os.path.join('data', 'bill_settings.json')
-            with open(settings_file, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, indent=2)
+            bill_settings.save(settings)
             
             messagebox.showinfo("Success", "Bill settings saved successfully!")
         except ValueError:
@@ -2543,11 +2519,11 @@ For support, contact your administrator.
         self.margin_bottom_var.set(str(DEFAULT_MARGIN_BOTTOM))
         self.margin_left_var.set(str(DEFAULT_MARGIN_LEFT))
         self.margin_right_var.set(str(DEFAULT_MARGIN_RIGHT))
+        self.printer_var.set(DEFAULT_RECEIPT_PRINTER)
         messagebox.showinfo("Success", "Bill settings reset to defaults")
     
     def _test_print_bill(self):
         """Generate a test bill preview with current settings"""
-        import json
         from bill_preview import BillPreview
         
         try:
@@ -2576,7 +2552,7 @@ For support, contact your administrator.
                 messagebox.showerror("Error", "Margins must be non-negative values")
                 return
             
-            # Temporarily save current settings to file (so BillPreview can use them)
+            # Save current settings (so BillPreview can use them)
             settings = {
                 'width_mm': width_mm,
                 'height_mm': height_mm,
@@ -2586,35 +2562,14 @@ For support, contact your administrator.
                 'margin_top': margin_top,
                 'margin_bottom': margin_bottom,
                 'margin_left': margin_left,
-                'margin_right': margin_right
+                'margin_right': margin_right,
+                'printer': self.printer_var.get().strip()
             }
             
-            os.makedirs('data', exist_ok=True)
-            settings_file = os.path.join('data', 'bill_settings.json')
-            with open(settings_file, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, indent=2)
-            
-            # Create sample bill items for test
-            test_bill_items = [
-                {
-                    'name': 'Test Item 1',
-                    'quantity': 2,
-                    'price': 25.00,
-                    'total': 50.00
-                },
-                {
-                    'name': 'Test Item 2',
-                    'quantity': 1,
-                    'price': 40.00,
-                    'total': 40.00
-                },
-                {
-                    'name': 'Sample Product Name',
-                    'quantity': 3,
-                    'price': 15.50,
-                    'total': 46.50
-                }
-            ]
+            bill_settings.save(settings)
+            
+            # Sample bill items for test
+            test_bill_items = SAMPLE_BILL_ITEMS
             
             test_total = sum(item['total'] for item in test_bill_items)
             test_payment_method = 'Cash'
@@ -2713,15 +2668,13 @@ For support, contact your administrator.
         self._refresh_products()
     
     def _refresh_products(self):
-        """Refresh products list with monthly sales"""
-        for item in self.products_tree.get_children():
-            self.products_tree.delete(item)
-        
+        """Refresh products list with monthly sales (only changed rows are updated)"""
         inventory = db.get_all_inventory()
         filter_value = self.product_date_filter.get()
         
         current_month = datetime.now().strftime('%Y-%m')
         
+        rows = []
         for item in inventory:
             if filter_value == "Current Month":
                 sales_qty = db.get_item_monthly_sales(item['id'], current_month)
@@ -2739,28 +2692,24 @@ For support, contact your administrator.
             else:  # Current Month (default)
                 sales_qty = db.get_item_monthly_sales(item['id'], current_month)
             
-            self.products_tree.insert('', 'end', values=(
+            rows.append((item['id'], (
                 item['id'],
                 item['name'],
                 item['category'],
                 f"₹{item['price']:.2f}",
                 sales_qty
-            ))
+            )))
+        
+        sync_treeview(self.products_tree, rows)
     
     # Staff Management Methods
     def _refresh_staff(self):
-        """Refresh staff list"""
-        for item in self.staff_tree.get_children():
-            self.staff_tree.delete(item)
-        
+        """Refresh staff list (only changed rows are updated)"""
         staff = db.get_all_users(role='staff')
-        for user in staff:
-            self.staff_tree.insert('', 'end', values=(
-                user['id'],
-                user['username'],
-                user['name'],
-                user['role']
-            ))
+        sync_treeview(self.staff_tree, [
+            (user['id'], (user['id'], user['username'], user['name'], user['role']))
+            for user in staff
+        ])
     
     def _add_staff_member(self):
         """Add new staff member"""
@@ -2829,8 +2778,13 @@ For support, contact your administrator.
             messagebox.showinfo("Success", "Staff member deleted successfully")
     
     # Bills Management Methods
-    def _refresh_bills(self):
-        """Refresh bills list with filters"""
+    def _refresh_bills(self, force=False):
+        """Refresh bills list with filters (force=True reloads instead of using cached results)"""
+        if force:
+            # Pick up bills saved by other tills before searching
+            db.refresh_bill_index()
+            self._filtered_bills_cache.clear()
+        
         for item in self.bills_tree.get_children():
             self.bills_tree.delete(item)
         
@@ -2840,7 +2794,7 @@ For support, contact your administrator.
         for index, bill in enumerate(sorted_bills, start=1):
             staff_user = db.get_user(bill['user_id'])
             staff_name = staff_user['name'] if staff_user else 'Unknown'
-            date_str = datetime.fromisoformat(bill['date']).strftime("%Y-%m-%d %H:%M")
+            date_str = format_bill_date(bill)
             bill_id = bill.get('id', 'N/A')
             # Ensure bill ID is in DR0201 format
             if isinstance(bill_id, (int, float)):
@@ -2871,125 +2825,114 @@ For support, contact your administrator.
             ))
     
     def _get_filtered_bills(self):
-        """Get filtered bills based on current filter settings"""
-        bills = db.get_all_bills()
-        date_filter = self.date_filter_var.get()
-        item_filter = self.item_filter_var.get()
+        """Get filtered bills based on current filter settings (cached per filters and data version)"""
+        cache_key = (
+            self.date_filter_var.get(),
+            self.item_filter_var.get(),
+            self.bill_id_search_var.get().strip().upper(),
+            self.start_date_var.get(),
+            self.end_date_var.get(),
+            datetime.now().date(),  # Today/This Week/This Month change with the date
+            db.data_version
+        )
+        sorted_bills = self._filtered_bills_cache.get(cache_key)
+        if sorted_bills is None:
+            sorted_bills = self._filter_bills()
+            self._filtered_bills_cache.put(cache_key, sorted_bills)
+        return sorted_bills
+    
+    def _filter_bills(self):
+        """Apply current filter settings to bills (newest first)"""
         bill_id_search = self.bill_id_search_var.get().strip()
         
         # Apply Bill ID search filter (applied first for performance)
+        # Uses the bill ID index: exact (DR0201), prefix (DR02), number (201) or range (DR0100-DR0200)
         if bill_id_search:
-            search_id_lower = bill_id_search.upper().strip()
-            filtered_bills = []
-            for bill in bills:
-                bill_id = bill.get('id', '')
-                # Ensure bill_id is in DR0201 format for comparison
-                if isinstance(bill_id, (int, float)):
-                    bill_id_str = f"DR{str(int(bill_id)).zfill(4)}"
-                else:
-                    bill_id_str = str(bill_id).upper()
-                
-                # Check if search matches (supports both DR0201 and numeric input)
-                if search_id_lower in bill_id_str:
-                    filtered_bills.append(bill)
-                else:
-                    # Try numeric search (e.g., search "201" matches "DR0201")
-                    try:
-                        if search_id_lower.isdigit():
-                            # Extract number from DR format
-                            bill_num = int(bill_id_str.replace('DR', '').strip()) if 'DR' in bill_id_str else 0
-                            search_num = int(search_id_lower)
-                            if bill_num == search_num:
-                                filtered_bills.append(bill)
-                    except (ValueError, TypeError):
-                        continue
-            bills = filtered_bills
-        
-        # Apply date filter
+            bills = db.search_bills(bill_id_search)
+        else:
+            bills = db.get_all_bills()
+        
+        # Apply date and item filters
+        bill_filter = self._get_bill_filter()
+        if bill_filter:
+            bills = [b for b in bills if bill_filter(b)]
+        
+        # Sort bills by date (newest first) for consistent numbering
+        sorted_bills = sorted(bills, key=get_bill_timestamp, reverse=True)
+        return sorted_bills
+    
+    def _get_bill_filter(self):
+        """Build a bill predicate from the current date and item filters (None if nothing is filtered)"""
+        date_filter = self.date_filter_var.get()
+        item_filter = self.item_filter_var.get()
+        checks = []
+        
+        # Date filter compares pre-parsed epoch timestamps, no date parsing per bill
         if date_filter != "All":
-            now = datetime.now()
-            filtered_bills = []
-            for bill in bills:
-                bill_date = datetime.fromisoformat(bill['date'])
-                bill_date_only = bill_date.date()
-                
-                if date_filter == "Today":
-                    if bill_date_only == now.date():
-                        filtered_bills.append(bill)
-                elif date_filter == "This Week":
-                    days_diff = (now.date() - bill_date_only).days
-                    if 0 <= days_diff <= 7:
-                        filtered_bills.append(bill)
-                elif date_filter == "This Month":
-                    if bill_date.year == now.year and bill_date.month == now.month:
-                        filtered_bills.append(bill)
-                elif date_filter == "Custom Range":
-                    start_date_str = self.start_date_var.get()
-                    end_date_str = self.end_date_var.get()
-                    
-                    if start_date_str or end_date_str:
-                        try:
-                            if start_date_str:
-                                start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
-                            else:
-                                start_date = None
-                            
-                            if end_date_str:
-                                end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
-                            else:
-                                end_date = None
-                            
-                            # Check if bill date falls within range
-                            if start_date and end_date:
-                                if start_date <= bill_date_only <= end_date:
-                                    filtered_bills.append(bill)
-                            elif start_date:
-                                if bill_date_only >= start_date:
-                                    filtered_bills.append(bill)
-                            elif end_date:
-                                if bill_date_only <= end_date:
-                                    filtered_bills.append(bill)
-                        except ValueError:
-                            pass  # Invalid date format, skip this filter
-            bills = filtered_bills
-        
-        # Apply item filter
+            date_range = self._get_date_filter_range(date_filter)
+            if not date_range:
+                return lambda bill: False
+            range_start, range_end = date_range
+            checks.append(lambda bill: range_start <= get_bill_timestamp(bill) < range_end)
+        
         if item_filter != "All Items":
-            filtered_bills = []
             # Find item ID
             item_id = None
             for item in db.get_all_inventory():
                 if item['name'] == item_filter:
                     item_id = item['id']
                     break
-            
-            if item_id:
-                for bill in bills:
-                    # Check if bill contains this item
-                    for bill_item in bill['items']:
-                        if bill_item.get('inventory_id') == item_id:
-                            filtered_bills.append(bill)
-                            break
-            bills = filtered_bills
-        
-        # Sort bills by date (newest first) for consistent numbering
-        sorted_bills = sorted(bills, key=lambda x: x['date'], reverse=True)
-        return sorted_bills
+            if not item_id:
+                return lambda bill: False
+            # Check if bill contains this item
+            checks.append(lambda bill: any(i.get('inventory_id') == item_id for i in bill['items']))
+        
+        if not checks:
+            return None
+        if len(checks) == 1:
+            return checks[0]
+        return lambda bill: all(check(bill) for check in checks)
+    
+    def _get_date_filter_range(self, date_filter):
+        """Get [start, end) epoch milliseconds for a date filter (None if the filter matches no bills)"""
+        today = datetime.now().date()
+        if date_filter == "Today":
+            return day_timestamp_range(today)
+        if date_filter == "This Week":
+            return day_timestamp_range(today - timedelta(days=7), today)
+        if date_filter == "This Month":
+            month_start = today.replace(day=1)
+            month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            return day_timestamp_range(month_start, month_end)
+        if date_filter == "Custom Range":
+            start_date_str = self.start_date_var.get()
+            end_date_str = self.end_date_var.get()
+            if not (start_date_str or end_date_str):
+                return None
+            try:
+                range_start = float('-inf')
+                range_end = float('inf')
+                if start_date_str:
+                    range_start = day_timestamp_range(datetime.strptime(start_date_str, "%Y-%m-%d").date())[0]
+                if end_date_str:
+                    range_end = day_timestamp_range(datetime.strptime(end_date_str, "%Y-%m-%d").date())[1]
+                return range_start, range_end
+            except ValueError:
+                return None  # Invalid date format
+        return None
     
     def _export_filtered_bills(self):
-        """Export filtered bills data to CSV file"""
+        """Export filtered bills to CSV or compressed JSON Lines on a background thread"""
         try:
-            # Get filtered bills
-            filtered_bills = self._get_filtered_bills()
-            
-            if not filtered_bills:
-                messagebox.showinfo("No Data", "No bills match the current filters. Nothing to export.")
+            # Filters are applied while exporting (the bills list only shows its first page)
+            if not db.count_bills():
+                messagebox.showinfo("No Data", "There are no bills to export.")
                 return
             
             # Ask user for save location
             filename = filedialog.asksaveasfilename(
                 defaultextension=".csv",
-                filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+                filetypes=[("CSV files", "*.csv"), ("Compressed JSON Lines", "*.jsonl.gz"), ("All files", "*.*")],
                 title="Export Filtered Bills Data",
                 initialfile=f"bills_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
             )
@@ -2997,69 +2940,85 @@ For support, contact your administrator.
             if not filename:
                 return  # User cancelled
             
-            # Write to CSV
-            with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                
-                # Write header
-                writer.writerow([
-                    'No', 'Bill ID', 'Date', 'Time', 'Staff Member', 
-                    'Items', 'Item Details', 'Total (₹)', 'Payment Method'
-                ])
-                
-                # Write bill data
-                for index, bill in enumerate(filtered_bills, start=1):
-                    staff_user = db.get_user(bill['user_id'])
-                    staff_name = staff_user['name'] if staff_user else 'Unknown'
-                    
-                    bill_date = datetime.fromisoformat(bill['date'])
-                    date_str = bill_date.strftime("%Y-%m-%d")
-                    time_str = bill_date.strftime("%H:%M:%S")
-                    
-                    bill_id = bill.get('id', 'N/A')
-                    # Ensure bill ID is in DR0201 format
-                    if isinstance(bill_id, (int, float)):
-                        bill_id = f"DR{str(int(bill_id)).zfill(4)}"
-                    
-                    # Format items list
-                    items_list = []
-                    items_details = []
-                    for item in bill.get('items', []):
-                        item_name = item.get('name', 'Unknown')
-                        item_qty = item.get('quantity', 1)
-                        item_price = item.get('price', 0)
-                        item_total = item.get('total', 0)
-                        
-                        if item_qty > 1:
-                            items_list.append(f"{item_name} (x{item_qty})")
-                        else:
-                            items_list.append(item_name)
-                        
-                        items_details.append(f"{item_name}: Qty={item_qty}, Price=₹{item_price:.2f}, Total=₹{item_total:.2f}")
-                    
-                    items_display = ", ".join(items_list)
-                    items_details_str = " | ".join(items_details)
-                    
-                    writer.writerow([
-                        index,
-                        bill_id,
-                        date_str,
-                        time_str,
-                        staff_name,
-                        items_display,
-                        items_details_str,
-                        f"{bill['total']:.2f}",
-                        bill['payment_method']
-                    ])
+            # Read filter values here - the pages are consumed on the export thread
+            bill_id_search = self.bill_id_search_var.get().strip()
+            if bill_id_search:
+                # ID search results come from the index and are small
+                bills = sorted(db.search_bills(bill_id_search), key=get_bill_timestamp, reverse=True)
+                pages, total = iter_pages(bills), len(bills)
+            else:
+                # Stream every bill from storage, page by page
+                pages, total = db.iter_bill_pages(EXPORT_PAGE_SIZE), db.count_bills()
             
-            messagebox.showinfo(
-                "Export Successful",
-                f"Successfully exported {len(filtered_bills)} bill(s) to:\n{filename}"
-            )
+            # Resolve staff names once instead of per row
+            staff_names = {user['id']: user.get('name', 'Unknown') for user in db.get_all_users()}
+            
+            worker = BillExportWorker(pages, filename, self._get_bill_filter(), staff_names)
+            worker.start()
+            self._show_export_progress(worker, total)
             
         except Exception as e:
             messagebox.showerror("Export Error", f"Failed to export bills: {str(e)}")
     
+    def _show_export_progress(self, worker, total):
+        """Show export progress with a cancel button until the worker finishes"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Exporting Bills")
+        dialog.geometry("420x170")
+        dialog.resizable(False, False)
+        dialog.configure(bg='#FFFFFF')
+        dialog.transient(self.root)
+        dialog.grab_set()
+        dialog.protocol("WM_DELETE_WINDOW", worker.cancel)
+        
+        main_frame = tk.Frame(dialog, bg='#FFFFFF', padx=20, pady=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        status_label = tk.Label(main_frame, text="Exporting...", bg='#FFFFFF', fg='#2C3E50', font=('Arial', 10))
+        status_label.pack(anchor='w', pady=(0, 10))
+        
+        progress = ttk.Progressbar(main_frame, mode='determinate', maximum=max(total, 1), length=380)
+        progress.pack(fill=tk.X, pady=(0, 15))
+        
+        tk.Button(
+            main_frame,
+            text="Cancel",
+            font=('Arial', 10),
+            bg='#E74C3C',
+            fg='#FFFFFF',
+            relief=tk.FLAT,
+            padx=20,
+            pady=5,
+            cursor='hand2',
+            command=worker.cancel
+        ).pack()
+        
+        def poll():
+            if not worker.done:
+                progress['value'] = worker.scanned
+                status_label.config(text=f"Exported {worker.exported} bill(s) - scanned {worker.scanned} of {total}")
+                dialog.after(100, poll)
+                return
+            
+            dialog.destroy()
+            if worker.error:
+                messagebox.showerror("Export Error", f"Failed to export bills: {str(worker.error)}")
+            elif worker.cancelled:
+                messagebox.showinfo("Export Cancelled", "Export was cancelled. No file was saved.")
+            elif worker.exported == 0:
+                try:
+                    os.remove(worker.filename)
+                except OSError:
+                    pass
+                messagebox.showinfo("No Data", "No bills match the current filters. Nothing to export.")
+            else:
+                messagebox.showinfo(
+                    "Export Successful",
+                    f"Successfully exported {worker.exported} bill(s) to:\n{worker.filename}"
+                )
+        
+        poll()
+    
     def _view_bill_details(self):
         """View details of selected bill"""
         selection = self.bills_tree.selection()
@@ -3138,7 +3097,7 @@ For support, contact your administrator.
         tk.Label(main_frame, text=f"Bill #{display_bill_id}", font=('Arial', 18, 'bold'), bg='#FFFFFF', fg='#2C3E50').pack(pady=10)
         
         staff_user = db.get_user(bill['user_id'])
-        date_str = datetime.fromisoformat(bill['date']).strftime("%Y-%m-%d %H:%M:%S")
+        date_str = format_bill_date(bill, seconds=True)
         
         info_text = f"Date: {date_str}\nStaff: {staff_user['name'] if staff_user else 'Unknown'}\nPayment: {bill['payment_method']}"
         tk.Label(main_frame, text=info_text, bg='#FFFFFF', fg='#2C3E50', justify=tk.LEFT).pack(pady=10)
@@ -3157,6 +3116,14 @@ For support, contact your administrator.
         
         tk.Label(total_frame, text=f"Total: ₹{bill['total']:.2f}", font=('Arial', 16, 'bold'), bg='#FFFFFF', fg='#3498DB').pack()
         
+        def print_receipt():
+            from receipt_generator import reprint_receipt
+            if reprint_receipt(bill['id']) is not None:
+                print_btn.config(text="Queued for printing")
+        
+        print_btn = tk.Button(main_frame, text="Print Receipt", command=print_receipt, bg='#27AE60', fg='#FFFFFF', padx=20, pady=5)
+        print_btn.pack(pady=(10, 0))
+        
         tk.Button(main_frame, text="Close", command=details_window.destroy, bg='#3498DB', fg='#FFFFFF', padx=20, pady=5).pack(pady=10)
     
     def _delete_bill(self):
@@ -3235,6 +3202,7 @@ For support, contact your administrator.
             
             # Delete the bill
             db.delete_bill(bill_to_delete.get('id'))
+            get_receipt_cache().discard(bill_to_delete.get('id'))
             
             # Remove items from database
             items_removed = []
@@ -3310,6 +3278,7 @@ For support, contact your administrator.
                 bill_id = bill.get('id')
                 try:
                     result = db.delete_bill(bill_id)
+                    get_receipt_cache().discard(bill_id)
                     # Some databases return True/False, others return None
                     if result is not False:
                         deleted_count += 1
@@ -3432,6 +3401,7 @@ For support, contact your administrator.
                 if bill.get('items'):
                     try:
                         db.update_bill(bill_id, items=[], total=0.0)
+                        get_receipt_cache().discard(bill_id)
                         bills_updated += 1
                     except Exception:
                         pass
@@ -3485,8 +3455,8 @@ For support, contact your administrator.
         total_items_sold = sum(sum(item['quantity'] for item in bill['items']) for bill in bills)
         avg_bill_value = total_sales / total_bills if total_bills > 0 else 0
         
-        today = datetime.now().date()
-        today_bills = [b for b in bills if datetime.fromisoformat(b['date']).date() == today]
+        today_start, today_end = day_timestamp_range(datetime.now().date())
+        today_bills = [b for b in bills if today_start <= get_bill_timestamp(b) < today_end]
         today_sales = sum(b['total'] for b in today_bills)
         
         stats = [
@@ -3518,20 +3488,18 @@ For support, contact your administrator.
     
     # Items Methods
     def _refresh_items(self):
-        """Refresh items list with barcodes"""
-        for item in self.items_tree.get_children():
-            self.items_tree.delete(item)
-        
+        """Refresh items list with barcodes (only changed rows are updated)"""
         inventory = db.get_all_inventory()
-        for item in inventory:
-            barcode_value = f"DROP{str(item['id']).zfill(6)}"
-            self.items_tree.insert('', 'end', values=(
+        sync_treeview(self.items_tree, [
+            (item['id'], (
                 item['id'],
                 item['name'],
                 item['category'],
                 f"₹{item['price']:.2f}",
-                barcode_value
+                f"DROP{str(item['id']).zfill(6)}"
             ))
+            for item in inventory
+        ])
     
     def _scan_barcode(self):
         """Open barcode scanner dialog"""
@@ -3628,17 +3596,7 @@ For support, contact your administrator.
             item_id = int(self.items_tree.item(selection[0])['values'][0])
             item_name = self.items_tree.item(selection[0])['values'][1]
             
-            from barcode_util import generate_barcode, BARCODE_AVAILABLE
-            
-            if not BARCODE_AVAILABLE:
-                messagebox.showerror(
-                    "Barcode Library Missing",
-                    "The python-barcode library is not installed.\n\n"
-                    "Please install it by running:\n"
-                    "pip install python-barcode\n\n"
-                    "Then restart the application."
-                )
-                return
+            from barcode_util import generate_barcode
             
             # Ask user where to save the barcode
             safe_name = "".join(c for c in item_name if c.isalnum() or c in (' ', '-', '_')).strip()
@@ -3668,12 +3626,6 @@ For support, contact your administrator.
                 )
             else:
                 messagebox.showerror("Error", "Barcode was generated but file was not found.")
-        except ImportError as e:
-            messagebox.showerror(
-                "Import Error",
-                f"Barcode library is not available.\n\nError: {str(e)}\n\n"
-                "Please install: pip install python-barcode"
-            )
         except Exception as e:
             messagebox.showerror("Error", f"Failed to download barcode:\n\n{str(e)}")
     
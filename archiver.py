@@ -0,0 +1,198 @@
+"""
+Archive rotation for receipts, reports and bill files
+Loose files from closed days (any day before today, by modification time) in the receipts,
+reports and bill JSON folders are rolled into one zip bundle per folder and day under
+data/archive, then deleted. Each folder's archive keeps an index (index.jsonl) of which bundle
+holds each file, so any single receipt or bill can be read back without scanning bundles.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+import zipfile
+from datetime import date, datetime
+
+from config import DATA_DIR, RECEIPTS_DIR, BILLS_DIR, BILLS_JSON_DIR
+
+ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")
+
+# Archived folders: archive name -> folder
+ARCHIVE_SOURCES = {
+    'receipts': RECEIPTS_DIR,
+    'reports': BILLS_DIR,
+    'bills_json': BILLS_JSON_DIR
+}
+
+# Seconds between archive runs while the app is open
+ARCHIVE_INTERVAL = 60 * 60
+
+
+class Archiver:
+    """Rolls closed days of loose files into daily zip bundles"""
+
+    def __init__(self, archive_dir=ARCHIVE_DIR, sources=None):
+        self.archive_dir = archive_dir
+        self.sources = sources if sources is not None else dict(ARCHIVE_SOURCES)
+        self._indexes = {}  # Archive name -> {file name: bundle file name}, loaded on first use
+        self._lock = threading.Lock()
+
+    def archive_closed_days(self, today=None):
+        """Archive loose files from days before today; returns the number of files archived"""
+        today = today or date.today()
+        archived = 0
+        for source, directory in self.sources.items():
+            for day, files in sorted(self._closed_day_files(directory, today).items()):
+                try:
+                    archived += self._archive_day(source, directory, day, files)
+                except Exception:
+                    pass  # Loose files stay in place and are tried again next run
+        return archived
+
+    def read(self, source, name):
+        """Read an archived file (name relative to its folder, '/' separated); None if not archived"""
+        with self._lock:
+            bundle = self._get_index(source).get(name)
+        if bundle is None:
+            return None
+        try:
+            with zipfile.ZipFile(os.path.join(self.archive_dir, source, bundle)) as archive:
+                return archive.read(name)
+        except (OSError, KeyError, zipfile.BadZipFile):
+            return None
+
+    def is_archived(self, source, name):
+        """Whether a file (name relative to its folder) is in the archive"""
+        with self._lock:
+            return name in self._get_index(source)
+
+    def archived_names(self, source):
+        """Names of all archived files of a folder"""
+        with self._lock:
+            return set(self._get_index(source))
+
+    def _closed_day_files(self, directory, today):
+        """Loose files of closed days, walking subfolders: {day: [(name, path, mtime), ...]}"""
+        days = {}
+        for root, _, file_names in os.walk(directory):
+            for file_name in file_names:
+                if file_name.endswith('.tmp'):
+                    continue  # Being written
+                path = os.path.join(root, file_name)
+                try:
+                    mtime = os.stat(path).st_mtime
+                except OSError:
+                    continue
+                day = datetime.fromtimestamp(mtime).date()
+                if day < today:
+                    name = os.path.relpath(path, directory).replace(os.sep, '/')
+                    days.setdefault(day, []).append((name, path, mtime))
+        return days
+
+    def _archive_day(self, source, directory, day, files):
+        bundle = f"{day.isoformat()}.zip"
+        bundle_dir = os.path.join(self.archive_dir, source)
+        bundle_path = os.path.join(bundle_dir, bundle)
+        os.makedirs(bundle_dir, exist_ok=True)
+
+        # Build the new bundle beside the old one, so a crash never leaves a half-written bundle
+        temp_path = bundle_path + '.tmp'
+        if os.path.exists(temp_path):
+            os.remove(temp_path)  # Left by an interrupted run
+        if os.path.exists(bundle_path):
+            self._copy_bundle(bundle_path, temp_path, {name for name, _, _ in files})
+        with zipfile.ZipFile(temp_path, 'a', compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, path, _ in files:
+                archive.write(path, name)
+        with open(temp_path, 'r+b') as f:
+            os.fsync(f.fileno())
+        os.replace(temp_path, bundle_path)
+
+        with self._lock:
+            index = self._get_index(source)
+            with open(self._index_path(source), 'a', encoding='utf-8') as f:
+                for name, _, _ in files:
+                    f.write(json.dumps([name, bundle], ensure_ascii=False) + "\n")
+                    index[name] = bundle
+
+        # Remove the loose files, unless one was rewritten while it was being archived
+        for name, path, mtime in files:
+            try:
+                if os.stat(path).st_mtime == mtime:
+                    os.remove(path)
+            except OSError:
+                pass
+        self._remove_empty_dirs(directory)
+        return len(files)
+
+    @staticmethod
+    def _copy_bundle(bundle_path, temp_path, replaced_names):
+        """Copy a bundle to be appended to, leaving out files that are archived again"""
+        with zipfile.ZipFile(bundle_path) as old:
+            if not replaced_names.intersection(old.namelist()):
+                shutil.copyfile(bundle_path, temp_path)
+                return
+            with zipfile.ZipFile(temp_path, 'w', compression=zipfile.ZIP_DEFLATED) as new:
+                for info in old.infolist():
+                    if info.filename not in replaced_names:
+                        new.writestr(info, old.read(info))
+
+    def _index_path(self, source):
+        return os.path.join(self.archive_dir, source, "index.jsonl")
+
+    def _get_index(self, source):
+        index = self._indexes.get(source)
+        if index is None:
+            index = {}
+            try:
+                with open(self._index_path(source), 'r', encoding='utf-8') as f:
+                    for record in f:
+                        try:
+                            name, bundle = json.loads(record)
+                        except ValueError:
+                            continue  # Torn last record
+                        index[name] = bundle  # Later records win (file archived again)
+            except OSError:
+                pass
+            self._indexes[source] = index
+        return index
+
+    @staticmethod
+    def _remove_empty_dirs(directory):
+        """Remove subfolders left empty (never the folder itself)"""
+        for root, _, _ in os.walk(directory, topdown=False):
+            if root != directory:
+                try:
+                    os.rmdir(root)
+                except OSError:
+                    pass  # Not empty
+
+
+_archiver = None
+_archiver_lock = threading.Lock()
+
+
+def get_archiver():
+    """Get the shared archiver"""
+    global _archiver
+    with _archiver_lock:
+        if _archiver is None:
+            _archiver = Archiver()
+        return _archiver
+
+
+def start_background_archiving(interval=ARCHIVE_INTERVAL):
+    """Archive closed days now and then every interval seconds, on a daemon thread"""
+    def run():
+        archiver = get_archiver()
+        while True:
+            try:
+                archiver.archive_closed_days()
+            except Exception:
+                pass
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
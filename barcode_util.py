@@ -1,61 +1,506 @@
 """
 Barcode generation utility for items (Code128 format) - SVG Only
+Barcodes are encoded by a built-in, table-driven Code128 B/C encoder (same symbols as
+python-barcode) and written as one compact SVG path per barcode, with no per-bar elements.
+Many barcodes are generated in one batch (generate_barcodes / BarcodeBatchWorker): items are
+rendered in memory across a process pool, and items whose SVG in the target folder is unchanged
+since it was written (recorded with its hash in the folder's .barcodes.json) are skipped.
+For printing, labels (name, barcode and price) are laid out on a label stock (A4 sheets or
+thermal label rolls) as one SVG document or one ESC/POS job, generated page by page.
 """
 
+import hashlib
+import json
 import os
 import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-try:
-    from barcode.writer import SVGWriter
-    from barcode import Code128
-    BARCODE_AVAILABLE = True
-except ImportError:
-    BARCODE_AVAILABLE = False
+import escpos
+
+# Barcodes are rendered by the built-in encoder, so they are always available
+BARCODE_AVAILABLE = True
+
+# Barcodes rendered per worker task; smaller batches are rendered without a process pool
+BARCODES_PER_TASK = 2000
+# Barcodes rendered between progress reports and cancel checks when rendering without the pool
+BARCODES_PER_INLINE_CHUNK = 100
+
+# Per-folder record of the barcodes written there: file name -> [value, sha256, size, mtime_ns]
+BARCODE_MANIFEST_NAME = ".barcodes.json"
+
+def get_barcode_dir():
+    """Get the default folder for generated barcodes"""
+    if getattr(sys, 'frozen', False):
+        return os.path.join(os.path.dirname(sys.executable), "data", "barcodes")
+    return os.path.join("data", "barcodes")
+
+def get_barcode_filename(item_id, item_name):
+    """Get the SVG file name for an item's barcode"""
+    safe_name = "".join(c for c in item_name if c.isalnum() or c in (' ', '-', '_')).strip()
+    safe_name = safe_name.replace(' ', '_')
+    return f"DROP_{safe_name}_{item_id}.svg"
+
+# Code128 bar/space widths (in modules) of symbol values 0-105; 103-105 are Start A/B/C
+CODE128_WIDTHS = (
+    "212222", "222122", "222221", "121223", "121322", "131222", "122213", "122312", "132212", "221213",
+    "221312", "231212", "112232", "122132", "122231", "113222", "123122", "123221", "223211", "221132",
+    "221231", "213212", "223112", "312131", "311222", "321122", "321221", "312212", "322112", "322211",
+    "212123", "212321", "232121", "111323", "131123", "131321", "112313", "132113", "132311", "211313",
+    "231113", "231311", "112133", "112331", "132131", "113123", "113321", "133121", "313121", "211331",
+    "231131", "213113", "213311", "213131", "311123", "311321", "331121", "312113", "312311", "332111",
+    "314111", "221411", "431111", "111224", "111422", "121124", "121421", "141122", "141221", "112214",
+    "112412", "122114", "122411", "142112", "142211", "241211", "221114", "413111", "241112", "134111",
+    "111242", "121142", "121241", "114212", "124112", "124211", "411212", "421112", "421211", "212141",
+    "214121", "412121", "111143", "111341", "131141", "114113", "114311", "411113", "411311", "113141",
+    "114131", "311141", "411131", "211412", "211214", "211232"
+)
+CODE128_STOP = "2331112"
+
+_START_B = 104
+_START_C = 105
+_CODE_B = 100
+_CODE_C = 99
+_START_FOR_SWITCH = {_CODE_B: _START_B, _CODE_C: _START_C}
+
+# Label geometry (same size as the python-barcode SVG writer), in SVG units of 0.1 mm
+_MODULE = 2          # 0.2 mm per module
+_QUIET_ZONE = 25.4   # 2.54 mm on each side
+_BAR_TOP = 10
+_BAR_HEIGHT = 150
+_TEXT_Y = 210
+_FONT_SIZE = 35.278  # 10 pt
+_HEIGHT = 237.64
+
+def _widths_path(widths, lead_out):
+    """Relative SVG path of one symbol's bars, ending at the left edge of the next symbol"""
+    parts = []
+    offset = 0
+    bar_start = 0
+    for i, width in enumerate(widths):
+        width = int(width)
+        if i % 2 == 0:
+            parts.append(f"m{(offset - bar_start) * _MODULE} 0" if offset else "")
+            parts.append(f"h{width * _MODULE}v{_BAR_HEIGHT}h-{width * _MODULE}z")
+            bar_start = offset
+        offset += width
+    if lead_out:
+        parts.append(f"m{(offset - bar_start) * _MODULE} 0")
+    return "".join(parts)
+
+# Path of each symbol value (and of the stop pattern), joined as-is to draw a barcode
+_SYMBOL_PATHS = tuple(_widths_path(widths, True) for widths in CODE128_WIDTHS)
+_STOP_PATH = _widths_path(CODE128_STOP, False)
+
+def _digits_ahead(barcode_value, pos):
+    """Whether more than 3 digits follow from pos (looking at most 10 characters ahead)"""
+    digits = 0
+    for char in barcode_value[pos:pos + 10]:
+        if not char.isdigit():
+            break
+        digits += 1
+    return digits > 3
+
+def code128_codes(barcode_value):
+    """Encode text as Code128 symbol values (charsets B and C, with the check value, no stop)"""
+    codes = [_START_C]
+    charset = 'C'
+    pending_digit = None  # First digit of a charset C pair
+    for pos, char in enumerate(barcode_value):
+        value = ord(char) - 32
+        if not 0 <= value < 96:
+            raise ValueError(f"Character {char!r} can't be encoded in a barcode")
+        if charset == 'C' and not char.isdigit():
+            codes.append(_CODE_B)
+            charset = 'B'
+            if pending_digit is not None:
+                codes.append(ord(pending_digit) - 32)
+                pending_digit = None
+        elif charset == 'B' and _digits_ahead(barcode_value, pos):
+            codes.append(_CODE_C)
+            charset = 'C'
+
+        if charset == 'B':
+            codes.append(value)
+        elif pending_digit is None:
+            pending_digit = char
+        else:
+            codes.append(int(pending_digit + char))
+            pending_digit = None
+    if pending_digit is not None:
+        codes.extend((_CODE_B, ord(pending_digit) - 32))
+
+    # A charset switch right after the start becomes the start code of that charset
+    if len(codes) > 1 and codes[1] in _START_FOR_SWITCH:
+        codes[:2] = [_START_FOR_SWITCH[codes[1]]]
+    checksum = codes[0] + sum(position * code for position, code in enumerate(codes[1:], 1))
+    codes.append(checksum % 103)
+    return codes
+
+def _module_count(codes):
+    """Width in modules of a barcode's symbols plus the stop pattern"""
+    return len(codes) * 11 + 13
+
+def _bars_path(codes):
+    """Relative SVG path of a barcode's bars (module 2 units wide, bars 150 units high)"""
+    return "".join([_SYMBOL_PATHS[code] for code in codes]) + _STOP_PATH
+
+def _escape(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+def code128_modules(barcode_value):
+    """Module string ('1' bar, '0' space) of a barcode, stop pattern and final bar included"""
+    modules = []
+    for widths in [CODE128_WIDTHS[code] for code in code128_codes(barcode_value)] + [CODE128_STOP]:
+        for i, width in enumerate(widths):
+            modules.append(('1' if i % 2 == 0 else '0') * int(width))
+    return "".join(modules)
+
+def render_barcode_svgs(barcode_values):
+    """Render Code128 barcodes as SVG bytes (in memory), one per value"""
+    svgs = []
+    for barcode_value in barcode_values:
+        codes = code128_codes(barcode_value)
+        width = _module_count(codes) * _MODULE + 2 * _QUIET_ZONE
+        svgs.append((
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width / 10:.3f}mm" height="{_HEIGHT / 10:.3f}mm" '
+            f'viewBox="0 0 {width:g} {_HEIGHT:g}"><rect width="100%" height="100%" fill="#fff"/>'
+            f'<path d="M{_QUIET_ZONE:g} {_BAR_TOP}{_bars_path(codes)}"/>'
+            f'<text x="{width / 2:g}" y="{_TEXT_Y}" font-size="{_FONT_SIZE:g}" text-anchor="middle">'
+            f'{_escape(barcode_value)}</text></svg>'
+        ).encode('utf-8'))
+    return svgs
+
+def render_barcode_svg(barcode_value):
+    """Render a Code128 barcode as SVG bytes (in memory)"""
+    return render_barcode_svgs([barcode_value])[0]
+
+def _write_file(path, data):
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
 
 def generate_barcode(item_id, item_name, save_path=None):
     """
     Generate a Code128 barcode as SVG
     Returns the file path of the generated barcode
     """
-    if not BARCODE_AVAILABLE:
-        raise ImportError("python-barcode library is not installed. Please run: pip install python-barcode")
-    
-    barcode_value = f"DROP{str(item_id).zfill(6)}"
-    
+    barcode_value = get_barcode_value(item_id)
+    svg = render_barcode_svg(barcode_value)
+
     # If no save_path provided, use default location
     if save_path is None:
-        if getattr(sys, 'frozen', False):
-            barcode_dir = os.path.join(os.path.dirname(sys.executable), "data", "barcodes")
-        else:
-            barcode_dir = os.path.join("data", "barcodes")
-        os.makedirs(barcode_dir, exist_ok=True)
-        
-        safe_name = "".join(c for c in item_name if c.isalnum() or c in (' ', '-', '_')).strip()
-        safe_name = safe_name.replace(' ', '_')
-        filename = f"DROP_{safe_name}_{item_id}"
-        save_path = os.path.join(barcode_dir, filename)
-    
-    # Remove .svg extension if present (SVGWriter adds it)
-    if save_path.lower().endswith('.svg'):
-        save_path = save_path[:-4]
-    
+        save_path = os.path.join(get_barcode_dir(), get_barcode_filename(item_id, item_name))
+    elif not save_path.lower().endswith('.svg'):
+        save_path += ".svg"
+
     # Ensure directory exists
     save_dir = os.path.dirname(save_path)
     if save_dir:
         os.makedirs(save_dir, exist_ok=True)
-    
-    # Generate SVG barcode
-    svg_writer = SVGWriter()
-    svg_code = Code128(barcode_value, writer=svg_writer)
-    svg_code.save(save_path)
-    
-    svg_filepath = save_path + ".svg"
-    
-    if not os.path.exists(svg_filepath):
-        raise Exception(f"SVG barcode file was not created at {svg_filepath}")
-    
-    return svg_filepath
+
+    _write_file(save_path, svg)
+    return save_path
 
 def get_barcode_value(item_id):
     """Get barcode value string for an item"""
     return f"DROP{str(item_id).zfill(6)}"
+
+def _render_batch(tasks):
+    """Worker: render and write barcodes for (value, path) pairs; returns one result tuple per pair"""
+    results = []
+    try:
+        svgs = render_barcode_svgs([value for value, _ in tasks])
+    except ValueError:
+        svgs = [None] * len(tasks)  # A value can't be encoded: render one by one to find it
+    for (value, path), svg in zip(tasks, svgs):
+        try:
+            if svg is None:
+                svg = render_barcode_svg(value)
+            _write_file(path, svg)
+            stat = os.stat(path)
+            results.append((path, [value, hashlib.sha256(svg).hexdigest(), stat.st_size, stat.st_mtime_ns], None))
+        except Exception as e:
+            results.append((path, None, str(e)))
+    return results
+
+def _load_manifest(save_dir):
+    try:
+        with open(os.path.join(save_dir, BARCODE_MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def _save_manifest(save_dir, manifest):
+    try:
+        _write_file(os.path.join(save_dir, BARCODE_MANIFEST_NAME), json.dumps(manifest).encode('utf-8'))
+    except Exception:
+        pass  # Without the manifest the next batch just renders everything again
+
+def _is_current(path, value, entry):
+    """Whether the SVG at path is the one recorded for value and untouched since"""
+    if not entry or entry[0] != value:
+        return False
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    return stat.st_size == entry[2] and stat.st_mtime_ns == entry[3]
+
+def generate_barcodes(items, save_dir=None, progress=None, workers=None, cancel_event=None):
+    """
+    Generate SVG barcodes for (item_id, item_name) pairs into save_dir (default barcode folder)
+    progress(processed, total) is called as batches finish
+    Returns (paths in item order, stats) - stats has rendered, skipped and failed [(item_id, error)]
+    """
+    save_dir = save_dir or get_barcode_dir()
+    os.makedirs(save_dir, exist_ok=True)
+    manifest = _load_manifest(save_dir)
+
+    paths = []
+    item_ids = {}  # Path -> item ID, for error reports
+    tasks = []
+    skipped = 0
+    for item_id, item_name in items:
+        filename = get_barcode_filename(item_id, item_name)
+        path = os.path.join(save_dir, filename)
+        value = get_barcode_value(item_id)
+        paths.append(path)
+        if _is_current(path, value, manifest.get(filename)):
+            skipped += 1
+        elif path not in item_ids:
+            item_ids[path] = item_id
+            tasks.append((value, path))
+
+    stats = {'rendered': 0, 'skipped': skipped, 'failed': []}
+    processed = skipped
+    if progress:
+        progress(processed, len(items))
+
+    def collect(results):
+        nonlocal processed
+        for path, entry, error in results:
+            if error:
+                stats['failed'].append((item_ids[path], error))
+            else:
+                manifest[os.path.basename(path)] = entry
+                stats['rendered'] += 1
+        processed += len(results)
+        if progress:
+            progress(processed, len(items))
+
+    batches = [tasks[i:i + BARCODES_PER_TASK] for i in range(0, len(tasks), BARCODES_PER_TASK)]
+    try:
+        if len(batches) <= 1:
+            for start in range(0, len(tasks), BARCODES_PER_INLINE_CHUNK):
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                collect(_render_batch(tasks[start:start + BARCODES_PER_INLINE_CHUNK]))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_render_batch, batch) for batch in batches]
+                for future in as_completed(futures):
+                    if cancel_event is not None and cancel_event.is_set():
+                        for pending in futures:
+                            pending.cancel()
+                        break
+                    collect(future.result())
+    finally:
+        _save_manifest(save_dir, manifest)
+    return paths, stats
+
+class BarcodeBatchWorker:
+    """
+    Runs generate_barcodes on a background thread
+    Progress is exposed through processed/total counters for the UI to poll
+    """
+
+    def __init__(self, items, save_dir=None, workers=None):
+        self.items = items
+        self.save_dir = save_dir
+        self.workers = workers
+        self.total = len(items)
+        self.processed = 0
+        self.paths = []
+        self.stats = None
+        self.error = None
+        self.done = False
+        self._cancel_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def start(self):
+        """Start generating in the background"""
+        self._thread.start()
+
+    def cancel(self):
+        """Stop after the batches being rendered (barcodes written so far are kept)"""
+        self._cancel_event.set()
+
+    def _on_progress(self, processed, total):
+        self.processed = processed
+
+    def _run(self):
+        try:
+            self.paths, self.stats = generate_barcodes(
+                self.items, self.save_dir, self._on_progress, self.workers, self._cancel_event
+            )
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+
+# Label stocks: page size, label grid, label size and spacing in mm. On roll stocks a page is one
+# row of labels (thermal label rolls); only one-column roll stocks can be printed as ESC/POS.
+LABEL_STOCKS = {
+    'A4 - 3 x 8 labels (70 x 37 mm)': {
+        'page_width': 210, 'page_height': 297, 'columns': 3, 'rows': 8, 'label_width': 70,
+        'label_height': 37, 'margin_left': 0, 'margin_top': 0.5, 'gap_x': 0, 'gap_y': 0, 'roll': False
+    },
+    'A4 - 4 x 10 labels (48.5 x 25.4 mm)': {
+        'page_width': 210, 'page_height': 297, 'columns': 4, 'rows': 10, 'label_width': 48.5,
+        'label_height': 25.4, 'margin_left': 8, 'margin_top': 21.5, 'gap_x': 0, 'gap_y': 0, 'roll': False
+    },
+    'A4 - 5 x 13 labels (38.1 x 21.2 mm)': {
+        'page_width': 210, 'page_height': 297, 'columns': 5, 'rows': 13, 'label_width': 38.1,
+        'label_height': 21.2, 'margin_left': 4.75, 'margin_top': 10.7, 'gap_x': 2.5, 'gap_y': 0, 'roll': False
+    },
+    'Thermal roll - 50 x 25 mm': {
+        'page_width': 50, 'page_height': 28, 'columns': 1, 'rows': 1, 'label_width': 50,
+        'label_height': 25, 'margin_left': 0, 'margin_top': 0, 'gap_x': 0, 'gap_y': 3, 'roll': True
+    },
+    'Thermal roll - 40 x 30 mm': {
+        'page_width': 40, 'page_height': 33, 'columns': 1, 'rows': 1, 'label_width': 40,
+        'label_height': 30, 'margin_left': 0, 'margin_top': 0, 'gap_x': 0, 'gap_y': 3, 'roll': True
+    },
+    'Thermal roll - 2 x 38 x 25 mm': {
+        'page_width': 80, 'page_height': 28, 'columns': 2, 'rows': 1, 'label_width': 38,
+        'label_height': 25, 'margin_left': 1, 'margin_top': 0, 'gap_x': 2, 'gap_y': 3, 'roll': True
+    }
+}
+DEFAULT_LABEL_STOCK = 'A4 - 3 x 8 labels (70 x 37 mm)'
+
+# Space kept free around label contents, in mm
+LABEL_PADDING = 1.5
+
+# Thermal printer resolution (dots per mm) for ESC/POS labels
+PRINTER_DOTS_PER_MM = 8
+
+def get_label_stock(stock):
+    """Get a label stock by name (or pass a stock dict through)"""
+    return LABEL_STOCKS[stock] if isinstance(stock, str) else stock
+
+def _fit_text(text, max_chars):
+    """Shorten text to at most max_chars characters"""
+    max_chars = max(4, max_chars)
+    return text if len(text) <= max_chars else text[:max_chars - 3] + "..."
+
+def _label_svg(item_id, item_name, price, x, y, width, height):
+    """SVG elements of one label (name, barcode, barcode text and price) at x, y in mm"""
+    barcode_value = get_barcode_value(item_id)
+    codes = code128_codes(barcode_value)
+    modules = _module_count(codes)
+    inner_width = width - 2 * LABEL_PADDING
+    name_size = min(3.2, height * 0.13)
+    text_size = min(2.5, height * 0.09)
+    module = min(0.33, inner_width / (modules + 20))  # Leaves a 10 module quiet zone each side
+    bars_top = y + LABEL_PADDING + name_size * 1.3
+    bars_height = height - 2 * LABEL_PADDING - name_size * 1.3 - text_size * 1.2 - name_size * 1.3
+    bars_left = x + (width - modules * module) / 2
+    center = x + width / 2
+    return (
+        f'<text x="{center:.2f}" y="{y + LABEL_PADDING + name_size:.2f}" font-size="{name_size:.2f}" '
+        f'text-anchor="middle">{_escape(_fit_text(str(item_name), int(inner_width / (name_size * 0.55))))}</text>'
+        f'<path transform="matrix({module / _MODULE:.4f} 0 0 {bars_height / _BAR_HEIGHT:.4f} {bars_left:.2f} {bars_top:.2f})" '
+        f'd="M0 0{_bars_path(codes)}"/>'
+        f'<text x="{center:.2f}" y="{bars_top + bars_height + text_size:.2f}" font-size="{text_size:.2f}" '
+        f'text-anchor="middle">{barcode_value}</text>'
+        f'<text x="{center:.2f}" y="{y + height - LABEL_PADDING:.2f}" font-size="{name_size:.2f}" '
+        f'font-weight="bold" text-anchor="middle">₹{float(price):.2f}</text>'
+    )
+
+def iter_label_sheet_svg(labels, stock=DEFAULT_LABEL_STOCK):
+    """
+    Lay out (item_id, item_name, price) labels on a label stock as one SVG document
+    Yields the document in chunks (header, one per page, footer); pages are stacked top to bottom
+    """
+    stock = get_label_stock(stock)
+    labels = list(labels)
+    per_page = stock['columns'] * stock['rows']
+    pages = max(1, -(-len(labels) // per_page))
+    page_width = stock['page_width']
+    page_height = stock['page_height']
+    yield (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{page_width}mm" height="{pages * page_height:g}mm" '
+        f'viewBox="0 0 {page_width} {pages * page_height:g}" font-family="Arial, sans-serif">'
+        f'<rect width="100%" height="100%" fill="#fff"/>'
+    )
+    for page in range(pages):
+        parts = []
+        for index, (item_id, item_name, price) in enumerate(labels[page * per_page:(page + 1) * per_page]):
+            row, column = divmod(index, stock['columns'])
+            parts.append(_label_svg(
+                item_id, item_name, price,
+                stock['margin_left'] + column * (stock['label_width'] + stock['gap_x']),
+                page * page_height + stock['margin_top'] + row * (stock['label_height'] + stock['gap_y']),
+                stock['label_width'], stock['label_height']
+            ))
+        yield "".join(parts)
+    yield '</svg>'
+
+def write_label_sheet_svg(labels, path, stock=DEFAULT_LABEL_STOCK):
+    """Write the label sheet SVG to path page by page; returns the path"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        for chunk in iter_label_sheet_svg(labels, stock):
+            f.write(chunk)
+    os.replace(path + '.tmp', path)
+    return path
+
+def _escpos_barcode_data(codes):
+    """Data for the ESC/POS Code128 command, with the same code set switches as the SVG barcode"""
+    data = []
+    charset = None
+    for code in codes[:-1]:  # The printer adds the check value
+        if code in (_START_B, _CODE_B):
+            data.append(b'{B')
+            charset = 'B'
+        elif code in (_START_C, _CODE_C):
+            data.append(b'{C')
+            charset = 'C'
+        elif charset == 'C':
+            data.append(bytes([code]))
+        else:
+            data.append(b'{{' if code == ord('{') - 32 else bytes([code + 32]))
+    return b"".join(data)
+
+def iter_label_escpos(labels, stock):
+    """
+    Lay out (item_id, item_name, price) labels as one ESC/POS job for a one-column roll stock
+    Yields the job in chunks (init, then one per label); each label ends with a feed to the next label
+    """
+    stock = get_label_stock(stock)
+    if not stock['roll'] or stock['columns'] != 1:
+        raise ValueError("ESC/POS labels need a one-column thermal roll stock")
+    label_dots = stock['label_width'] * PRINTER_DOTS_PER_MM
+    chars = max(1, int(label_dots / 12))  # Font A is 12 dots wide
+    barcode_height = min(255, int(stock['label_height'] * PRINTER_DOTS_PER_MM * 0.4))
+    yield escpos.INIT + escpos.ALIGN_CENTER
+    for item_id, item_name, price in labels:
+        codes = code128_codes(get_barcode_value(item_id))
+        module_width = max(1, min(3, int(label_dots / (_module_count(codes) + 20))))
+        yield (
+            escpos.BOLD_ON + escpos.encode_text(_fit_text(str(item_name), chars)) + b'\n' + escpos.BOLD_OFF +
+            escpos.code128_barcode(None, barcode_height, module_width, data=_escpos_barcode_data(codes)) + b'\n' +
+            escpos.BOLD_ON + escpos.encode_text(f"₹{float(price):.2f}") + b'\n' + escpos.BOLD_OFF +
+            escpos.NEXT_LABEL
+        )
+
+def render_label_escpos(labels, stock):
+    """Render labels for a one-column roll stock as one ESC/POS job (bytes)"""
+    return b"".join(iter_label_escpos(labels, stock))
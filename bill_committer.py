@@ -0,0 +1,238 @@
+"""
+Background bill commit
+Checkout reserves a bill ID and shows the preview at once; saving the bill (local database,
+Firestore and the individual JSON file) happens here on a worker thread, in checkout order,
+retrying with backoff (up to MAX_ATTEMPTS; errors in the sale itself are not retried).
+Each sale gets a commit token (checkout time and user ID) that is stored on the saved bill, so a
+retry after a partial save is recognised by its token rather than by its bill number. Queued
+sales are written to data/bill_commit_queue before submit returns and removed once saved, so a
+crash between checkout and commit loses nothing: they are saved when the app starts again.
+Sales that could not be saved are moved to data/bill_commit_queue/failed and reported to the UI
+(see take_failed) until retry_failed queues them again.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from config import DATA_DIR
+
+BILL_COMMIT_QUEUE_DIR = os.path.join(DATA_DIR, "bill_commit_queue")
+FAILED_DIR_NAME = "failed"
+
+# Seconds to wait before retrying a failed save (doubles up to the maximum)
+RETRY_DELAY = 1
+MAX_RETRY_DELAY = 30
+# Attempts before a sale is moved to the failed folder (about 15 minutes of retries)
+MAX_ATTEMPTS = 35
+# Errors caused by the sale itself (retrying cannot fix them)
+PERMANENT_ERRORS = (TypeError, ValueError, KeyError)
+
+
+def new_commit_token(user_id):
+    """Get a unique token for a sale: checkout time (sorts in checkout order), user ID and a random part"""
+    return f"{time.time_ns():020d}_{user_id}_{uuid.uuid4().hex[:8]}"
+
+
+class BillCommitter:
+    """
+    Saves bills through store.create_bill on a background thread
+    Status is exposed through pending/committed/failed/last_error for the UI to poll
+    """
+
+    def __init__(self, store, queue_dir=BILL_COMMIT_QUEUE_DIR):
+        self.store = store
+        self.queue_dir = queue_dir
+        self.committed = []  # Saved bills not yet collected by the UI (see take_committed)
+        self.renumbered = []  # (reserved ID, saved ID) of bills saved under another number
+        self.failed = []  # Sales moved to the failed folder (see take_failed)
+        self.failed_count = 0  # Sales in the failed folder
+        self.current_bill_id = None  # Bill being saved
+        self.last_error = None  # Error of the last failed attempt (None once it succeeds)
+        self.attempts = 0  # Failed attempts for the current bill
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._load_queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self):
+        """Number of bills waiting to be saved (including the one being saved)"""
+        with self._lock:
+            return self._pending
+
+    def submit(self, user_id, items, total, payment_method, bill_id, date):
+        """
+        Queue a bill for saving; returns its commit token
+        The sale is on disk when this returns (raises OSError if it could not be written)
+        """
+        job = {
+            'user_id': user_id,
+            'items': items,
+            'total': total,
+            'payment_method': payment_method,
+            'bill_id': bill_id,
+            'date': date,
+            'commit_token': new_commit_token(user_id)
+        }
+        self._write_job(job)
+        self._put(job)
+        return job['commit_token']
+
+    def take_committed(self):
+        """Get bills saved since the last call"""
+        with self._lock:
+            committed, self.committed = self.committed, []
+        return committed
+
+    def take_renumbered(self):
+        """Get (reserved ID, saved ID) of bills saved under another number since the last call"""
+        with self._lock:
+            renumbered, self.renumbered = self.renumbered, []
+        return renumbered
+
+    def take_failed(self):
+        """Get (bill ID, error) of sales moved to the failed folder since the last call"""
+        with self._lock:
+            failed, self.failed = self.failed, []
+        return failed
+
+    def retry_failed(self):
+        """Queue the sales in the failed folder again; returns how many were queued"""
+        failed_dir = os.path.join(self.queue_dir, FAILED_DIR_NAME)
+        count = 0
+        for job in self._read_jobs(failed_dir):
+            try:
+                os.replace(os.path.join(failed_dir, self._job_name(job)), self._job_path(job))
+            except OSError:
+                continue
+            self._put(job)
+            count += 1
+        with self._lock:
+            self.failed_count = max(0, self.failed_count - count)
+        return count
+
+    def wait(self, timeout=None):
+        """Wait until all queued bills are saved; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            self.current_bill_id = job['bill_id']
+            delay = RETRY_DELAY
+            bill = None
+            while True:
+                try:
+                    bill = self.store.create_bill(**job)
+                    break
+                except Exception as e:
+                    self.attempts += 1
+                    self.last_error = e
+                    if isinstance(e, PERMANENT_ERRORS) or self.attempts >= MAX_ATTEMPTS:
+                        break
+                    time.sleep(delay)
+                    delay = min(delay * 2, MAX_RETRY_DELAY)
+            if bill is None:
+                self._fail_job(job, self.last_error)
+            else:
+                self._remove_job(job)
+                with self._lock:
+                    self.committed.append(bill)
+                    if job['bill_id'] and bill.get('id') != job['bill_id']:
+                        self.renumbered.append((job['bill_id'], bill.get('id')))
+            self.attempts = 0
+            self.last_error = None
+            self.current_bill_id = None
+            with self._lock:
+                self._pending -= 1
+            self._queue.task_done()
+
+    def _put(self, job):
+        with self._lock:
+            self._pending += 1
+        self._queue.put(job)
+
+    def _job_name(self, job):
+        return f"{job['commit_token']}.json"
+
+    def _job_path(self, job):
+        return os.path.join(self.queue_dir, self._job_name(job))
+
+    def _write_job(self, job):
+        os.makedirs(self.queue_dir, exist_ok=True)
+        path = self._job_path(job)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({**job, 'date': job['date'].isoformat() if job['date'] else None}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    def _remove_job(self, job):
+        try:
+            os.remove(self._job_path(job))
+        except OSError:
+            pass
+
+    def _fail_job(self, job, error):
+        """Move a sale that could not be saved to the failed folder (kept until retry_failed)"""
+        failed_dir = os.path.join(self.queue_dir, FAILED_DIR_NAME)
+        try:
+            os.makedirs(failed_dir, exist_ok=True)
+            os.replace(self._job_path(job), os.path.join(failed_dir, self._job_name(job)))
+        except OSError:
+            pass  # Left in the queue folder, so it is retried on the next start
+        print(f"⚠️  Bill {job['bill_id']} could not be saved: {error}")
+        with self._lock:
+            self.failed.append((job['bill_id'], error))
+            self.failed_count += 1
+
+    def _read_jobs(self, directory):
+        """Read the sales saved in a queue folder (oldest first)"""
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError:
+            return []
+        jobs = []
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+                job['date'] = datetime.fromisoformat(job['date']) if job.get('date') else None
+            except Exception:
+                continue
+            jobs.append(job)
+        return jobs
+
+    def _load_queue(self):
+        """Queue sales left unsaved by a previous session (failed ones stay in the failed folder)"""
+        for job in self._read_jobs(self.queue_dir):
+            self._put(job)
+        # Reported again, so the UI offers to retry them
+        for job in self._read_jobs(os.path.join(self.queue_dir, FAILED_DIR_NAME)):
+            self.failed.append((job['bill_id'], "not saved in a previous session"))
+            self.failed_count += 1
+
+
+_committer = None
+
+
+def get_bill_committer(store):
+    """Get the shared bill committer (one worker thread for the whole app)"""
+    global _committer
+    if _committer is None:
+        _committer = BillCommitter(store)
+    return _committer
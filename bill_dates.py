@@ -0,0 +1,75 @@
+"""
+Bill date helpers
+Bills store a pre-parsed epoch timestamp (milliseconds) and a YYYY-MM-DD day key next to their
+ISO date, so filters, sorting and reports compare integers instead of parsing dates
+"""
+
+from datetime import datetime, time, timedelta
+
+
+def to_timestamp(value):
+    """Convert a datetime, date or ISO date string to epoch milliseconds"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif not isinstance(value, datetime):
+        value = datetime.combine(value, time.min)
+    return int(value.timestamp() * 1000)
+
+
+def day_timestamp_range(start_day, end_day=None):
+    """Get [start, end) epoch milliseconds covering whole days from start_day to end_day (inclusive)"""
+    end_day = end_day or start_day
+    return to_timestamp(start_day), to_timestamp(end_day + timedelta(days=1))
+
+
+def get_bill_date_fields(date=None):
+    """Get the date fields stored on a new bill"""
+    date = date or datetime.now()
+    return {
+        'date': date.isoformat(),
+        'timestamp': to_timestamp(date),  # Epoch milliseconds for comparisons and sorting
+        'day': date.strftime('%Y-%m-%d')  # Day key for bucketing
+    }
+
+
+def get_bill_timestamp(bill):
+    """Get bill time as epoch milliseconds (parses the ISO date for bills not yet migrated)"""
+    timestamp = bill.get('timestamp')
+    if timestamp is None:
+        try:
+            timestamp = to_timestamp(bill['date'])
+        except (KeyError, TypeError, ValueError):
+            timestamp = 0
+    return timestamp
+
+
+def get_bill_day(bill):
+    """Get bill day key (YYYY-MM-DD)"""
+    return bill.get('day') or str(bill.get('date', ''))[:10]
+
+
+def format_bill_date(bill, seconds=False):
+    """Format bill date as YYYY-MM-DD HH:MM (or HH:MM:SS) straight from the ISO string"""
+    date = bill.get('date')
+    if not isinstance(date, str) or len(date) < 16:
+        return 'N/A'
+    return date[:10] + ' ' + date[11:19 if seconds else 16]
+
+
+def backfill_bill_dates(bills):
+    """
+    Add timestamp and day fields to bills created before they were stored
+    Returns the bills that were updated
+    """
+    updated = []
+    for bill in bills:
+        if 'timestamp' in bill and 'day' in bill:
+            continue
+        try:
+            date = datetime.fromisoformat(bill['date'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        bill['timestamp'] = to_timestamp(date)
+        bill['day'] = date.strftime('%Y-%m-%d')
+        updated.append(bill)
+    return updated
@@ -0,0 +1,158 @@
+"""
+Streaming bill export
+Bills are read page by page and written on a background thread, so exports run in
+constant memory and the window stays responsive
+"""
+
+import csv
+import gzip
+import json
+import os
+import threading
+
+from bill_dates import format_bill_date
+
+EXPORT_PAGE_SIZE = 500
+
+CSV_HEADER = [
+    'No', 'Bill ID', 'Date', 'Time', 'Staff Member',
+    'Items', 'Item Details', 'Total (₹)', 'Payment Method'
+]
+
+
+def iter_pages(bills, page_size=EXPORT_PAGE_SIZE):
+    """Split a list of bills into pages"""
+    for start in range(0, len(bills), page_size):
+        yield bills[start:start + page_size]
+
+
+def get_export_format(filename):
+    """Get export format from file name: 'jsonl.gz', 'jsonl' or 'csv'"""
+    name = filename.lower()
+    if name.endswith('.gz'):
+        return 'jsonl.gz'
+    if name.endswith('.jsonl'):
+        return 'jsonl'
+    return 'csv'
+
+
+def _display_bill_id(bill):
+    """Get bill ID in DR0201 format"""
+    bill_id = bill.get('id', 'N/A')
+    if isinstance(bill_id, (int, float)):
+        bill_id = f"DR{str(int(bill_id)).zfill(4)}"
+    return bill_id
+
+
+def format_csv_row(index, bill, staff_name):
+    """Format one bill as a CSV row"""
+    date_str, time_str = format_bill_date(bill, seconds=True).partition(' ')[::2]
+
+    items_list = []
+    items_details = []
+    for item in bill.get('items', []):
+        item_name = item.get('name', 'Unknown')
+        item_qty = item.get('quantity', 1)
+        item_price = item.get('price', 0)
+        item_total = item.get('total', 0)
+
+        if item_qty > 1:
+            items_list.append(f"{item_name} (x{item_qty})")
+        else:
+            items_list.append(item_name)
+
+        items_details.append(f"{item_name}: Qty={item_qty}, Price=₹{item_price:.2f}, Total=₹{item_total:.2f}")
+
+    return [
+        index,
+        _display_bill_id(bill),
+        date_str,
+        time_str,
+        staff_name,
+        ", ".join(items_list),
+        " | ".join(items_details),
+        f"{bill['total']:.2f}",
+        bill['payment_method']
+    ]
+
+
+def format_json_line(bill, staff_name):
+    """Format one bill as a JSON Lines record"""
+    record = dict(bill)
+    record['id'] = _display_bill_id(bill)
+    record['staff_name'] = staff_name
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+class BillExportWorker:
+    """
+    Writes bill pages to CSV or JSON Lines (optionally gzip-compressed) on a background thread
+    Progress is exposed through scanned/exported counters for the UI to poll
+    """
+
+    def __init__(self, pages, filename, bill_filter=None, staff_names=None):
+        self.pages = pages
+        self.filename = filename
+        self.format = get_export_format(filename)
+        self.bill_filter = bill_filter
+        self.staff_names = staff_names or {}
+        self.scanned = 0  # Bills read from storage
+        self.exported = 0  # Bills written to the file
+        self.error = None
+        self.done = False
+        self._cancel_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def start(self):
+        """Start exporting in the background"""
+        self._thread.start()
+
+    def cancel(self):
+        """Stop the export after the current page (the partial file is removed)"""
+        self._cancel_event.set()
+
+    def _open(self):
+        if self.format == 'jsonl.gz':
+            return gzip.open(self.filename, 'wt', encoding='utf-8', newline='')
+        return open(self.filename, 'w', newline='', encoding='utf-8')
+
+    def _run(self):
+        try:
+            with self._open() as f:
+                writer = None
+                if self.format == 'csv':
+                    writer = csv.writer(f)
+                    writer.writerow(CSV_HEADER)
+
+                for page in self.pages:
+                    if self.cancelled:
+                        break
+
+                    # Format the whole page, then write it as one chunk
+                    chunk = []
+                    for bill in page:
+                        if self.bill_filter and not self.bill_filter(bill):
+                            continue
+                        self.exported += 1
+                        staff_name = self.staff_names.get(bill.get('user_id'), 'Unknown')
+                        if writer:
+                            chunk.append(format_csv_row(self.exported, bill, staff_name))
+                        else:
+                            chunk.append(format_json_line(bill, staff_name))
+
+                    if writer:
+                        writer.writerows(chunk)
+                    else:
+                        f.write(''.join(chunk))
+                    self.scanned += len(page)
+
+            if self.cancelled:
+                os.remove(self.filename)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
@@ -0,0 +1,210 @@
+"""
+Background writer for the per-bill JSON files
+Bills are written to bills_json/YYYY/MM/<bill id>.json by a worker thread fed through a
+bounded queue, so saving a bill never waits on file I/O. A manifest (one JSON record per line)
+lists every bill file written, so the startup backfill only writes bills missing from it
+instead of checking each bill's file on disk. The manifest is compacted to one record per bill
+when it is loaded, and a marker file records that the backfill has finished, so it is skipped
+on later starts.
+"""
+
+import json
+import os
+import queue
+import re
+import threading
+
+from config import DATA_DIR, BILLS_JSON_DIR
+from bill_dates import get_bill_day
+
+BILL_FILE_MANIFEST = os.path.join(DATA_DIR, "bills_json_manifest.jsonl")
+# Created once every bill had been written to a bill file (see mark_migrated)
+BILL_FILES_MIGRATED_MARKER = os.path.join(DATA_DIR, "bills_json_migrated")
+
+# Writes waiting for the worker; save() blocks when this many are waiting
+MAX_QUEUED_WRITES = 1000
+
+_DAY_PATTERN = re.compile(r'^(\d{4})-(\d{2})-\d{2}$')
+
+
+def get_bill_file_name(bill):
+    """Bill file path relative to the bills folder: YYYY/MM/<bill id>.json"""
+    match = _DAY_PATTERN.match(get_bill_day(bill))
+    shard = f"{match.group(1)}/{match.group(2)}" if match else "undated"
+    return f"{shard}/{bill['id']}.json"
+
+
+class BillFileWriter:
+    """Writes and deletes bill JSON files on a worker thread"""
+
+    def __init__(self, bills_dir=BILLS_JSON_DIR, manifest_path=BILL_FILE_MANIFEST, maxsize=MAX_QUEUED_WRITES,
+                 marker_path=BILL_FILES_MIGRATED_MARKER):
+        self.bills_dir = bills_dir
+        self.manifest_path = manifest_path
+        self.marker_path = marker_path
+        self._write_failed = False  # Set when a queued write fails (the marker is then not created)
+        self._files = {}  # Bill ID (as text) -> file name, for every bill file written
+        self._lock = threading.Lock()
+        self._manifest = None
+        self._load_manifest()
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def save(self, bill):
+        """Queue a bill to be written (a snapshot is taken now)"""
+        self._queue.put(('save', json.loads(json.dumps(bill))))
+
+    def delete(self, bill_id):
+        """Queue a bill's file to be deleted"""
+        self._queue.put(('delete', bill_id))
+
+    def has(self, bill_id):
+        """Whether a file was written for the bill (it may have been archived since)"""
+        with self._lock:
+            return str(bill_id) in self._files
+
+    @property
+    def migrated(self):
+        """Whether the startup backfill has finished before (see mark_migrated)"""
+        return os.path.exists(self.marker_path)
+
+    def mark_migrated(self):
+        """Record that every bill has been queued; the marker is created once the queued writes succeed"""
+        self._queue.put(('migrated', None))
+
+    def flush(self):
+        """Wait until all queued writes are done"""
+        self._queue.join()
+
+    @property
+    def pending(self):
+        """Number of queued writes not done yet"""
+        return self._queue.unfinished_tasks
+
+    def _run(self):
+        while True:
+            op, value = self._queue.get()
+            try:
+                if op == 'save':
+                    self._write(value)
+                elif op == 'delete':
+                    self._remove(value)
+                elif not self._write_failed:
+                    open(self.marker_path, 'a', encoding='utf-8').close()
+            except Exception:
+                self._write_failed = True  # Bill files are a backup; the database has the bill
+            finally:
+                self._queue.task_done()
+
+    def _write(self, bill):
+        name = get_bill_file_name(bill)
+        path = os.path.join(self.bills_dir, *name.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(bill, f, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+
+        bill_id = str(bill['id'])
+        with self._lock:
+            old_name = self._files.get(bill_id)
+            self._files[bill_id] = name
+            if old_name != name:
+                self._append_manifest({'id': bill_id, 'file': name})
+        if old_name and old_name != name:
+            self._remove_file(old_name)  # Bill date changed: drop the file in the old shard
+
+    def _remove(self, bill_id):
+        bill_id = str(bill_id)
+        with self._lock:
+            name = self._files.pop(bill_id, None)
+            if name is None:
+                name = f"{bill_id}.json"  # Written before the folder was sharded
+            self._append_manifest({'id': bill_id, 'deleted': True})
+        self._remove_file(name)
+
+    def _remove_file(self, name):
+        try:
+            os.remove(os.path.join(self.bills_dir, *name.split('/')))
+        except OSError:
+            pass
+
+    def _append_manifest(self, record):
+        try:
+            if self._manifest is None:
+                os.makedirs(os.path.dirname(self.manifest_path) or '.', exist_ok=True)
+                self._manifest = open(self.manifest_path, 'a', encoding='utf-8')
+            self._manifest.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._manifest.flush()
+        except Exception:
+            pass  # A missing record only means the bill is written again at startup
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            self._seed_manifest()
+            return
+        deleted = set()
+        records = 0
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                for record_text in f:
+                    records += 1
+                    try:
+                        record = json.loads(record_text)
+                    except ValueError:
+                        continue  # Torn last record
+                    if record.get('deleted'):
+                        self._files.pop(record['id'], None)
+                        deleted.add(record['id'])
+                    else:
+                        self._files[record['id']] = record['file']
+                        deleted.discard(record['id'])
+        except Exception:
+            return
+        if records > len(self._files) + len(deleted):
+            self._compact_manifest(deleted)
+
+    def _compact_manifest(self, deleted):
+        """Rewrite the manifest with the latest record of each bill (deletes are kept for recovery)"""
+        try:
+            with open(self.manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+                for bill_id, name in self._files.items():
+                    f.write(json.dumps({'id': bill_id, 'file': name}, ensure_ascii=False) + "\n")
+                for bill_id in sorted(deleted):
+                    f.write(json.dumps({'id': bill_id, 'deleted': True}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(self.manifest_path + '.tmp', self.manifest_path)
+        except Exception:
+            pass  # The uncompacted manifest still works
+
+    def _seed_manifest(self):
+        """First run: record the bill files already on disk or archived (flat or sharded)"""
+        from archiver import get_archiver
+        names = set(get_archiver().archived_names('bills_json'))
+        for root, _, file_names in os.walk(self.bills_dir):
+            for file_name in file_names:
+                names.add(os.path.relpath(os.path.join(root, file_name), self.bills_dir).replace(os.sep, '/'))
+        with self._lock:
+            for name in sorted(names):
+                if name.endswith('.json'):
+                    bill_id = name.rsplit('/', 1)[-1][:-len('.json')]
+                    self._files[bill_id] = name
+                    self._append_manifest({'id': bill_id, 'file': name})
+            try:
+                open(self.manifest_path, 'a', encoding='utf-8').close()  # Seeded, even if empty
+            except OSError:
+                pass
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_bill_file_writer():
+    """Get the shared bill file writer"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BillFileWriter()
+        return _writer
@@ -0,0 +1,163 @@
+"""
+In-memory bill ID index for fast Bill ID search
+Supports exact match, prefix search (search-as-you-type) and ranges like DR0100-DR0200
+"""
+
+import bisect
+import re
+
+# Matches ranges like "DR0100-DR0200", "100-200" or "DR100 - 200"
+_RANGE_PATTERN = re.compile(r'^(?:DR)?\s*(\d+)\s*-\s*(?:DR)?\s*(\d+)$')
+
+
+def format_bill_id(numeric_id):
+    """Format a numeric bill number as DR0201 (DR + 4-digit number with leading zeros)"""
+    return f"DR{str(int(numeric_id)).zfill(4)}"
+
+
+def get_bill_numeric_id(bill):
+    """Get the numeric bill number (handles both DR0201 format and legacy numeric IDs)"""
+    numeric_id = bill.get('numeric_id')
+    if isinstance(numeric_id, (int, float)) and numeric_id:
+        return int(numeric_id)
+    bill_id = bill.get('id')
+    if isinstance(bill_id, (int, float)):
+        return int(bill_id)
+    if isinstance(bill_id, str) and bill_id.upper().startswith('DR'):
+        try:
+            return int(bill_id[2:].strip())
+        except ValueError:
+            return None
+    return None
+
+
+def get_bill_key(bill):
+    """Get the normalized DR0201-style ID used as the index key for a bill"""
+    numeric_id = get_bill_numeric_id(bill)
+    if numeric_id is not None:
+        return format_bill_id(numeric_id)
+    return str(bill.get('id', '')).upper().strip()
+
+
+class BillIdIndex:
+    """
+    Bill ID index backed by two sorted arrays:
+    - numeric bill numbers, for exact and range lookups
+    - normalized ID strings, for prefix lookups (a flattened prefix trie)
+    Lookups are binary searches, so they stay fast with millions of bills.
+    """
+
+    def __init__(self, bills=None):
+        self._bills = {}  # Normalized ID -> bill
+        self._numeric_ids = []  # Sorted numeric bill numbers
+        self._id_strings = []  # Sorted normalized ID strings
+        if bills:
+            self.rebuild(bills)
+
+    def __len__(self):
+        return len(self._bills)
+
+    def rebuild(self, bills):
+        """Rebuild the index from a list of bills"""
+        self._bills = {}
+        for bill in bills:
+            self._bills[get_bill_key(bill)] = bill
+        self._id_strings = sorted(self._bills)
+        self._numeric_ids = sorted(
+            n for n in (get_bill_numeric_id(b) for b in self._bills.values()) if n is not None
+        )
+
+    def add(self, bill):
+        """Add a bill to the index (replaces an existing bill with the same ID)"""
+        key = get_bill_key(bill)
+        if key in self._bills:
+            self._bills[key] = bill
+            return
+        self._bills[key] = bill
+        # New bills almost always have the highest number, so appending is the common case
+        if not self._id_strings or key > self._id_strings[-1]:
+            self._id_strings.append(key)
+        else:
+            bisect.insort(self._id_strings, key)
+        numeric_id = get_bill_numeric_id(bill)
+        if numeric_id is not None:
+            if not self._numeric_ids or numeric_id > self._numeric_ids[-1]:
+                self._numeric_ids.append(numeric_id)
+            else:
+                bisect.insort(self._numeric_ids, numeric_id)
+
+    def remove(self, bill_id):
+        """Remove a bill from the index by ID (supports both DR0201 format and numeric)"""
+        if isinstance(bill_id, (int, float)):
+            key = format_bill_id(bill_id)
+        else:
+            key = get_bill_key({'id': bill_id})
+        bill = self._bills.pop(key, None)
+        if bill is None:
+            return False
+        pos = bisect.bisect_left(self._id_strings, key)
+        if pos < len(self._id_strings) and self._id_strings[pos] == key:
+            self._id_strings.pop(pos)
+        numeric_id = get_bill_numeric_id(bill)
+        if numeric_id is not None:
+            pos = bisect.bisect_left(self._numeric_ids, numeric_id)
+            if pos < len(self._numeric_ids) and self._numeric_ids[pos] == numeric_id:
+                self._numeric_ids.pop(pos)
+        return True
+
+    def get(self, bill_id):
+        """Get a bill by exact ID (supports both DR0201 format and numeric)"""
+        if isinstance(bill_id, (int, float)):
+            return self._bills.get(format_bill_id(bill_id))
+        return self._bills.get(get_bill_key({'id': bill_id}))
+
+    def max_numeric_id(self):
+        """Get the highest bill number in the index (0 if empty)"""
+        return self._numeric_ids[-1] if self._numeric_ids else 0
+
+    def search(self, query, limit=None):
+        """
+        Search bills by ID
+        - "DR0201" or "DR02": exact or prefix match on the bill ID
+        - "201": bill number 201, plus bills whose number starts with 201
+        - "DR0100-DR0200" or "100-200": all bills in the number range (inclusive)
+        """
+        query = query.strip().upper().replace(' ', '')
+        if not query:
+            return []
+
+        range_match = _RANGE_PATTERN.match(query)
+        if range_match:
+            low, high = int(range_match.group(1)), int(range_match.group(2))
+            if low > high:
+                low, high = high, low
+            return self._range(low, high, limit)
+
+        if query.isdigit():
+            # Numeric search: exact bill number first, then bill numbers starting with the digits
+            results = []
+            exact = self._bills.get(format_bill_id(int(query)))
+            if exact is not None:
+                results.append(exact)
+            for bill in self._prefix('DR' + query, limit):
+                if bill is not exact:
+                    results.append(bill)
+            return results[:limit] if limit else results
+
+        return self._prefix(query, limit)
+
+    def _prefix(self, prefix, limit=None):
+        """Get bills whose normalized ID starts with prefix"""
+        start = bisect.bisect_left(self._id_strings, prefix)
+        end = bisect.bisect_left(self._id_strings, prefix + '\uffff', lo=start)
+        if limit:
+            end = min(end, start + limit)
+        return [self._bills[key] for key in self._id_strings[start:end]]
+
+    def _range(self, low, high, limit=None):
+        """Get bills whose number is between low and high (inclusive)"""
+        start = bisect.bisect_left(self._numeric_ids, low)
+        end = bisect.bisect_right(self._numeric_ids, high, lo=start)
+        if limit:
+            end = min(end, start + limit)
+        return [self._bills[format_bill_id(n)] for n in self._numeric_ids[start:end]]
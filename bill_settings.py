@@ -0,0 +1,139 @@
+"""
+Bill settings service
+Loads data/bill_settings.json once and keeps it in memory. While a window is watching, the file
+modification time is checked every couple of seconds; when the file changes (or settings are
+saved here) subscribed windows are notified on the UI thread.
+"""
+
+import json
+import os
+import tkinter as tk
+
+from config import (
+    DATA_DIR, DEFAULT_BILL_WIDTH_MM, DEFAULT_BILL_HEIGHT_MM, DEFAULT_CHARACTER_WIDTH,
+    DEFAULT_ALIGNMENT, DEFAULT_MARGIN_TOP, DEFAULT_MARGIN_BOTTOM, DEFAULT_MARGIN_LEFT,
+    DEFAULT_MARGIN_RIGHT, DEFAULT_RECEIPT_PRINTER
+)
+
+BILL_SETTINGS_FILE = os.path.join(DATA_DIR, "bill_settings.json")
+
+DEFAULT_BILL_SETTINGS = {
+    'width_mm': DEFAULT_BILL_WIDTH_MM,
+    'height_mm': DEFAULT_BILL_HEIGHT_MM,
+    'char_width': DEFAULT_CHARACTER_WIDTH,
+    'paper_width_preset': '80mm',
+    'alignment': DEFAULT_ALIGNMENT,
+    'margin_top': DEFAULT_MARGIN_TOP,
+    'margin_bottom': DEFAULT_MARGIN_BOTTOM,
+    'margin_left': DEFAULT_MARGIN_LEFT,
+    'margin_right': DEFAULT_MARGIN_RIGHT,
+    'printer': DEFAULT_RECEIPT_PRINTER  # ESC/POS printer target (empty: system print command)
+}
+
+# How often watched settings check the file for changes
+WATCH_INTERVAL_MS = 2000
+
+
+def _widget_exists(widget):
+    try:
+        return bool(widget.winfo_exists())
+    except tk.TclError:
+        return False
+
+
+class BillSettingsService:
+    """Cached bill settings with change notifications"""
+
+    def __init__(self, path=BILL_SETTINGS_FILE):
+        self.path = path
+        self.version = 0  # Incremented whenever settings change
+        self._settings = None
+        self._mtime = None
+        self._subscribers = []  # (widget, callback) pairs
+        self._watch_job = None
+        self._watch_widget = None
+
+    def get(self):
+        """Get bill settings (read from the file only on first use)"""
+        if self._settings is None:
+            self._load()
+        return dict(self._settings)
+
+    def save(self, settings):
+        """
+        Save bill settings to file and notify subscribers
+        Settings not given keep their current values (callers may save only the ones they edit)
+        """
+        settings = {**self.get(), **settings}
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(settings, f, indent=2)
+        self._settings = settings
+        self._mtime = self._get_mtime()
+        self.version += 1
+        self._notify()
+
+    def check_for_changes(self):
+        """Reload settings if the file changed on disk; returns True if it did"""
+        if self._settings is not None and self._get_mtime() == self._mtime:
+            return False
+        self._load()
+        self._notify()
+        return True
+
+    def subscribe(self, widget, callback=None):
+        """
+        Call callback(settings) when settings change, while widget exists
+        Subscribing also keeps the file watched (callback may be None just for that)
+        """
+        self._subscribers.append((widget, callback))
+        # Checks run on the Tk root, which outlives the subscribed screens; restart them if the
+        # root they ran on was destroyed (a new one was created)
+        if self._watch_job is None or not _widget_exists(self._watch_widget):
+            self._schedule_watch()
+
+    def unsubscribe(self, callback):
+        """Stop notifying callback"""
+        self._subscribers = [(w, c) for w, c in self._subscribers if c != callback]
+
+    def _load(self):
+        self._mtime = self._get_mtime()
+        settings = dict(DEFAULT_BILL_SETTINGS)
+        try:
+            if self._mtime is not None:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    settings.update(json.load(f))
+        except Exception:
+            pass  # Use defaults on error
+        self._settings = settings
+        self.version += 1
+
+    def _get_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _notify(self):
+        for widget, callback in list(self._subscribers):
+            if callback and _widget_exists(widget):
+                try:
+                    callback(self.get())
+                except Exception:
+                    pass  # One broken window must not stop the others
+
+    def _schedule_watch(self):
+        self._watch_job = None
+        self._subscribers = [(w, c) for w, c in self._subscribers if _widget_exists(w)]
+        if self._subscribers:
+            self._watch_widget = self._subscribers[-1][0]._root()
+            self._watch_job = self._watch_widget.after(WATCH_INTERVAL_MS, self._watch)
+
+    def _watch(self):
+        self._watch_job = None
+        self.check_for_changes()
+        self._schedule_watch()
+
+
+# Shared settings service
+bill_settings = BillSettingsService()
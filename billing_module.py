@@ -4,8 +4,23 @@ Billing module for creating and managing bills
 
 import tkinter as tk
 from tkinter import ttk, messagebox
+from datetime import datetime
 from database import db
-from receipt_generator import generate_receipt
+from inventory_index import InventoryIndex
+from cart import Cart
+from scan_input import ScanBuffer
+from item_search import ItemSearchIndex
+from hot_items import HotItemRanking
+from bill_committer import get_bill_committer
+from bill_file_writer import get_bill_file_writer
+from cart_journal import CartJournal, get_cart_journal_path
+from bill_settings import bill_settings
+
+# Quick-add buttons shown for the most sold items
+HOT_ITEM_BUTTONS = 12
+HOT_ITEM_COLUMNS = 4
+# Delay before the hot item ranking is saved after a sale (one write per run of sales)
+HOT_ITEMS_SAVE_DELAY_MS = 5000
 
 class BillingModule:
     """Module for creating bills with item entry, preview, and receipt generation"""
@@ -16,11 +31,30 @@ class BillingModule:
         self.theme_manager = theme_manager
         self.on_bill_created_callback = on_bill_created_callback
         
-        # Current bill items
-        self.current_bill_items = []
+        # Current bill items, keyed by inventory ID (journaled so a crash never loses a sale)
+        self.cart_journal = CartJournal(get_cart_journal_path(user['id']))
+        self.cart = Cart(journal=self.cart_journal)
+        
+        # Barcode/ID index over inventory, warmed below and rebuilt only after inventory changes
+        self.inventory_index = InventoryIndex(db)
+        # Typeahead search over item name, category and barcode (rebuilt with the inventory index)
+        self.item_search_index = ItemSearchIndex()
+        self.item_search_version = None
+        self.item_search_results = []  # Item IDs shown in the results list
+        # Most sold items (decayed by age) for the quick-add buttons
+        self.hot_items = HotItemRanking()
+        self._hot_items_save_job = None
+        # Saves bills in the background so checkout never waits on storage
+        self.bill_committer = get_bill_committer(db)
         
         self._create_interface()
         self._load_inventory_dropdown()
+        self._restore_cart()
+        self._poll_bill_commits()
+        
+        # Load bill settings now and keep them watched, so checkout does no settings file I/O
+        bill_settings.get()
+        bill_settings.subscribe(self.parent)
     
     def _create_interface(self):
         """Create the billing interface"""
@@ -71,27 +105,87 @@ class BillingModule:
             borderwidth=2
         )
         self.barcode_entry.pack(fill=tk.X, ipady=8)
-        self.barcode_entry.bind('<Return>', lambda e: self._scan_barcode())
-        self.barcode_entry.bind('<KeyRelease>', self._on_barcode_typing)
+        # Buffers scanner keystrokes and applies complete barcodes in batches
+        self.scan_buffer = ScanBuffer(self.barcode_entry, self.barcode_var, self._apply_scans)
         # Focus on barcode entry by default for quick scanning
         self.barcode_entry.focus_set()
         
+        # Quick-add buttons for the most sold items
+        hot_items_frame = tk.LabelFrame(
+            left_frame,
+            text="⚡ Quick Add",
+            bg=self.theme_manager.get_color('bg'),
+            fg=self.theme_manager.get_color('fg'),
+            font=('Arial', 10, 'bold'),
+            padx=5,
+            pady=5
+        )
+        hot_items_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        self.hot_item_buttons = []
+        for index in range(HOT_ITEM_BUTTONS):
+            btn = tk.Button(
+                hot_items_frame,
+                font=('Arial', 9, 'bold'),
+                bg=self.theme_manager.get_color('secondary_bg'),
+                fg=self.theme_manager.get_color('fg'),
+                relief=tk.FLAT,
+                wraplength=110,
+                height=2,
+                cursor='hand2'
+            )
+            btn.grid(row=index // HOT_ITEM_COLUMNS, column=index % HOT_ITEM_COLUMNS, sticky='nsew', padx=2, pady=2)
+            btn.grid_remove()
+            self.hot_item_buttons.append(btn)
+        for column in range(HOT_ITEM_COLUMNS):
+            hot_items_frame.columnconfigure(column, weight=1)
+        self.hot_items_empty_label = tk.Label(
+            hot_items_frame,
+            text="Most sold items will appear here",
+            bg=self.theme_manager.get_color('bg'),
+            fg=self.theme_manager.get_color('fg'),
+            font=('Arial', 9)
+        )
+        self.hot_items_empty_label.grid(row=0, column=0, columnspan=HOT_ITEM_COLUMNS)
+        
         # Item selection
         item_frame = tk.Frame(left_frame, bg=self.theme_manager.get_color('bg'))
         item_frame.pack(fill=tk.X, pady=10)
         
         tk.Label(
             item_frame,
-            text="Select Item:",
+            text="Search Item (name, category or barcode):",
             bg=self.theme_manager.get_color('bg'),
             fg=self.theme_manager.get_color('fg'),
             font=('Arial', 10)
         ).pack(anchor='w', pady=(0, 5))
         
         self.item_var = tk.StringVar()
-        self.item_combo = ttk.Combobox(item_frame, textvariable=self.item_var, state='readonly', width=30)
-        self.item_combo.pack(fill=tk.X, ipady=5)
-        self.item_combo.bind('<<ComboboxSelected>>', self._on_item_selected)
+        self.item_search_entry = tk.Entry(
+            item_frame,
+            textvariable=self.item_var,
+            font=('Arial', 10),
+            bg=self.theme_manager.get_color('entry_bg'),
+            fg=self.theme_manager.get_color('entry_fg')
+        )
+        self.item_search_entry.pack(fill=tk.X, ipady=5)
+        self.item_search_entry.bind('<KeyRelease>', self._on_item_search)
+        self.item_search_entry.bind('<Down>', self._focus_item_results)
+        self.item_search_entry.bind('<Return>', self._on_item_search_return)
+        
+        self.item_results_list = tk.Listbox(
+            item_frame,
+            height=6,
+            font=('Arial', 10),
+            bg=self.theme_manager.get_color('entry_bg'),
+            fg=self.theme_manager.get_color('entry_fg'),
+            activestyle='none',
+            exportselection=False
+        )
+        self.item_results_list.pack(fill=tk.X, pady=(2, 0))
+        self.item_results_list.bind('<<ListboxSelect>>', self._on_item_selected)
+        self.item_results_list.bind('<Return>', lambda e: self._add_item_to_bill())
+        self.item_results_list.bind('<Double-1>', lambda e: self._add_item_to_bill())
         
         # Quantity with +/- buttons
         quantity_frame = tk.Frame(left_frame, bg=self.theme_manager.get_color('bg'))
@@ -407,31 +501,112 @@ class BillingModule:
         create_bill_btn.pack(fill=tk.X, expand=True)
         create_bill_btn.bind('<Enter>', lambda e: create_bill_btn.config(bg='#229954'))
         create_bill_btn.bind('<Leave>', lambda e: create_bill_btn.config(bg='#27AE60'))
+        
+        # Background save status
+        self.commit_status_label = tk.Label(
+            right_frame,
+            text="",
+            bg=self.theme_manager.get_color('bg'),
+            fg=self.theme_manager.get_color('fg'),
+            font=('Arial', 9)
+        )
+        self.commit_status_label.pack(fill=tk.X)
     
     def _load_inventory_dropdown(self):
-        """Load inventory items into dropdown"""
-        inventory = db.get_all_inventory()
-        item_list = [f"{item['name']} - ₹{item['price']:.2f}" for item in inventory]
-        self.item_combo['values'] = item_list
+        """Load inventory items into the item search (only rebuilt when inventory changed)"""
         self.selected_inventory_item = None
+        self._on_item_search()
+        self._refresh_hot_items()
     
-    def _on_item_selected(self, event=None):
-        """Handle item selection from dropdown"""
-        selection = self.item_var.get()
-        if not selection:
+    def _refresh_hot_items(self):
+        """Show the most sold items on the quick-add buttons"""
+        hot_items = []
+        for item_id in self.hot_items.top(HOT_ITEM_BUTTONS * 2):
+            item = self.inventory_index.get(item_id)
+            if item:  # Skip items deleted from inventory
+                hot_items.append(item)
+            if len(hot_items) == HOT_ITEM_BUTTONS:
+                break
+        
+        for index, btn in enumerate(self.hot_item_buttons):
+            if index < len(hot_items):
+                item = hot_items[index]
+                btn.config(
+                    text=f"{item['name']}\n₹{item['price']:.2f}",
+                    command=lambda item_id=item['id']: self._quick_add_item(item_id)
+                )
+                btn.grid()
+            else:
+                btn.grid_remove()
+        
+        if hot_items:
+            self.hot_items_empty_label.grid_remove()
+        else:
+            self.hot_items_empty_label.grid()
+    
+    def _quick_add_item(self, item_id):
+        """Add one of a hot item to the bill"""
+        item = self.inventory_index.get(item_id)
+        if not item:
+            self._refresh_hot_items()
+            return
+        key = self.cart.add(item, 1)
+        self._update_bill_line(key)
+        self.barcode_entry.focus_set()
+    
+    def _refresh_item_search_index(self):
+        """Rebuild the item search index if inventory changed since it was built"""
+        inventory = self.inventory_index.refresh()
+        if self.item_search_version != self.inventory_index.builds:
+            self.item_search_index.rebuild(inventory)
+            self.item_search_version = self.inventory_index.builds
+    
+    def _on_item_search(self, event=None):
+        """Show ranked matches for the typed text"""
+        if event is not None and event.keysym in ('Up', 'Down', 'Return', 'KP_Enter', 'Tab'):
             return
+        self._refresh_item_search_index()
         
-        # Extract item name
-        item_name = selection.split(' - ')[0]
-        inventory = db.get_all_inventory()
+        self.item_search_results = []
+        self.item_results_list.delete(0, tk.END)
+        for item_id in self.item_search_index.search(self.item_var.get(), limit=20):
+            item = self.inventory_index.get(item_id)
+            if not item:
+                continue  # Deleted since the search index was built
+            self.item_search_results.append(item_id)
+            self.item_results_list.insert(tk.END, f"{item['name']} - ₹{item['price']:.2f} ({item['category']})")
+    
+    def _focus_item_results(self, event=None):
+        """Move from the search box to the first result"""
+        if self.item_search_results:
+            self.item_results_list.focus_set()
+            self.item_results_list.selection_clear(0, tk.END)
+            self.item_results_list.selection_set(0)
+            self.item_results_list.activate(0)
+            self._on_item_selected()
+        return 'break'
+    
+    def _on_item_search_return(self, event=None):
+        """Add the best match to the bill"""
+        if self.item_search_results:
+            self.item_results_list.selection_clear(0, tk.END)
+            self.item_results_list.selection_set(0)
+            self._on_item_selected()
+            self._add_item_to_bill()
+        return 'break'
+    
+    def _on_item_selected(self, event=None):
+        """Handle item selection from the search results"""
+        selection = self.item_results_list.curselection()
+        if not selection or selection[0] >= len(self.item_search_results):
+            return
         
-        for item in inventory:
-            if item['name'] == item_name:
-                self.selected_inventory_item = item
-                self.item_details_label.config(
-                    text=f"Price: ₹{item['price']:.2f} | Category: {item['category']}"
-                )
-                break
+        item = self.inventory_index.get(self.item_search_results[selection[0]])
+        if item:
+            self.selected_inventory_item = item
+            self.item_details_label.config(
+                text=f"Price: ₹{item['price']:.2f} | Category: {item['category']}"
+            )
     
     def _increase_quantity(self):
         """Increase quantity by 1"""
@@ -471,118 +646,52 @@ class BillingModule:
             if quantity <= 0:
                 raise ValueError("Quantity must be positive")
             
-            item = {
-                'name': self.selected_inventory_item['name'],
-                'quantity': quantity,
-                'price': self.selected_inventory_item['price'],
-                'total': self.selected_inventory_item['price'] * quantity,
-                'inventory_id': self.selected_inventory_item['id']
-            }
-            
-            # Check if item already exists in cart
-            existing_item = None
-            for cart_item in self.current_bill_items:
-                if cart_item.get('inventory_id') == item['inventory_id']:
-                    existing_item = cart_item
-                    break
-            
-            if existing_item:
-                # Update quantity for existing item
-                existing_item['quantity'] += quantity
-                existing_item['total'] = existing_item['price'] * existing_item['quantity']
-            else:
-                # Add new item to cart
-                self.current_bill_items.append(item)
-            
-            self._update_bill_preview()
+            # Adds a new line or increases quantity of the existing one
+            key = self.cart.add(self.selected_inventory_item, quantity)
+            self._update_bill_line(key)
             
             # Reset selection
             self.item_var.set('')
             self.quantity_var.set('1')
             self.selected_inventory_item = None
             self.item_details_label.config(text="")
+            self._on_item_search()
             
         except ValueError:
             messagebox.showerror("Error", "Please enter a valid quantity")
     
-    def _on_barcode_typing(self, event):
-        """Handle barcode typing - auto-submit when full barcode is entered"""
-        barcode_value = self.barcode_var.get().strip().upper()
-        # Auto-submit when barcode reaches 10 characters (DROP + 6 digits)
-        # This handles barcode scanners that don't send Enter key
-        if len(barcode_value) == 10 and barcode_value.startswith('DROP'):
-            # Small delay to ensure all characters are captured
-            self.barcode_entry.after(50, self._scan_barcode)
-    
-    def _scan_barcode(self):
-        """Scan barcode and automatically add item to cart"""
-        barcode_value = self.barcode_var.get().strip().upper()
-        
-        if not barcode_value:
-            return
-        
-        # Parse barcode: Format is DROP000001 (DROP + 6 digits)
-        if not barcode_value.startswith('DROP') or len(barcode_value) != 10:
-            messagebox.showerror("Invalid Barcode", "Invalid barcode format. Expected: DROP000001")
-            self.barcode_var.set('')
-            self.barcode_entry.focus_set()
-            return
-        
-        try:
-            # Extract item ID from barcode (last 6 digits)
-            item_id = int(barcode_value[4:])
+    def _apply_scans(self, barcodes):
+        """Add a batch of scanned barcodes to the cart (called once per frame by the scan buffer)"""
+        touched_keys = []
+        errors = []
+        for barcode_value in barcodes:
+            barcode_value = barcode_value.strip().upper()
             
-            # Find item in inventory
-            inventory_items = db.get_all_inventory()
-            item = None
-            for inv_item in inventory_items:
-                if inv_item['id'] == item_id:
-                    item = inv_item
-                    break
+            # Parse barcode: Format is DROP000001 (DROP + 6 digits)
+            if not barcode_value.startswith('DROP') or len(barcode_value) != 10 or not barcode_value[4:].isdigit():
+                errors.append(f"{barcode_value}: invalid barcode format (expected DROP000001)")
+                continue
             
+            # Find item in the in-memory barcode index (no storage reads)
+            item = self.inventory_index.lookup_barcode(barcode_value)
             if not item:
-                messagebox.showerror("Item Not Found", f"Item with barcode {barcode_value} not found in inventory")
-                self.barcode_var.set('')
-                self.barcode_entry.focus_set()
-                return
-            
-            # Check if item already exists in cart
-            existing_item = None
-            for cart_item in self.current_bill_items:
-                if cart_item.get('inventory_id') == item['id']:
-                    existing_item = cart_item
-                    break
-            
-            if existing_item:
-                # Increase quantity by 1 for existing item
-                existing_item['quantity'] += 1
-                existing_item['total'] = existing_item['price'] * existing_item['quantity']
-            else:
-                # Add new item with quantity 1
-                new_item = {
-                    'name': item['name'],
-                    'quantity': 1,
-                    'price': item['price'],
-                    'total': item['price'],
-                    'inventory_id': item['id']
-                }
-                self.current_bill_items.append(new_item)
+                errors.append(f"{barcode_value}: item not found in inventory")
+                continue
             
-            # Update bill preview
-            self._update_bill_preview()
-            
-            # Clear barcode field and refocus for next scan
-            self.barcode_var.set('')
-            self.barcode_entry.focus_set()
-            
-        except ValueError:
-            messagebox.showerror("Invalid Barcode", "Barcode contains invalid characters")
-            self.barcode_var.set('')
-            self.barcode_entry.focus_set()
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to scan barcode: {str(e)}")
-            self.barcode_var.set('')
-            self.barcode_entry.focus_set()
+            # Add with quantity 1 (or increase quantity of the existing line)
+            key = self.cart.add(item, 1)
+            if key not in touched_keys:
+                touched_keys.append(key)
+        
+        # Update only the touched lines, then the total once
+        for key in touched_keys:
+            self._update_bill_line(key, update_total=False)
+        if touched_keys:
+            self._update_total_label()
+        
+        if errors:
+            messagebox.showerror("Scan Error", "\n".join(errors))
+        self.barcode_entry.focus_set()
     
     def _add_custom_item(self):
         """Add custom item to bill"""
@@ -599,16 +708,8 @@ class BillingModule:
                 messagebox.showerror("Error", "Price and quantity must be positive")
                 return
             
-            item = {
-                'name': name,
-                'quantity': quantity,
-                'price': price,
-                'total': price * quantity,
-                'inventory_id': None  # Custom item, no inventory ID
-            }
-            
-            self.current_bill_items.append(item)
-            self._update_bill_preview()
+            key = self.cart.add_custom(name, price, quantity)
+            self._update_bill_line(key)
             
             # Reset custom fields
             self.custom_name_var.set('')
@@ -619,23 +720,40 @@ class BillingModule:
             messagebox.showerror("Error", "Please enter valid price and quantity")
     
     def _update_bill_preview(self):
-        """Update the bill preview display"""
-        # Clear existing items
-        for item in self.bill_tree.get_children():
-            self.bill_tree.delete(item)
-        
-        # Add current items
-        for item in self.current_bill_items:
-            self.bill_tree.insert('', 'end', values=(
-                item['name'],
-                item['quantity'],
-                f"₹{item['price']:.2f}",
-                f"₹{item['total']:.2f}"
-            ))
-        
-        # Update total
-        total = sum(item['total'] for item in self.current_bill_items)
-        self.total_label.config(text=f"Total: ₹{total:.2f}")
+        """Redraw the whole bill preview display (used when the cart is cleared)"""
+        children = self.bill_tree.get_children()
+        if children:
+            self.bill_tree.delete(*children)
+        self.cart.clear_handles()
+        
+        for key in self.cart.keys():
+            self._update_bill_line(key, update_total=False)
+        
+        self._update_total_label()
+    
+    def _update_bill_line(self, key, update_total=True):
+        """Insert or update the preview row of one cart line"""
+        line = self.cart.get(key)
+        values = (
+            line['name'],
+            line['quantity'],
+            f"₹{line['price']:.2f}",
+            f"₹{line['total']:.2f}"
+        )
+        handle = self.cart.get_handle(key)
+        if handle is None:
+            handle = self.bill_tree.insert('', 'end', values=values)
+            self.cart.set_handle(key, handle)
+        else:
+            self.bill_tree.item(handle, values=values)
+        self.bill_tree.see(handle)
+        
+        if update_total:
+            self._update_total_label()
+    
+    def _update_total_label(self):
+        """Show the cart's running total"""
+        self.total_label.config(text=f"Total: ₹{self.cart.total:.2f}")
     
     def _remove_selected_item(self):
         """Remove selected item from bill"""
@@ -644,54 +762,136 @@ class BillingModule:
             messagebox.showwarning("Warning", "Please select an item to remove")
             return
         
-        index = self.bill_tree.index(selection[0])
-        if 0 <= index < len(self.current_bill_items):
-            self.current_bill_items.pop(index)
-            self._update_bill_preview()
+        handle = selection[0]
+        key = self.cart.get_key(handle)
+        if key is not None:
+            self.cart.remove(key)
+            self.bill_tree.delete(handle)
+            self._update_total_label()
     
     def _clear_bill(self):
         """Clear all items from bill"""
-        if not self.current_bill_items:
+        if not self.cart:
             return
         
         if messagebox.askyesno("Confirm", "Are you sure you want to clear the bill?"):
-            self.current_bill_items = []
+            self.cart.clear()
             self._update_bill_preview()
     
     def _create_bill(self):
         """Create bill in database and show preview"""
-        if not self.current_bill_items:
+        if not self.cart:
             messagebox.showwarning("Warning", "Bill is empty. Please add items.")
             return
         
-        # Calculate total
-        total = sum(item['total'] for item in self.current_bill_items)
+        items = self.cart.items
+        total = self.cart.total
+        payment_method = self.payment_var.get()
         
-        # Create bill
-        bill = db.create_bill(
-            self.user['id'],
-            self.current_bill_items,
-            total,
-            self.payment_var.get()
-        )
+        # Reserve the bill number and save the bill in the background
+        bill_id = db.reserve_bill_id()
+        try:
+            # Returns once the sale is in the on-disk commit queue
+            self.bill_committer.submit(self.user['id'], items, total, payment_method, bill_id, datetime.now())
+        except OSError as e:
+            # Not recorded anywhere else yet: keep the cart (and its journal) so the sale is not lost
+            messagebox.showerror("Error", f"Could not record the bill, please try again:\n\n{str(e)}")
+            return
+        
+        # The commit queue holds the sale until it is saved, so the cart journal can be emptied
+        # and the next customer scanned right away
+        self.cart.clear()
+        self._update_bill_preview()
+        
+        # Update hot items ranking with this sale
+        self.hot_items.record_sale(items)
+        self._schedule_hot_items_save()
+        self._refresh_hot_items()
+        self._update_commit_status()
         
         # Show bill preview with bill ID
         from bill_preview import BillPreview
         preview = BillPreview(
             self.parent,
-            self.current_bill_items,
+            items,
             total,
-            self.payment_var.get(),
+            payment_method,
             self.user,
-            bill_id=bill['id']
+            bill_id=bill_id
         )
-        
-        # Clear bill after creation
-        self.current_bill_items = []
+    
+    def _restore_cart(self):
+        """Restore an unfinished bill from the cart journal (app closed or killed mid-sale)"""
+        entries = self.cart_journal.restore()
+        if not entries:
+            return
+        self.cart.load(entries)
+        self.cart_journal.compact(entries)
         self._update_bill_preview()
-        self._load_inventory_dropdown()  # Refresh inventory
-        
-        # Callback
-        if self.on_bill_created_callback:
-            self.on_bill_created_callback()
+        self.item_details_label.config(text=f"Restored {len(entries)} item(s) from the unfinished bill")
+    
+    def _poll_bill_commits(self):
+        """Check background saves (runs every 300 ms while the billing screen exists)"""
+        try:
+            if self.bill_committer.take_committed() and self.on_bill_created_callback:
+                self.on_bill_created_callback()
+            for reserved_id, saved_id in self.bill_committer.take_renumbered():
+                messagebox.showwarning(
+                    "Bill Number Changed",
+                    f"Bill {reserved_id} was saved as {saved_id} because another till used {reserved_id}.\n\n"
+                    "Please reprint the receipt if it was already printed."
+                )
+            failed = self.bill_committer.take_failed()
+            if failed:
+                details = "\n".join(f"{bill_id}: {error}" for bill_id, error in failed)
+                if messagebox.askretrycancel(
+                    "Bill Not Saved",
+                    f"These bills could not be saved:\n{details}\n\n"
+                    "They are kept on disk; choose Retry to save them again."
+                ):
+                    self.bill_committer.retry_failed()
+            self._update_commit_status()
+            self.commit_status_label.after(300, self._poll_bill_commits)
+        except tk.TclError:
+            pass  # Billing screen was closed
+    
+    def _update_commit_status(self):
+        """Show the background save status below the Create Bill button"""
+        committer = self.bill_committer
+        pending = committer.pending
+        if committer.last_error is not None:
+            text = f"⚠ Saving {committer.current_bill_id} failed, retrying ({committer.attempts}): {committer.last_error}"
+            color = self.theme_manager.get_color('danger')
+        elif pending:
+            text = f"⏳ Saving {pending} bill(s)..."
+            color = self.theme_manager.get_color('fg')
+        elif committer.failed_count:
+            text = f"⚠ {committer.failed_count} bill(s) could not be saved"
+            color = self.theme_manager.get_color('danger')
+        else:
+            text = "✓ All bills saved"
+            color = self.theme_manager.get_color('success')
+        self.commit_status_label.config(text=text, fg=color)
+    
+    def _schedule_hot_items_save(self):
+        """Save the hot item ranking shortly after the last sale instead of after every sale"""
+        if self._hot_items_save_job is None:
+            self._hot_items_save_job = self.commit_status_label.after(HOT_ITEMS_SAVE_DELAY_MS, self._save_hot_items)
+    
+    def _save_hot_items(self):
+        self._hot_items_save_job = None
+        self.hot_items.save()
+    
+    def wait_for_pending_bills(self, timeout=10):
+        """Wait for background saves to finish (before logout/exit); returns False on timeout"""
+        if self._hot_items_save_job is not None:
+            try:
+                self.commit_status_label.after_cancel(self._hot_items_save_job)
+            except tk.TclError:
+                pass
+            self._save_hot_items()
+        if not self.bill_committer.wait(timeout):
+            return False
+        get_bill_file_writer().flush()
+        return True
 
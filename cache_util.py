@@ -0,0 +1,37 @@
+"""
+Small in-memory caching helpers
+"""
+
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Bounded least-recently-used cache"""
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """Get a cached value and mark it as recently used"""
+        if key not in self._entries:
+            return default
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entry if the cache is full"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all cached values"""
+        self._entries.clear()
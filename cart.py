@@ -0,0 +1,142 @@
+"""
+Cart model for the billing screen
+Lines are keyed by inventory ID with a running total, so adding a scanned item updates one
+line instead of searching and re-summing the whole bill
+"""
+
+
+class Cart:
+    """
+    Bill lines keyed by inventory ID (custom items get their own 'custom-N' key)
+    Each line is a bill item dict: name, quantity, price, total, inventory_id
+    Changes are written to journal (a CartJournal) when one is given
+    """
+
+    def __init__(self, journal=None):
+        self.journal = journal
+        self._lines = {}  # Key -> line, in the order lines were added
+        self._handles = {}  # Key -> Treeview item handle showing the line
+        self._keys_by_handle = {}  # Treeview item handle -> key
+        self._custom_count = 0
+        self.total = 0.0
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __bool__(self):
+        return bool(self._lines)
+
+    @property
+    def items(self):
+        """Get cart lines in the order they were added (bill items format)"""
+        return list(self._lines.values())
+
+    def keys(self):
+        """Get line keys in the order lines were added"""
+        return list(self._lines)
+
+    def get(self, key):
+        """Get a cart line by key"""
+        return self._lines.get(key)
+
+    def add(self, inventory_item, quantity=1):
+        """
+        Add an inventory item (increases quantity if it is already in the cart)
+        Returns the line key
+        """
+        key = inventory_item['id']
+        line = self._lines.get(key)
+        if line is None:
+            line = {
+                'name': inventory_item['name'],
+                'quantity': 0,
+                'price': inventory_item['price'],
+                'total': 0.0,
+                'inventory_id': inventory_item['id']
+            }
+            self._lines[key] = line
+        self._set_quantity(line, line['quantity'] + quantity)
+        self._journal_set(key, line)
+        return key
+
+    def add_custom(self, name, price, quantity=1):
+        """Add a custom item (always a new line, no inventory ID); returns the line key"""
+        self._custom_count += 1
+        key = f"custom-{self._custom_count}"
+        line = {
+            'name': name,
+            'quantity': 0,
+            'price': price,
+            'total': 0.0,
+            'inventory_id': None  # Custom item, no inventory ID
+        }
+        self._lines[key] = line
+        self._set_quantity(line, quantity)
+        self._journal_set(key, line)
+        return key
+
+    def remove(self, key):
+        """Remove a line; returns the removed line (None if not in the cart)"""
+        line = self._lines.pop(key, None)
+        if line is None:
+            return None
+        self.total -= line['total']
+        handle = self._handles.pop(key, None)
+        self._keys_by_handle.pop(handle, None)
+        if not self._lines:
+            self.total = 0.0  # Drop float drift once the cart is empty
+        if self.journal:
+            self.journal.record_remove(key)
+        return line
+
+    def clear(self):
+        """Remove all lines"""
+        self._lines = {}
+        self._handles = {}
+        self._keys_by_handle = {}
+        self.total = 0.0
+        if self.journal:
+            self.journal.truncate()
+
+    def load(self, entries):
+        """Replace the cart with (key, line) entries, e.g. restored from the journal"""
+        self._lines = {}
+        self._handles = {}
+        self._keys_by_handle = {}
+        self.total = 0.0
+        for key, line in entries:
+            self._lines[key] = line
+            self.total += line['total']
+            if isinstance(key, str) and key.startswith('custom-'):
+                try:
+                    self._custom_count = max(self._custom_count, int(key[len('custom-'):]))
+                except ValueError:
+                    pass
+
+    def get_handle(self, key):
+        """Get the Treeview item handle showing a line"""
+        return self._handles.get(key)
+
+    def set_handle(self, key, handle):
+        """Remember the Treeview item handle showing a line"""
+        self._handles[key] = handle
+        self._keys_by_handle[handle] = key
+
+    def clear_handles(self):
+        """Forget all Treeview item handles (after the preview rows were deleted)"""
+        self._handles = {}
+        self._keys_by_handle = {}
+
+    def get_key(self, handle):
+        """Get the line key shown by a Treeview item handle"""
+        return self._keys_by_handle.get(handle)
+
+    def _journal_set(self, key, line):
+        if self.journal:
+            self.journal.record_set(key, line)
+
+    def _set_quantity(self, line, quantity):
+        new_total = line['price'] * quantity
+        self.total += new_total - line['total']
+        line['quantity'] = quantity
+        line['total'] = new_total
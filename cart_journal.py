@@ -0,0 +1,139 @@
+"""
+Crash-safe journal of the cart being billed
+Every cart change is appended to a small JSON Lines file and flushed to the OS at once, so a
+killed app loses nothing; fsync (for power loss) is batched so the scan path stays fast.
+The journal is replayed at login and truncated on clear, or on checkout once the sale is in
+the bill commit queue on disk (see bill_committer.py), which keeps it until the bill is saved.
+"""
+
+import json
+import os
+import threading
+import time
+
+from config import DATA_DIR
+
+# Seconds between fsync calls; changes in between are flushed but synced together
+FSYNC_INTERVAL = 0.5
+
+
+def get_cart_journal_path(user_id):
+    """Get the journal file of a user's cart"""
+    return os.path.join(DATA_DIR, f"cart_journal_{user_id}.jsonl")
+
+
+class CartJournal:
+    """Append-only log of cart lines: set (line added or changed) and remove records"""
+
+    def __init__(self, path, fsync_interval=FSYNC_INTERVAL):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._last_fsync = 0.0
+        self._fsync_timer = None
+        self._lock = threading.Lock()
+
+    def record_set(self, key, line):
+        """Record a cart line's current state"""
+        self._append({'op': 'set', 'key': key, 'line': line})
+
+    def record_remove(self, key):
+        """Record a removed cart line"""
+        self._append({'op': 'remove', 'key': key})
+
+    def restore(self):
+        """
+        Replay the journal; returns [(key, line), ...] in cart order
+        A torn last record (the app was killed mid-write) is ignored
+        """
+        lines = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for record_text in f:
+                    try:
+                        record = json.loads(record_text)
+                    except ValueError:
+                        break
+                    if record.get('op') == 'set':
+                        lines[record['key']] = record['line']
+                    elif record.get('op') == 'remove':
+                        lines.pop(record['key'], None)
+        except Exception:
+            return []  # No journal (or unreadable): nothing to restore
+        return list(lines.items())
+
+    def compact(self, entries):
+        """Rewrite the journal with just the given (key, line) entries"""
+        with self._lock:
+            self._close()
+            try:
+                temp_path = self.path + '.tmp'
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    for key, line in entries:
+                        f.write(json.dumps({'op': 'set', 'key': key, 'line': line}, ensure_ascii=False) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.path)
+            except Exception:
+                pass
+
+    def truncate(self):
+        """Empty the journal (checkout or clear)"""
+        with self._lock:
+            self._close()
+            try:
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    f.flush()
+                    os.fsync(f.fileno())
+            except Exception:
+                pass
+
+    def close(self):
+        """Sync and close the journal file"""
+        with self._lock:
+            self._close()
+
+    def _append(self, record):
+        with self._lock:
+            try:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                    self._file = open(self.path, 'a', encoding='utf-8')
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._file.flush()  # In the OS now: survives the app being killed
+            except Exception:
+                return  # Journal is best effort; never interrupt billing
+
+            now = time.monotonic()
+            if now - self._last_fsync >= self.fsync_interval:
+                self._fsync()
+            elif self._fsync_timer is None:
+                self._fsync_timer = threading.Timer(self.fsync_interval, self._deferred_fsync)
+                self._fsync_timer.daemon = True
+                self._fsync_timer.start()
+
+    def _deferred_fsync(self):
+        with self._lock:
+            self._fsync_timer = None
+            self._fsync()
+
+    def _fsync(self):
+        self._last_fsync = time.monotonic()
+        if self._file is not None:
+            try:
+                os.fsync(self._file.fileno())
+            except Exception:
+                pass
+
+    def _close(self):
+        if self._fsync_timer is not None:
+            self._fsync_timer.cancel()
+            self._fsync_timer = None
+        if self._file is not None:
+            try:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
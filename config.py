@@ -70,6 +70,10 @@ DEFAULT_MARGIN_BOTTOM = 0
 DEFAULT_MARGIN_LEFT = 0
 DEFAULT_MARGIN_RIGHT = 0
 
+# Receipt printer for raw ESC/POS printing (see escpos.py), e.g. 'tcp://192.168.1.50:9100',
+# '/dev/usb/lp0' or 'win32:Printer Name'. Empty uses the system print command instead.
+DEFAULT_RECEIPT_PRINTER = ''
+
 # Column width options for 80mm paper
 COLUMN_WIDTH_OPTIONS_80MM = [48, 56, 72]
 
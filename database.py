@@ -5,8 +5,13 @@ Automatically uses Firebase Firestore if available, otherwise falls back to JSON
 
 import json
 import os
+import shutil
+import threading
 from datetime import datetime, timedelta
-from config import DATA_DIR, BILLS_DIR, BILLS_JSON_DIR, DEFAULT_CREDENTIALS
+from config import DATA_DIR, BILLS_DIR, DEFAULT_CREDENTIALS
+from bill_file_writer import get_bill_file_writer
+from bill_index import BillIdIndex, format_bill_id, get_bill_numeric_id
+from bill_dates import get_bill_date_fields, get_bill_timestamp, to_timestamp, backfill_bill_dates
 
 DATABASE_FILE = os.path.join(DATA_DIR, "database.json")
 
@@ -44,8 +49,24 @@ class Database:
     """Simple JSON-based database for demo purposes"""
     
     def __init__(self):
+        # Held by every method that changes self.data and by save() (background bill saves run on another thread)
+        self._lock = threading.RLock()
+        # Incremented on every change, so callers can cache query results per version
+        self.data_version = 0
+        # Incremented on every inventory change except stock updates, so inventory indexes know when to rebuild
+        self.inventory_version = 0
         self.data = self._load_data()
         self._initialize_default_data()
+        # Add pre-parsed date fields to bills created before they existed (one-time)
+        if backfill_bill_dates(self.data['bills']):
+            self.save()
+        # Index bill IDs for fast Bill ID search
+        self.bill_index = BillIdIndex(self.data['bills'])
+        # Commit token -> bill, so a retried background save is recognised (see BillCommitter)
+        self._commit_tokens = {bill['commit_token']: bill for bill in self.data['bills'] if bill.get('commit_token')}
+        # Highest bill number handed out by reserve_bill_id (bills may not be saved yet)
+        self._last_reserved_bill_id = 0
+        self._bill_id_lock = threading.Lock()
         # Migrate existing bills to individual JSON files
         self._migrate_bills_to_individual_files()
     
@@ -56,6 +77,12 @@ class Database:
                 with open(DATABASE_FILE, 'r') as f:
                     return json.load(f)
             except:
+                # Keep the damaged file (the next save overwrites database.json)
+                try:
+                    shutil.copyfile(DATABASE_FILE, DATABASE_FILE + '.corrupt')
+                except Exception:
+                    pass
+                print("⚠️  database.json could not be read; run 'python recovery.py' to rebuild it from the bill files")
                 return self._get_default_structure()
         return self._get_default_structure()
     
@@ -70,68 +97,74 @@ class Database:
     
     def _initialize_default_data(self):
         """Initialize with default data if empty"""
-        # Check if admin user exists and update credentials if needed
-        admin_user = None
-        for user in self.data['users']:
-            if user.get('role') == 'admin':
-                admin_user = user
-                break
+        with self._lock:
+            # Check if admin user exists and update credentials if needed
+            admin_user = None
+            for user in self.data['users']:
+                if user.get('role') == 'admin':
+                    admin_user = user
+                    break
         
-        if admin_user:
-            # Update existing admin credentials to match config
-            admin_user['username'] = DEFAULT_CREDENTIALS['admin']['username']
-            admin_user['password'] = DEFAULT_CREDENTIALS['admin']['password']
-            admin_user['name'] = DEFAULT_CREDENTIALS['admin']['name']
-        else:
-            # Add default users if empty
-            if not self.data['users']:
-                self.data['users'] = []
+            if admin_user:
+                # Update existing admin credentials to match config
+                admin_user['username'] = DEFAULT_CREDENTIALS['admin']['username']
+                admin_user['password'] = DEFAULT_CREDENTIALS['admin']['password']
+                admin_user['name'] = DEFAULT_CREDENTIALS['admin']['name']
+            else:
+                # Add default users if empty
+                if not self.data['users']:
+                    self.data['users'] = []
             
-            # Add admin user
-            self.data['users'].append({
-                'id': 1,
-                'username': DEFAULT_CREDENTIALS['admin']['username'],
-                'password': DEFAULT_CREDENTIALS['admin']['password'],
-                'role': 'admin',
-                'name': DEFAULT_CREDENTIALS['admin']['name']
-            })
+                # Add admin user
+                self.data['users'].append({
+                    'id': 1,
+                    'username': DEFAULT_CREDENTIALS['admin']['username'],
+                    'password': DEFAULT_CREDENTIALS['admin']['password'],
+                    'role': 'admin',
+                    'name': DEFAULT_CREDENTIALS['admin']['name']
+                })
         
-        # Check if default staff user exists
-        staff_exists = any(user.get('role') == 'staff' and user.get('username') == DEFAULT_CREDENTIALS['staff']['username'] 
-                          for user in self.data['users'])
+            # Check if default staff user exists
+            staff_exists = any(user.get('role') == 'staff' and user.get('username') == DEFAULT_CREDENTIALS['staff']['username'] 
+                              for user in self.data['users'])
         
-        if not staff_exists:
-            # Add default staff user
-            new_staff_id = max([u['id'] for u in self.data['users']], default=0) + 1
-            self.data['users'].append({
-                'id': new_staff_id,
-                'username': DEFAULT_CREDENTIALS['staff']['username'],
-                'password': DEFAULT_CREDENTIALS['staff']['password'],
-                'role': 'staff',
-                'name': DEFAULT_CREDENTIALS['staff']['name']
-            })
+            if not staff_exists:
+                # Add default staff user
+                new_staff_id = max([u['id'] for u in self.data['users']], default=0) + 1
+                self.data['users'].append({
+                    'id': new_staff_id,
+                    'username': DEFAULT_CREDENTIALS['staff']['username'],
+                    'password': DEFAULT_CREDENTIALS['staff']['password'],
+                    'role': 'staff',
+                    'name': DEFAULT_CREDENTIALS['staff']['name']
+                })
         
-        # Initialize empty inventory if not exists
-        if 'inventory' not in self.data:
-            self.data['inventory'] = []
+            # Initialize empty inventory if not exists
+            if 'inventory' not in self.data:
+                self.data['inventory'] = []
         
-        # Remove sample items if they exist
-        sample_item_names = ['T-Shirt', 'Jeans', 'Jacket', 'Dress', 'Sneakers', 'Cap']
-        original_count = len(self.data['inventory'])
-        self.data['inventory'] = [
-            item for item in self.data['inventory'] 
-            if item.get('name') not in sample_item_names
-        ]
+            # Remove sample items if they exist
+            sample_item_names = ['T-Shirt', 'Jeans', 'Jacket', 'Dress', 'Sneakers', 'Cap']
+            original_count = len(self.data['inventory'])
+            self.data['inventory'] = [
+                item for item in self.data['inventory'] 
+                if item.get('name') not in sample_item_names
+            ]
         
-        # Save if items were removed
-        if len(self.data['inventory']) < original_count:
-            self.save()
+            # Save if items were removed
+            if len(self.data['inventory']) < original_count:
+                self.save()
     
     def save(self):
-        """Save data to JSON file"""
-        os.makedirs(DATA_DIR, exist_ok=True)
-        with open(DATABASE_FILE, 'w') as f:
-            json.dump(self.data, f, indent=2)
+        """Save data to JSON file (written to a temporary file first, so a crash never leaves it half written)"""
+        with self._lock:
+            self.data_version += 1
+            os.makedirs(DATA_DIR, exist_ok=True)
+            with open(DATABASE_FILE + '.tmp', 'w') as f:
+                json.dump(self.data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(DATABASE_FILE + '.tmp', DATABASE_FILE)
     
     # User management
     def authenticate_user(self, username, password, role):
@@ -152,17 +185,18 @@ class Database:
     
     def add_user(self, username, password, role, name):
         """Add a new user"""
-        new_id = max([u['id'] for u in self.data['users']], default=0) + 1
-        user = {
-            'id': new_id,
-            'username': username,
-            'password': password,
-            'role': role,
-            'name': name
-        }
-        self.data['users'].append(user)
-        self.save()
-        return user
+        with self._lock:
+            new_id = max([u['id'] for u in self.data['users']], default=0) + 1
+            user = {
+                'id': new_id,
+                'username': username,
+                'password': password,
+                'role': role,
+                'name': name
+            }
+            self.data['users'].append(user)
+            self.save()
+            return user
     
     def get_all_users(self, role=None):
         """Get all users, optionally filtered by role"""
@@ -184,115 +218,136 @@ class Database:
     
     def add_inventory_item(self, name, category, price, stock):
         """Add new inventory item"""
-        new_id = max([i['id'] for i in self.data['inventory']], default=0) + 1
-        item = {
-            'id': new_id,
-            'name': name,
-            'category': category,
-            'price': float(price),
-            'stock': int(stock)
-        }
-        self.data['inventory'].append(item)
-        self.save()
-        return item
+        with self._lock:
+            new_id = max([i['id'] for i in self.data['inventory']], default=0) + 1
+            item = {
+                'id': new_id,
+                'name': name,
+                'category': category,
+                'price': float(price),
+                'stock': int(stock)
+            }
+            self.data['inventory'].append(item)
+            self.inventory_version += 1
+            self.save()
+            return item
     
     def update_inventory_item(self, item_id, **kwargs):
-        """Update inventory item"""
-        for item in self.data['inventory']:
-            if item['id'] == item_id:
-                item.update(kwargs)
-                self.save()
-                return item
-        return None
+        """Update inventory item (stock-only updates leave inventory_version alone)"""
+        with self._lock:
+            for item in self.data['inventory']:
+                if item['id'] == item_id:
+                    item.update(kwargs)
+                    if set(kwargs) - {'stock'}:
+                        self.inventory_version += 1
+                    self.save()
+                    return item
+            return None
     
     def delete_inventory_item(self, item_id):
         """Delete inventory item"""
-        self.data['inventory'] = [i for i in self.data['inventory'] if i['id'] != item_id]
-        self.save()
+        with self._lock:
+            self.data['inventory'] = [i for i in self.data['inventory'] if i['id'] != item_id]
+            self.inventory_version += 1
+            self.save()
     
     def delete_all_inventory_items(self):
         """Delete all inventory items"""
-        self.data['inventory'] = []
-        self.save()
-        return True
+        with self._lock:
+            self.data['inventory'] = []
+            self.inventory_version += 1
+            self.save()
+            return True
     
     def update_stock(self, item_id, quantity_change):
         """Update stock quantity for an item"""
-        item = self.get_inventory_item(item_id)
-        if item:
-            item['stock'] = max(0, item['stock'] + quantity_change)
-            self.save()
-            return True
-        return False
+        with self._lock:
+            item = self.get_inventory_item(item_id)
+            if item:
+                item['stock'] = max(0, item['stock'] + quantity_change)
+                self.save()
+                return True
+            return False
     
     # Bill management
-    def create_bill(self, user_id, items, total, payment_method='Cash'):
-        """Create a new bill"""
-        # Get numeric ID (stored internally for compatibility)
-        # Handle both old format (numeric id) and new format (DR0201 with numeric_id)
-        max_numeric_id = 0
-        for b in self.data['bills']:
-            if 'numeric_id' in b:
-                max_numeric_id = max(max_numeric_id, b['numeric_id'])
-            elif isinstance(b.get('id'), (int, float)):
-                max_numeric_id = max(max_numeric_id, int(b.get('id', 0)))
-            elif isinstance(b.get('id'), str) and b.get('id', '').startswith('DR'):
-                try:
-                    num_id = int(b.get('id', '0').replace('DR', '').strip())
-                    max_numeric_id = max(max_numeric_id, num_id)
-                except (ValueError, AttributeError):
-                    pass
-        new_numeric_id = max_numeric_id + 1
-        # Format as DR0201 (DR + 4-digit number with leading zeros)
-        new_id = f"DR{str(new_numeric_id).zfill(4)}"
-        bill = {
-            'id': new_id,  # Formatted ID like DR0201
-            'numeric_id': new_numeric_id,  # Keep numeric ID for sorting/searching
-            'user_id': user_id,
-            'date': datetime.now().isoformat(),
-            'items': items,
-            'total': float(total),
-            'payment_method': payment_method
-        }
-        self.data['bills'].append(bill)
+    def reserve_bill_id(self):
+        """Reserve the next bill ID (DR0201 format) before the bill is saved"""
+        with self._bill_id_lock:
+            numeric_id = max(self.bill_index.max_numeric_id(), self._last_reserved_bill_id) + 1
+            self._last_reserved_bill_id = numeric_id
+        return format_bill_id(numeric_id)
+    
+    def peek_next_bill_id(self):
+        """Get the bill ID the next reserve_bill_id call will hand out (nothing is reserved)"""
+        with self._bill_id_lock:
+            return format_bill_id(max(self.bill_index.max_numeric_id(), self._last_reserved_bill_id) + 1)
+    
+    def create_bill(self, user_id, items, total, payment_method='Cash', bill_id=None, date=None, commit_token=None):
+        """
+        Create a new bill
+        bill_id and date can come from reserve_bill_id and checkout time. commit_token identifies
+        the sale: saving it again (a retry) only writes the saved bill to disk again. A bill_id
+        already used by another bill is replaced by the next free one.
+        """
+        with self._lock:
+            existing = self._commit_tokens.get(commit_token) if commit_token else None
+            if existing is not None:
+                self._save_individual_bill(existing)
+                self.save()
+                return existing
+            if bill_id and self.bill_index.get(bill_id) is None:
+                new_numeric_id = get_bill_numeric_id({'id': bill_id})
+            else:
+                new_numeric_id = get_bill_numeric_id({'id': self.reserve_bill_id()})
+            # Format as DR0201 (DR + 4-digit number with leading zeros)
+            new_id = format_bill_id(new_numeric_id)
+            bill = {
+                'id': new_id,  # Formatted ID like DR0201
+                'numeric_id': new_numeric_id,  # Keep numeric ID for sorting/searching
+                'user_id': user_id,
+                **get_bill_date_fields(date),  # date (ISO), timestamp (epoch ms) and day (YYYY-MM-DD)
+                'items': items,
+                'total': float(total),
+                'payment_method': payment_method
+            }
+            if commit_token:
+                bill['commit_token'] = commit_token
+                self._commit_tokens[commit_token] = bill
+            self.data['bills'].append(bill)
+            self.bill_index.add(bill)
         
-        # Update monthly sales for items
-        self._update_monthly_sales(items)
+            # Update monthly sales for items
+            self._update_monthly_sales(items)
         
-        # Save individual bill as JSON file
-        self._save_individual_bill(bill)
+            # Save individual bill as JSON file
+            self._save_individual_bill(bill)
         
-        self.save()
-        return bill
+            self.save()
+            return bill
     
     def _save_individual_bill(self, bill):
-        """Save individual bill as separate JSON file"""
-        try:
-            os.makedirs(BILLS_JSON_DIR, exist_ok=True)
-            bill_file = os.path.join(BILLS_JSON_DIR, f"{bill['id']}.json")
-            with open(bill_file, 'w', encoding='utf-8') as f:
-                json.dump(bill, f, indent=2, ensure_ascii=False)
-        except Exception:
-            pass  # Silently fail if individual bill save fails
+        """Save individual bill as separate JSON file (written in the background)"""
+        get_bill_file_writer().save(bill)
     
     def _update_monthly_sales(self, items):
         """Update monthly sales quantity for items"""
-        current_month = datetime.now().strftime('%Y-%m')
+        with self._lock:
+            current_month = datetime.now().strftime('%Y-%m')
         
-        # Initialize monthly_sales if not exists
-        if 'monthly_sales' not in self.data:
-            self.data['monthly_sales'] = {}
+            # Initialize monthly_sales if not exists
+            if 'monthly_sales' not in self.data:
+                self.data['monthly_sales'] = {}
         
-        if current_month not in self.data['monthly_sales']:
-            self.data['monthly_sales'][current_month] = {}
+            if current_month not in self.data['monthly_sales']:
+                self.data['monthly_sales'][current_month] = {}
         
-        for item in items:
-            item_id = item.get('inventory_id')
-            if item_id:
-                item_key = str(item_id)
-                if item_key not in self.data['monthly_sales'][current_month]:
-                    self.data['monthly_sales'][current_month][item_key] = 0
-                self.data['monthly_sales'][current_month][item_key] += item['quantity']
+            for item in items:
+                item_id = item.get('inventory_id')
+                if item_id:
+                    item_key = str(item_id)
+                    if item_key not in self.data['monthly_sales'][current_month]:
+                        self.data['monthly_sales'][current_month][item_key] = 0
+                    self.data['monthly_sales'][current_month][item_key] += item['quantity']
     
     def get_item_monthly_sales(self, item_id, month=None):
         """Get monthly sales quantity for an item"""
@@ -310,13 +365,12 @@ class Database:
     
     def get_item_sales_in_range(self, item_id, start_date, end_date):
         """Get item sales quantity in a date range"""
-        start = datetime.fromisoformat(start_date) if isinstance(start_date, str) else start_date
-        end = datetime.fromisoformat(end_date) if isinstance(end_date, str) else end_date
+        start = to_timestamp(start_date)
+        end = to_timestamp(end_date)
         
         total_quantity = 0
         for bill in self.data['bills']:
-            bill_date = datetime.fromisoformat(bill['date'])
-            if start <= bill_date <= end:
+            if start <= get_bill_timestamp(bill) <= end:
                 for item in bill['items']:
                     if item.get('inventory_id') == item_id:
                         total_quantity += item['quantity']
@@ -325,25 +379,46 @@ class Database:
     
     def reset_monthly_sales(self):
         """Reset monthly sales (called at start of new month)"""
-        current_month = datetime.now().strftime('%Y-%m')
-        if 'monthly_sales' not in self.data:
-            self.data['monthly_sales'] = {}
+        with self._lock:
+            current_month = datetime.now().strftime('%Y-%m')
+            if 'monthly_sales' not in self.data:
+                self.data['monthly_sales'] = {}
         
-        # Keep only current month and previous month
-        months_to_keep = [
-            current_month,
-            (datetime.now().replace(day=1) - timedelta(days=1)).strftime('%Y-%m')
-        ]
-        self.data['monthly_sales'] = {
-            month: data for month, data in self.data['monthly_sales'].items() 
-            if month in months_to_keep
-        }
-        self.save()
+            # Keep only current month and previous month
+            months_to_keep = [
+                current_month,
+                (datetime.now().replace(day=1) - timedelta(days=1)).strftime('%Y-%m')
+            ]
+            self.data['monthly_sales'] = {
+                month: data for month, data in self.data['monthly_sales'].items() 
+                if month in months_to_keep
+            }
+            self.save()
     
     def get_all_bills(self):
         """Get all bills"""
         return self.data['bills']
     
+    def iter_bill_pages(self, page_size=500):
+        """Yield bills page by page, newest first by timestamp (the order Firestore pages use)"""
+        with self._lock:
+            bills = sorted(self.data['bills'], key=get_bill_timestamp, reverse=True)
+        for start in range(0, len(bills), page_size):
+            yield bills[start:start + page_size]
+    
+    def refresh_bill_index(self):
+        """Rebuild the bill ID index (the JSON store has no other writers, so this just reindexes)"""
+        self.bill_index.rebuild(self.data['bills'])
+        return True
+    
+    def count_bills(self):
+        """Get the number of bills"""
+        return len(self.bill_index)
+    
+    def search_bills(self, query):
+        """Search bills by ID - exact (DR0201), prefix (DR02) or range (DR0100-DR0200)"""
+        return self.bill_index.search(query)
+    
     def get_bill(self, bill_id):
         """Get bill by ID (supports both DR0201 format and numeric)"""
         for bill in self.data['bills']:
@@ -361,46 +436,44 @@ class Database:
     
     def delete_bill(self, bill_id):
         """Delete a bill by ID (supports both DR0201 format and numeric)"""
-        original_count = len(self.data['bills'])
-        self.data['bills'] = [b for b in self.data['bills'] if b['id'] != bill_id and b.get('numeric_id') != bill_id]
-        if len(self.data['bills']) < original_count:
-            # Delete individual bill file
-            self._delete_individual_bill(bill_id)
-            self.save()
-            return True
-        return False
+        with self._lock:
+            original_count = len(self.data['bills'])
+            self.data['bills'] = [b for b in self.data['bills'] if b['id'] != bill_id and b.get('numeric_id') != bill_id]
+            if len(self.data['bills']) < original_count:
+                self.bill_index.remove(bill_id)
+                # Delete individual bill file
+                self._delete_individual_bill(bill_id)
+                self.save()
+                return True
+            return False
     
     def _delete_individual_bill(self, bill_id):
-        """Delete individual bill JSON file"""
-        try:
-            bill_file = os.path.join(BILLS_JSON_DIR, f"{bill_id}.json")
-            if os.path.exists(bill_file):
-                os.remove(bill_file)
-        except Exception:
-            pass  # Silently fail if deletion fails
+        """Delete individual bill JSON file (in the background)"""
+        get_bill_file_writer().delete(bill_id)
     
     def _migrate_bills_to_individual_files(self):
-        """Migrate all existing bills to individual JSON files"""
+        """Write JSON files for bills that have none yet (the writer's manifest lists written bills)"""
         try:
-            os.makedirs(BILLS_JSON_DIR, exist_ok=True)
+            writer = get_bill_file_writer()
+            if writer.migrated:
+                return  # Done on an earlier start; new bills are written by create_bill
             for bill in self.data.get('bills', []):
                 bill_id = bill.get('id')
-                if bill_id:
-                    bill_file = os.path.join(BILLS_JSON_DIR, f"{bill_id}.json")
-                    # Only save if file doesn't exist (avoid overwriting)
-                    if not os.path.exists(bill_file):
-                        self._save_individual_bill(bill)
+                if bill_id and not writer.has(bill_id):
+                    writer.save(bill)
+            writer.mark_migrated()
         except Exception:
             pass  # Silently fail if migration fails
     
     def update_bill(self, bill_id, **kwargs):
         """Update a bill by ID"""
-        for bill in self.data['bills']:
-            if bill['id'] == bill_id or bill.get('numeric_id') == bill_id:
-                bill.update(kwargs)
-                self.save()
-                return bill
-        return None
+        with self._lock:
+            for bill in self.data['bills']:
+                if bill['id'] == bill_id or bill.get('numeric_id') == bill_id:
+                    bill.update(kwargs)
+                    self.save()
+                    return bill
+            return None
 
 # Global database instance (will be Firebase if available, otherwise JSON)
 if db is None:
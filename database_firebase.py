@@ -11,9 +11,14 @@ import time
 from datetime import datetime, timedelta
 from config import DEFAULT_CREDENTIALS, DATA_DIR
 from firebase_config import get_firebase_config
+from bill_index import BillIdIndex, format_bill_id, get_bill_numeric_id
+from bill_dates import get_bill_date_fields, get_bill_timestamp, to_timestamp, backfill_bill_dates
 
 DATABASE_FILE = os.path.join(DATA_DIR, "database.json")
 
+# Seconds between background rebuilds of the bill ID index from Firestore (bills from other tills)
+BILL_INDEX_REFRESH_INTERVAL = 5 * 60
+
 try:
     import firebase_admin
     from firebase_admin import credentials, firestore
@@ -21,6 +26,11 @@ try:
 except ImportError:
     FIREBASE_AVAILABLE = False
 
+
+def _catalog_fields(item):
+    """Inventory item fields other than stock (stock changes with every sale and is not indexed)"""
+    return {key: value for key, value in item.items() if key != 'stock'}
+
 class FirebaseDatabase:
     """Firebase Firestore database implementation"""
     
@@ -34,12 +44,31 @@ class FirebaseDatabase:
         self.db = None
         self.offline_mode = False
         self.pending_sync = []  # Track operations that need to sync when online
+        self.bill_index = BillIdIndex()  # Rebuilt on every sync to local storage
+        # Commit token -> bill, so a retried background save is recognised (see BillCommitter)
+        self._commit_tokens = {}
+        # Highest bill number handed out by reserve_bill_id (bills may not be saved yet)
+        self._last_reserved_bill_id = 0
+        self._bill_id_lock = threading.Lock()
+        # Incremented on every sync, so callers can cache query results per version
+        self.data_version = 0
+        # Incremented on every inventory change except stock updates, so inventory indexes know when to rebuild
+        self.inventory_version = 0
+        # Item ID -> catalog fields of the known inventory (own writes and Firestore reads), so only
+        # changes made elsewhere bump inventory_version; None until the first read
+        self._inventory_items = None
+        self._inventory_lock = threading.Lock()
+        self._inventory_watch = None  # Firestore listener on the inventory collection
+        # Set while some Firestore bills still lack the timestamp field (the backfill is retried)
+        self.timestamp_backfill_pending = False
         self._initialize_firebase()
         self._initialize_default_data()
         # Initial sync to local storage
         self._sync_to_local()
         # Migrate existing bills to individual JSON files
         self._migrate_bills_to_individual_files()
+        # Watch the inventory for changes made on other devices
+        self._start_inventory_listener()
         # Start background sync thread
         self._start_background_sync()
     
@@ -154,6 +183,7 @@ class FirebaseDatabase:
     def _start_background_sync(self):
         """Start background thread to sync pending operations when online"""
         def sync_worker():
+            last_index_refresh = time.monotonic()
             while True:
                 time.sleep(30)  # Check every 30 seconds
                 if self._check_internet_connection() and not self.offline_mode:
@@ -162,6 +192,15 @@ class FirebaseDatabase:
                             self._sync_pending_operations()
                         except Exception:
                             pass  # Silently fail, will retry later
+                    if self._inventory_watch is None:
+                        self._start_inventory_listener()
+                    if self._inventory_watch is None:
+                        self.refresh_inventory()  # No listener: poll instead
+                    if self.timestamp_backfill_pending:
+                        self._backfill_bill_timestamps()
+                    if time.monotonic() - last_index_refresh >= BILL_INDEX_REFRESH_INTERVAL:
+                        self.refresh_bill_index()
+                        last_index_refresh = time.monotonic()
                 else:
                     self.offline_mode = True
         
@@ -178,6 +217,8 @@ class FirebaseDatabase:
     
     def _sync_to_local(self):
         """Sync all Firebase data to local JSON file for backup"""
+        # Every write path syncs, so this marks the data as changed even if the sync fails
+        self.data_version += 1
         try:
             if self.offline_mode or not self._check_internet_connection():
                 # In offline mode, read from local file and update it
@@ -204,6 +245,7 @@ class FirebaseDatabase:
                 inventory_ref = self._get_collection('inventory')
                 for doc in inventory_ref.stream():
                     data['inventory'].append(doc.to_dict())
+                self._note_inventory(data['inventory'])
                 
                 # Get bills
                 bills_ref = self._get_collection('bills')
@@ -223,6 +265,12 @@ class FirebaseDatabase:
                 else:
                     data['monthly_sales'] = {}
             
+            # Refresh bill ID index from the synced bills
+            self.bill_index.rebuild(data.get('bills', []))
+            self._commit_tokens.update(
+                (bill['commit_token'], bill) for bill in data.get('bills', []) if bill.get('commit_token')
+            )
+            
             # Save to local JSON file (always, even in offline mode)
             os.makedirs(DATA_DIR, exist_ok=True)
             with open(DATABASE_FILE, 'w', encoding='utf-8') as f:
@@ -368,6 +416,59 @@ class FirebaseDatabase:
         return [doc.to_dict() for doc in query]
     
     # Inventory management
+    def _note_inventory(self, items):
+        """Bump inventory_version when the inventory read from Firestore differs from the known one"""
+        catalog = {str(item.get('id')): _catalog_fields(item) for item in items}
+        with self._inventory_lock:
+            changed = self._inventory_items is not None and catalog != self._inventory_items
+            self._inventory_items = catalog
+        if changed:
+            self.inventory_version += 1
+    
+    def _remember_inventory_item(self, item):
+        """Record an item written by this store, so reading it back is not seen as a change"""
+        with self._inventory_lock:
+            if self._inventory_items is not None:
+                self._inventory_items[str(item.get('id'))] = _catalog_fields(item)
+    
+    def _forget_inventory_item(self, item_id):
+        """Record an item deleted by this store"""
+        with self._inventory_lock:
+            if self._inventory_items is not None:
+                self._inventory_items.pop(str(item_id), None)
+    
+    def _start_inventory_listener(self):
+        """Listen to inventory changes in Firestore (only changed documents are sent)"""
+        try:
+            self._inventory_watch = self._get_collection('inventory').on_snapshot(self._on_inventory_snapshot)
+        except Exception:
+            self._inventory_watch = None  # Retried by the sync worker, which polls meanwhile
+    
+    def _on_inventory_snapshot(self, docs, changes, read_time):
+        """Bump inventory_version for inventory changes not made by this store (stock aside)"""
+        changed = False
+        with self._inventory_lock:
+            if self._inventory_items is None:
+                self._inventory_items = {}
+            for change in changes:
+                item = change.document.to_dict() or {}
+                key = str(item.get('id'))
+                if change.type.name == 'REMOVED':
+                    changed = self._inventory_items.pop(key, None) is not None or changed
+                elif self._inventory_items.get(key) != _catalog_fields(item):
+                    self._inventory_items[key] = _catalog_fields(item)
+                    changed = True
+        if changed:
+            self.inventory_version += 1
+    
+    def refresh_inventory(self):
+        """Read the whole inventory from Firestore (used when the inventory listener is not running)"""
+        try:
+            self._note_inventory([doc.to_dict() for doc in self._get_collection('inventory').stream()])
+            return True
+        except Exception:
+            return False
+    
     def get_all_inventory(self):
         """Get all inventory items"""
         inventory_ref = self._get_collection('inventory')
@@ -413,12 +514,14 @@ class FirebaseDatabase:
             if self._is_firebase_storage_error(e):
                 self._save_to_local_fallback('add_inventory', item_data)
         
+        self._remember_inventory_item(item_data)
+        self.inventory_version += 1
         # Always save to local (ensures data is never lost)
         self._sync_to_local()
         return item_data
     
     def update_inventory_item(self, item_id, **kwargs):
-        """Update inventory item"""
+        """Update inventory item (stock-only updates leave inventory_version alone)"""
         inventory_ref = self._get_collection('inventory')
         query = inventory_ref.where('id', '==', item_id).stream()
         
@@ -436,6 +539,9 @@ class FirebaseDatabase:
                 if self._is_firebase_storage_error(e):
                     self._save_to_local_fallback('update_inventory', updated_data)
             
+            self._remember_inventory_item(updated_data)
+            if set(kwargs) - {'stock'}:
+                self.inventory_version += 1
             # Always save to local (ensures data is never lost)
             self._sync_to_local()
             return updated_data
@@ -466,6 +572,8 @@ class FirebaseDatabase:
                         except Exception:
                             pass
             
+            self._forget_inventory_item(item_id)
+            self.inventory_version += 1
             # Always save to local (ensures data is never lost)
             self._sync_to_local()
             return True
@@ -482,6 +590,10 @@ class FirebaseDatabase:
             deleted_count += 1
         
         if deleted_count > 0:
+            with self._inventory_lock:
+                if self._inventory_items is not None:
+                    self._inventory_items = {}
+            self.inventory_version += 1
             self._sync_to_local()
         return deleted_count > 0
     
@@ -495,38 +607,101 @@ class FirebaseDatabase:
         return False
     
     # Bill management
-    def create_bill(self, user_id, items, total, payment_method='Cash'):
-        """Create a new bill"""
+    def reserve_bill_id(self):
+        """
+        Reserve the next bill ID (DR0201 format) before the bill is saved
+        Numbers come from a counter document updated in a Firestore transaction, so two tills never
+        get the same one. Offline, the next number after the local bill index is used; if another
+        till took it meanwhile, create_bill saves the bill under a new number.
+        """
+        with self._bill_id_lock:
+            local_id = max(self.bill_index.max_numeric_id(), self._last_reserved_bill_id)
+            numeric_id = None
+            if not self.offline_mode:
+                try:
+                    numeric_id = self._increment_bill_counter(local_id)
+                except Exception:
+                    pass
+            if numeric_id is None:
+                numeric_id = local_id + 1
+            self._last_reserved_bill_id = numeric_id
+        return format_bill_id(numeric_id)
+    
+    def _increment_bill_counter(self, minimum):
+        """Atomically take the next bill number from the counters/bills document (at least minimum + 1)"""
+        counter_ref = self._get_collection('counters').document('bills')
+        
+        @firestore.transactional
+        def increment(transaction):
+            snapshot = counter_ref.get(transaction=transaction)
+            last = (snapshot.to_dict() or {}).get('last_numeric_id', 0) if snapshot.exists else 0
+            # The counter starts from the highest existing bill number
+            numeric_id = max(last, minimum) + 1
+            transaction.set(counter_ref, {'last_numeric_id': numeric_id})
+            return numeric_id
+        
+        return increment(self.db.transaction())
+    
+    def _find_bill_by_commit_token(self, commit_token):
+        """
+        Get the bill saved for a commit token (locally known or in Firestore), or None
+        Raises if Firestore cannot be asked: an earlier attempt may have saved the bill.
+        """
+        bill = self._commit_tokens.get(commit_token)
+        if bill is None:
+            query = self._get_collection('bills').where('commit_token', '==', commit_token).limit(1)
+            for bill_doc in query.stream():
+                bill = bill_doc.to_dict()
+        return bill
+    
+    def _is_bill_id_taken(self, bill_id):
+        """Whether a bill with this ID exists (in the local index or in Firestore)"""
+        if self.bill_index.get(bill_id) is not None:
+            return True
+        if self.offline_mode:
+            return False
+        try:
+            return any(True for _ in self._get_collection('bills').where('id', '==', bill_id).limit(1).stream())
+        except Exception:
+            return False
+    
+    def peek_next_bill_id(self):
+        """Get the bill ID the next reserve_bill_id call will hand out (nothing is reserved)"""
+        with self._bill_id_lock:
+            return format_bill_id(max(self.bill_index.max_numeric_id(), self._last_reserved_bill_id) + 1)
+    
+    def create_bill(self, user_id, items, total, payment_method='Cash', bill_id=None, date=None, commit_token=None):
+        """
+        Create a new bill
+        bill_id and date can come from reserve_bill_id and checkout time. commit_token identifies
+        the sale: if a bill was already saved for it (a retry), that bill is returned as is. A
+        bill_id already used by another till is replaced by a newly reserved one.
+        With a commit_token, a failed Firestore save raises so the caller (BillCommitter) retries;
+        without one the bill is queued for the sync worker as before.
+        """
         bills_ref = self._get_collection('bills')
         
-        # Get max numeric ID from all bills
-        all_bills = bills_ref.stream()
-        max_numeric_id = 0
-        for bill_doc in all_bills:
-            bill_data = bill_doc.to_dict()
-            # Check for numeric_id first, then fall back to extracting from id
-            numeric_id = bill_data.get('numeric_id', 0)
-            if numeric_id == 0 and isinstance(bill_data.get('id'), str):
-                # Extract number from format like DR0201
-                try:
-                    numeric_id = int(bill_data.get('id', '0').replace('DR', ''))
-                except (ValueError, AttributeError):
-                    numeric_id = 0
-            if numeric_id > max_numeric_id:
-                max_numeric_id = numeric_id
+        if commit_token:
+            existing = self._find_bill_by_commit_token(commit_token)
+            if existing is not None:
+                return existing
+        if not bill_id or self._is_bill_id_taken(bill_id):
+            bill_id = self.reserve_bill_id()
+        new_numeric_id = get_bill_numeric_id({'id': bill_id})
         
-        new_numeric_id = max_numeric_id + 1
         # Format as DR0201 (DR + 4-digit number with leading zeros)
-        new_id = f"DR{str(new_numeric_id).zfill(4)}"
+        new_id = format_bill_id(new_numeric_id)
         bill_data = {
             'id': new_id,  # Formatted ID like DR0201
             'numeric_id': new_numeric_id,  # Keep numeric ID for sorting/searching
             'user_id': user_id,
-            'date': datetime.now().isoformat(),
+            **get_bill_date_fields(date),  # date (ISO), timestamp (epoch ms) and day (YYYY-MM-DD)
             'items': items,
             'total': float(total),
             'payment_method': payment_method
         }
+        if commit_token:
+            bill_data['commit_token'] = commit_token
         
         try:
             bills_ref.add(bill_data)
@@ -538,6 +713,8 @@ class FirebaseDatabase:
             self.offline_mode = False
         except Exception as e:
             self.offline_mode = True
+            if commit_token:
+                raise
             self.pending_sync.append(('create_bill', bill_data))
             # If Firebase storage is full, save to local immediately
             if self._is_firebase_storage_error(e):
@@ -545,6 +722,9 @@ class FirebaseDatabase:
         
         # Always save to local (ensures data is never lost, even if Firebase is full)
         self._sync_to_local()
+        self.bill_index.add(bill_data)
+        if commit_token:
+            self._commit_tokens[commit_token] = bill_data
         
         # Save individual bill as JSON file
         self._save_individual_bill(bill_data)
@@ -552,15 +732,9 @@ class FirebaseDatabase:
         return bill_data
     
     def _save_individual_bill(self, bill):
-        """Save individual bill as separate JSON file"""
-        try:
-            from config import BILLS_JSON_DIR
-            os.makedirs(BILLS_JSON_DIR, exist_ok=True)
-            bill_file = os.path.join(BILLS_JSON_DIR, f"{bill['id']}.json")
-            with open(bill_file, 'w', encoding='utf-8') as f:
-                json.dump(bill, f, indent=2, ensure_ascii=False)
-        except Exception:
-            pass  # Silently fail if individual bill save fails
+        """Save individual bill as separate JSON file (written in the background)"""
+        from bill_file_writer import get_bill_file_writer
+        get_bill_file_writer().save(bill)
     
     def _update_monthly_sales(self, items):
         """Update monthly sales quantity for items"""
@@ -602,28 +776,31 @@ class FirebaseDatabase:
     
     def get_item_sales_in_range(self, item_id, start_date, end_date):
         """Get item sales quantity in a date range"""
-        start = datetime.fromisoformat(start_date) if isinstance(start_date, str) else start_date
-        end = datetime.fromisoformat(end_date) if isinstance(end_date, str) else end_date
+        start = to_timestamp(start_date)
+        end = to_timestamp(end_date)
         
         bills_ref = self._get_collection('bills')
-        # Note: Firestore requires a composite index for range queries on 'date'
-        # If index doesn't exist, filter in memory (slower but works)
-        try:
-            query = bills_ref.where('date', '>=', start.isoformat()).where('date', '<=', end.isoformat()).stream()
-        except Exception:
-            # If query fails (no index), get all bills and filter in memory
-            query = bills_ref.stream()
         
-        total_quantity = 0
-        for bill_doc in query:
-            bill_data = bill_doc.to_dict()
-            bill_date = datetime.fromisoformat(bill_data.get('date', ''))
-            if start <= bill_date <= end:
-                for item in bill_data.get('items', []):
-                    if item.get('inventory_id') == item_id:
-                        total_quantity += item['quantity']
+        def sum_quantity(bill_docs):
+            total_quantity = 0
+            for bill_doc in bill_docs:
+                bill_data = bill_doc.to_dict()
+                if start <= get_bill_timestamp(bill_data) <= end:
+                    for item in bill_data.get('items', []):
+                        if item.get('inventory_id') == item_id:
+                            total_quantity += item['quantity']
+            return total_quantity
         
-        return total_quantity
+        # Range query on the single 'timestamp' field (no composite index needed), unless some
+        # bills have no timestamp yet - the query would leave them out
+        if not self.timestamp_backfill_pending:
+            try:
+                # Firestore raises query errors while iterating, so the whole loop is guarded
+                return sum_quantity(bills_ref.where('timestamp', '>=', start).where('timestamp', '<=', end).stream())
+            except Exception:
+                pass
+        # Get all bills and filter in memory (slower but works)
+        return sum_quantity(bills_ref.stream())
     
     def reset_monthly_sales(self):
         """Reset monthly sales (called at start of new month)"""
@@ -643,6 +820,57 @@ class FirebaseDatabase:
         bills_ref = self._get_collection('bills')
         return [doc.to_dict() for doc in bills_ref.stream()]
     
+    def iter_bill_pages(self, page_size=500):
+        """
+        Yield bills page by page, newest first (reads Firestore with a cursor, one page at a time)
+        Bills without a timestamp field are left out by the ordered query; they follow at the end
+        """
+        bills_ref = self._get_collection('bills')
+        query = bills_ref.order_by('timestamp', direction=firestore.Query.DESCENDING).limit(page_size)
+        last_doc = None
+        yielded = 0
+        while True:
+            page_query = query.start_after(last_doc) if last_doc else query
+            docs = list(page_query.stream())
+            if not docs:
+                break
+            yield [doc.to_dict() for doc in docs]
+            yielded += len(docs)
+            if len(docs) < page_size:
+                break
+            last_doc = docs[-1]
+        
+        # Fallback pass when some bills may have no timestamp (backfill pending or bills missing)
+        if self.timestamp_backfill_pending or yielded < self.count_bills():
+            page = []
+            for doc in bills_ref.stream():
+                bill = doc.to_dict()
+                if 'timestamp' not in bill:
+                    page.append(bill)
+                    if len(page) == page_size:
+                        yield page
+                        page = []
+            if page:
+                yield page
+    
+    def refresh_bill_index(self):
+        """Rebuild the bill ID index from Firestore, so bills saved by other tills are found"""
+        try:
+            bills = [doc.to_dict() for doc in self._get_collection('bills').stream()]
+        except Exception:
+            return False  # Offline: keep the index from the last sync
+        self.bill_index.rebuild(bills)
+        self.data_version += 1
+        return True
+    
+    def count_bills(self):
+        """Get the number of bills (from the bill ID index, no Firestore reads)"""
+        return len(self.bill_index)
+    
+    def search_bills(self, query):
+        """Search bills by ID - exact (DR0201), prefix (DR02) or range (DR0100-DR0200)"""
+        return self.bill_index.search(query)
+    
     def get_bill(self, bill_id):
         """Get bill by ID (supports both DR0201 format and numeric)"""
         bills_ref = self._get_collection('bills')
@@ -690,6 +918,7 @@ class FirebaseDatabase:
             
             # Always save to local (ensures data is never lost)
             self._sync_to_local()
+            self.bill_index.remove(bill_id)
             
             # Delete individual bill file
             self._delete_individual_bill(bill_id)
@@ -722,6 +951,7 @@ class FirebaseDatabase:
                 
                 # Always save to local (ensures data is never lost)
                 self._sync_to_local()
+                self.bill_index.remove(actual_bill_id)
                 
                 # Delete individual bill file
                 self._delete_individual_bill(actual_bill_id)
@@ -730,27 +960,31 @@ class FirebaseDatabase:
         return False
     
     def _delete_individual_bill(self, bill_id):
-        """Delete individual bill JSON file"""
-        try:
-            from config import BILLS_JSON_DIR
-            bill_file = os.path.join(BILLS_JSON_DIR, f"{bill_id}.json")
-            if os.path.exists(bill_file):
-                os.remove(bill_file)
-        except Exception:
-            pass  # Silently fail if deletion fails
+        """Delete individual bill JSON file (in the background)"""
+        from bill_file_writer import get_bill_file_writer
+        get_bill_file_writer().delete(bill_id)
     
     def _migrate_bills_to_individual_files(self):
-        """Migrate all existing bills to individual JSON files"""
+        """Write JSON files for bills that have none yet (the writer's manifest lists written bills)"""
         try:
-            from config import BILLS_JSON_DIR
-            os.makedirs(BILLS_JSON_DIR, exist_ok=True)
+            from bill_file_writer import get_bill_file_writer
+            writer = get_bill_file_writer()
+            if writer.migrated:
+                return  # Done on an earlier start (including the timestamp backfill)
             
             # Get all bills from Firebase first, then from local database file as fallback
             bills = []
+            from_firestore = True
             try:
                 bills_ref = self._get_collection('bills')
-                bills = [doc.to_dict() for doc in bills_ref.stream()]
+                for bill_doc in bills_ref.stream():
+                    bill = bill_doc.to_dict()
+                    # One-time backfill of pre-parsed date fields (rides on this startup pass)
+                    self._backfill_bill_timestamp(bill_doc, bill)
+                    bills.append(bill)
             except Exception:
+                self.timestamp_backfill_pending = True  # Not every bill was checked
+                from_firestore = False
                 # If Firebase fails, try local database file
                 if os.path.exists(DATABASE_FILE):
                     with open(DATABASE_FILE, 'r', encoding='utf-8') as f:
@@ -759,14 +993,38 @@ class FirebaseDatabase:
             
             for bill in bills:
                 bill_id = bill.get('id')
-                if bill_id:
-                    bill_file = os.path.join(BILLS_JSON_DIR, f"{bill_id}.json")
-                    # Only save if file doesn't exist (avoid overwriting)
-                    if not os.path.exists(bill_file):
-                        self._save_individual_bill(bill)
+                if bill_id and not writer.has(bill_id):
+                    writer.save(bill)
+            if from_firestore and not self.timestamp_backfill_pending:
+                writer.mark_migrated()
         except Exception:
             pass  # Silently fail if migration fails
     
+    def _backfill_bill_timestamp(self, bill_doc, bill):
+        """Add missing timestamp and day fields to a Firestore bill; a failed write is retried later"""
+        if not backfill_bill_dates([bill]):
+            return True
+        try:
+            bill_doc.reference.update({'timestamp': bill['timestamp'], 'day': bill['day']})
+            return True
+        except Exception as e:
+            print(f"⚠️  Could not add the timestamp to bill {bill.get('id')}, will retry: {e}")
+            self.timestamp_backfill_pending = True
+            return False
+    
+    def _backfill_bill_timestamps(self):
+        """Retry the timestamp backfill for all Firestore bills; clears the pending flag when done"""
+        try:
+            done = True
+            for bill_doc in self._get_collection('bills').stream():
+                if not self._backfill_bill_timestamp(bill_doc, bill_doc.to_dict()):
+                    done = False
+        except Exception as e:
+            print(f"⚠️  Bill timestamp backfill failed, will retry: {e}")
+            return False
+        self.timestamp_backfill_pending = not done
+        return done
+    
     def update_bill(self, bill_id, **kwargs):
         """Update a bill by ID"""
         bills_ref = self._get_collection('bills')
@@ -787,6 +1045,7 @@ class FirebaseDatabase:
             
             # Always save to local (ensures data is never lost)
             self._sync_to_local()
+            self.bill_index.add(updated_data)
             return updated_data
         # Try numeric_id if bill_id is numeric
         if isinstance(bill_id, (int, float)):
@@ -806,6 +1065,7 @@ class FirebaseDatabase:
                 
                 # Always save to local (ensures data is never lost)
                 self._sync_to_local()
+                self.bill_index.add(updated_data)
                 return updated_data
         return None
 
@@ -0,0 +1,167 @@
+"""
+ESC/POS raw printing for thermal receipt printers
+Compiles a receipt layout (see receipt_layout.py) into an ESC/POS byte stream - init, alignment,
+bold, a Code128 barcode of the bill ID and a paper cut - and sends it straight to the printer
+through a sink, with no text files or print dialogs in between.
+
+Printer targets:
+- "tcp://192.168.1.50:9100" - network printer (raw port 9100)
+- "file://receipts.bin" - write the bytes to a file (testing)
+- "win32:Printer Name" - Windows printer queue in RAW mode (needs pywin32)
+- anything else is a device path, e.g. "/dev/usb/lp0" or "COM3"
+"""
+
+import os
+import socket
+
+try:
+    import win32print
+    WIN32PRINT_AVAILABLE = True
+except ImportError:
+    WIN32PRINT_AVAILABLE = False
+
+ESC = b'\x1b'
+GS = b'\x1d'
+
+INIT = ESC + b'@'
+ALIGN_LEFT = ESC + b'a\x00'
+ALIGN_CENTER = ESC + b'a\x01'
+BOLD_ON = ESC + b'E\x01'
+BOLD_OFF = ESC + b'E\x00'
+SIZE_NORMAL = GS + b'!\x00'
+SIZE_DOUBLE = GS + b'!\x11'  # Double width and height
+FEED_AND_CUT = GS + b'V\x42\x03'  # Feed 3 lines, then partial cut
+NEXT_LABEL = GS + b'\x0c'  # Label printers: feed to the start of the next label
+
+# Printer code page for text; characters it lacks are replaced
+TEXT_ENCODING = 'cp437'
+
+# Characters most thermal printer code pages do not have
+_TEXT_REPLACEMENTS = {'₹': 'Rs.'}
+
+
+def encode_text(text):
+    """Encode receipt text for the printer"""
+    for char, replacement in _TEXT_REPLACEMENTS.items():
+        text = text.replace(char, replacement)
+    return text.encode(TEXT_ENCODING, errors='replace')
+
+
+def code128_barcode(value, height=60, module_width=2, data=None):
+    """
+    ESC/POS commands printing value as a Code128 barcode (code set B) with text below it
+    data is optional pre-encoded barcode data (code set selections included) used instead of value
+    """
+    if data is None:
+        data = b'{B' + value.encode('ascii')
+    return (
+        GS + b'h' + bytes([height]) +
+        GS + b'w' + bytes([module_width]) +
+        GS + b'H\x02' +  # Human readable text below the barcode
+        GS + b'k\x49' + bytes([len(data)]) + data
+    )
+
+
+def compile_lines(lines, char_width):
+    """Compile receipt layout lines (text, style, align) into ESC/POS bytes (no init or cut)"""
+    out = []
+    for text, style, align in lines:
+        if text is None:
+            out.append(encode_text("=" * char_width) + b'\n')
+            continue
+        out.append(ALIGN_CENTER if align == 'center' else ALIGN_LEFT)
+        if style == 'title':
+            out.append(SIZE_DOUBLE + BOLD_ON + encode_text(text) + b'\n' + BOLD_OFF + SIZE_NORMAL)
+        elif style in ('bold', 'total'):
+            out.append(BOLD_ON + encode_text(text) + b'\n' + BOLD_OFF)
+        else:
+            out.append(encode_text(text) + b'\n')
+    return b''.join(out)
+
+
+def receipt_ending(barcode_value=None, cut=True):
+    """ESC/POS bytes ending a receipt: optional barcode of barcode_value, then the paper cut"""
+    out = []
+    if barcode_value:
+        out.append(ALIGN_CENTER + b'\n' + code128_barcode(barcode_value) + b'\n' + ALIGN_LEFT)
+    if cut:
+        out.append(FEED_AND_CUT)
+    return b''.join(out)
+
+
+def compile_receipt(lines, char_width, barcode_value=None, cut=True):
+    """Compile receipt layout lines (text, style, align) into an ESC/POS byte stream"""
+    return INIT + compile_lines(lines, char_width) + receipt_ending(barcode_value, cut)
+
+
+class FileSink:
+    """Writes ESC/POS bytes to a file (appends, so several receipts can be inspected)"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, data):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'ab') as f:
+            f.write(data)
+
+
+class DeviceSink:
+    """Writes ESC/POS bytes to a printer device (/dev/usb/lp0, COM3, ...)"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, data):
+        with open(self.path, 'wb', buffering=0) as f:
+            f.write(data)
+
+
+class SocketSink:
+    """Sends ESC/POS bytes to a network printer's raw port"""
+
+    def __init__(self, host, port=9100, timeout=5):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def send(self, data):
+        with socket.create_connection((self.host, self.port), timeout=self.timeout) as conn:
+            conn.sendall(data)
+
+
+class Win32PrinterSink:
+    """Sends ESC/POS bytes to a Windows printer queue as a RAW job"""
+
+    def __init__(self, printer_name):
+        if not WIN32PRINT_AVAILABLE:
+            raise ImportError("pywin32 is not installed. Please run: pip install pywin32")
+        self.printer_name = printer_name or win32print.GetDefaultPrinter()
+
+    def send(self, data):
+        printer = win32print.OpenPrinter(self.printer_name)
+        try:
+            win32print.StartDocPrinter(printer, 1, ("Receipt", None, "RAW"))
+            try:
+                win32print.StartPagePrinter(printer)
+                win32print.WritePrinter(printer, data)
+                win32print.EndPagePrinter(printer)
+            finally:
+                win32print.EndDocPrinter(printer)
+        finally:
+            win32print.ClosePrinter(printer)
+
+
+def get_printer_sink(target):
+    """Get the sink for a printer target string (see module docstring)"""
+    target = (target or '').strip()
+    if not target:
+        raise ValueError("No receipt printer configured")
+    if target.startswith('tcp://'):
+        host, _, port = target[len('tcp://'):].partition(':')
+        return SocketSink(host, int(port) if port else 9100)
+    if target.startswith('file://'):
+        return FileSink(target[len('file://'):])
+    if target.startswith('win32:'):
+        return Win32PrinterSink(target[len('win32:'):])
+    return DeviceSink(target)
@@ -0,0 +1,85 @@
+"""
+Hot item ranking for the billing quick-add panel
+A frequency-decayed LFU over sold inventory IDs: every sale adds its quantity, and older sales
+count for less (halved every HALF_LIFE_DAYS). The ranking is updated in memory and saved to
+data/hot_items.json so it carries over between sessions.
+"""
+
+import json
+import os
+import time
+
+from config import DATA_DIR
+
+HOT_ITEMS_FILE = os.path.join(DATA_DIR, "hot_items.json")
+
+HALF_LIFE_DAYS = 7
+
+# Items kept in the ranking (the lowest-scored ones are dropped beyond this)
+MAX_TRACKED_ITEMS = 200
+
+# Scores are stored relative to an epoch; rebase once weights grow past this
+_MAX_WEIGHT = 1e6
+
+
+class HotItemRanking:
+    """Decayed sales frequency per inventory ID"""
+
+    def __init__(self, path=HOT_ITEMS_FILE, half_life_days=HALF_LIFE_DAYS, max_items=MAX_TRACKED_ITEMS):
+        self.path = path
+        self.half_life_seconds = half_life_days * 86400
+        self.max_items = max_items
+        self.epoch = time.time()
+        self.scores = {}  # Inventory ID -> score, weighted as of epoch
+        self.load()
+
+    def load(self):
+        """Load the ranking saved by a previous session"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.epoch = float(data['epoch'])
+            self.scores = {int(item_id): float(score) for item_id, score in data['scores'].items()}
+        except Exception:
+            pass  # Start a fresh ranking if the file is missing or unreadable
+
+    def save(self):
+        """Save the ranking (written to a temporary file first so it is never left half-written)"""
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'epoch': self.epoch, 'scores': self.scores}, f)
+            os.replace(temp_path, self.path)
+        except Exception:
+            pass  # Silently fail; the ranking is rebuilt by future sales
+
+    def record_sale(self, items, now=None):
+        """Add the quantities of a bill's items (custom items without inventory ID are ignored)"""
+        weight = self._weight(now or time.time())
+        for item in items:
+            item_id = item.get('inventory_id')
+            if item_id is None:
+                continue
+            self.scores[item_id] = self.scores.get(item_id, 0.0) + item.get('quantity', 1) * weight
+
+        if len(self.scores) > self.max_items:
+            keep = sorted(self.scores, key=self.scores.get, reverse=True)[:self.max_items]
+            self.scores = {item_id: self.scores[item_id] for item_id in keep}
+
+    def top(self, count=24):
+        """Get the hottest inventory IDs, hottest first"""
+        return sorted(self.scores, key=self.scores.get, reverse=True)[:count]
+
+    def _weight(self, now):
+        """
+        Weight of a sale at time now relative to the epoch
+        Growing the weight of new sales is the same as decaying all older scores
+        """
+        weight = 2 ** ((now - self.epoch) / self.half_life_seconds)
+        if weight > _MAX_WEIGHT:
+            # Rebase so scores stay in float range
+            self.scores = {item_id: score / weight for item_id, score in self.scores.items()}
+            self.epoch = now
+            weight = 1.0
+        return weight
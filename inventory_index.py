@@ -0,0 +1,67 @@
+"""
+In-memory inventory index for the billing scan path
+Maps barcode values and item IDs to inventory items, so a scan is a dictionary lookup
+instead of a full inventory read. Rebuilt when the store's inventory_version changes, and on
+a lookup miss (at most every MISS_REFRESH_INTERVAL seconds) in case another device added the item.
+Stock updates do not change inventory_version, so the stock of indexed items may be out of date.
+"""
+
+import time
+
+from barcode_util import get_barcode_value
+
+# Minimum seconds between inventory reloads caused by lookup misses
+MISS_REFRESH_INTERVAL = 5
+
+
+class InventoryIndex:
+    """Barcode and ID lookups over the inventory of a store (db)"""
+
+    def __init__(self, store):
+        self.store = store
+        self.items = []
+        self._by_barcode = {}  # Barcode value (DROP000123) -> item
+        self._by_id = {}  # Item ID -> item
+        self.version = None  # Store inventory_version the index was built from
+        self.builds = 0  # Number of rebuilds, so dependent indexes know when to rebuild too
+        self._built_at = 0.0  # time.monotonic() of the last build
+
+    def refresh(self, force=False):
+        """Rebuild the index if inventory changed since the last build; returns all items"""
+        version = self.store.inventory_version
+        if force or version != self.version:
+            self.rebuild(self.store.get_all_inventory())
+            self.version = version
+            self.builds += 1
+            self._built_at = time.monotonic()
+        return self.items
+
+    def _refresh_on_miss(self):
+        """Reload the inventory after a lookup miss; returns False if it was reloaded too recently"""
+        if time.monotonic() - self._built_at < MISS_REFRESH_INTERVAL:
+            return False
+        self.refresh(force=True)
+        return True
+
+    def rebuild(self, items):
+        """Rebuild the index from a list of inventory items"""
+        self.items = list(items)
+        self._by_id = {item['id']: item for item in self.items}
+        self._by_barcode = {get_barcode_value(item['id']): item for item in self.items}
+
+    def get(self, item_id):
+        """Get inventory item by ID"""
+        self.refresh()
+        item = self._by_id.get(item_id)
+        if item is None and self._refresh_on_miss():
+            item = self._by_id.get(item_id)
+        return item
+
+    def lookup_barcode(self, barcode_value):
+        """Get inventory item by barcode value (DROP000123)"""
+        self.refresh()
+        barcode_value = barcode_value.strip().upper()
+        item = self._by_barcode.get(barcode_value)
+        if item is None and self._refresh_on_miss():
+            item = self._by_barcode.get(barcode_value)
+        return item
@@ -0,0 +1,137 @@
+"""
+Typeahead item search for the billing screen
+Indexes item name, category and barcode with a sorted word list (prefix matches) and trigram
+postings (substring matches), and returns ranked item IDs. Stays responsive with 50,000+ items.
+"""
+
+import bisect
+import heapq
+import re
+
+from barcode_util import get_barcode_value
+from cache_util import LRUCache
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+# Query tokens shorter than this match word prefixes only; longer ones also match substrings
+MIN_SUBSTRING_LENGTH = 3
+
+# Score of a word prefix match by field
+_FIELD_SCORES = {'name': 10, 'barcode': 8, 'category': 4}
+
+
+def _tokenize(text):
+    return _WORD_PATTERN.findall(str(text).lower())
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ItemSearchIndex:
+    """Prefix and trigram index over inventory items, searched by typed text"""
+
+    def __init__(self, items=None):
+        self._words = []  # Sorted (word, field, item_id) entries for prefix search
+        self._trigrams = {}  # Trigram -> set of item IDs whose text contains it
+        self._texts = {}  # Item ID -> lowercase searchable text (name | category | barcode)
+        self._names = {}  # Item ID -> lowercase name
+        self._cache = LRUCache(maxsize=64)  # (query, limit) -> results, cleared on rebuild
+        if items:
+            self.rebuild(items)
+
+    def __len__(self):
+        return len(self._texts)
+
+    def rebuild(self, items):
+        """Rebuild the index from a list of inventory items"""
+        words = []
+        trigrams = {}
+        texts = {}
+        names = {}
+        for item in items:
+            item_id = item['id']
+            name = str(item.get('name', '')).lower()
+            fields = (
+                ('name', name),
+                ('category', str(item.get('category', '')).lower()),
+                ('barcode', get_barcode_value(item_id).lower())
+            )
+            for field, value in fields:
+                for word in _tokenize(value):
+                    words.append((word, field, item_id))
+            text = ' | '.join(value for _, value in fields)
+            for trigram in _trigrams(text):
+                postings = trigrams.get(trigram)
+                if postings is None:
+                    trigrams[trigram] = {item_id}
+                else:
+                    postings.add(item_id)
+            texts[item_id] = text
+            names[item_id] = name
+        words.sort()
+        self._words = words
+        self._trigrams = trigrams
+        self._texts = texts
+        self._names = names
+        self._cache.clear()
+
+    def search(self, query, limit=10):
+        """
+        Search items by typed text; returns up to limit item IDs, best match first
+        Every query word must start a word of the item (or, from 3 letters, appear anywhere in it)
+        """
+        query = ' '.join(_tokenize(query))
+        if not query:
+            return []
+        cache_key = (query, limit)
+        results = self._cache.get(cache_key)
+        if results is not None:
+            return results
+
+        tokens = query.split()
+        scores = None
+        for token in tokens:
+            token_scores = self._match_token(token)
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {item_id: scores[item_id] + score
+                          for item_id, score in token_scores.items() if item_id in scores}
+            if not scores:
+                break
+
+        names = self._names
+        results = [] if not scores else [
+            item_id for _, _, item_id in heapq.nsmallest(
+                limit,
+                ((-score - (100 if names[item_id].startswith(query) else 0), names[item_id], item_id)
+                 for item_id, score in scores.items()),
+                key=lambda entry: (entry[0], len(entry[1]), entry[1])
+            )
+        ]
+        self._cache.put(cache_key, results)
+        return results
+
+    def _match_token(self, token):
+        """Get item ID -> score for items matching one query word"""
+        scores = {}
+        # Word prefix matches score by field
+        start = bisect.bisect_left(self._words, (token,))
+        end = bisect.bisect_left(self._words, (token + '\uffff',), lo=start)
+        for word, field, item_id in self._words[start:end]:
+            score = _FIELD_SCORES[field]
+            if word == token:
+                score += 2
+            if score > scores.get(item_id, 0):
+                scores[item_id] = score
+
+        # Substring matches (e.g. "ola" in "Cola") through trigram postings
+        if len(token) >= MIN_SUBSTRING_LENGTH:
+            postings = sorted((self._trigrams.get(t, set()) for t in _trigrams(token)), key=len)
+            candidates = set.intersection(*postings) if postings and postings[0] else set()
+            texts = self._texts
+            for item_id in candidates:
+                if item_id not in scores and token in texts[item_id]:
+                    scores[item_id] = 1
+        return scores
@@ -3,15 +3,21 @@ DROP - Desktop Billing Application
 Main entry point for the application
 """
 
+import multiprocessing
 import tkinter as tk
 from login_screen import LoginScreen
+from archiver import start_background_archiving
 
 def main():
     """Initialize and run the DROP billing application"""
     root = tk.Tk()
+    # Roll closed days of receipts, reports and bill files into archive bundles
+    start_background_archiving()
     app = LoginScreen(root)
     root.mainloop()
 
 if __name__ == "__main__":
+    # Needed for process pools (barcode batches) in the packaged executable
+    multiprocessing.freeze_support()
     main()
 
@@ -0,0 +1,311 @@
+"""
+Background print spooler
+Print jobs are written to data/print_queue first and printed on a worker thread, so printing
+never blocks the UI and queued receipts survive a printer jam or an app restart.
+- Failed jobs are retried with backoff (up to MAX_ATTEMPTS, then marked failed)
+- Jobs submitted with the same key while one is still queued are coalesced into one
+- Consecutive raw jobs for the same printer are sent in one connection
+- File jobs keep their own copy of the file, so a receipt archived or evicted from the receipt
+  cache while the job waits still prints
+"""
+
+import base64
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+from config import DATA_DIR
+from escpos import get_printer_sink
+
+PRINT_QUEUE_DIR = os.path.join(DATA_DIR, "print_queue")
+
+# Retry delays in seconds (doubling up to the maximum) and attempts before a job fails
+RETRY_DELAY = 1
+MAX_RETRY_DELAY = 60
+MAX_ATTEMPTS = 10
+
+# Finished jobs kept for status queries
+MAX_FINISHED_JOBS = 100
+
+# Job statuses
+QUEUED = 'queued'
+PRINTING = 'printing'
+RETRYING = 'retrying'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def print_text_file(path):
+    """Print a text file with the system print command"""
+    if sys.platform == 'win32':
+        os.startfile(path, "print")
+    elif sys.platform == 'darwin':
+        subprocess.run(['lpr', path], check=True)
+    else:
+        subprocess.run(['lp', path], check=True)
+
+
+class PrintSpooler:
+    """Persistent print queue with a worker thread"""
+
+    def __init__(self, queue_dir=PRINT_QUEUE_DIR):
+        self.queue_dir = queue_dir
+        self._jobs = {}  # Job ID -> job dict (queued, printing, retrying, done and failed jobs)
+        self._order = []  # IDs of jobs waiting to print, in print order
+        self._finished = []  # IDs of printed jobs, oldest first
+        self._condition = threading.Condition()
+        self._load_queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit_raw(self, printer, data, description='', key=None):
+        """Queue raw printer bytes (ESC/POS) for a printer target; returns the job ID"""
+        return self._submit({
+            'kind': 'raw',
+            'printer': printer,
+            'data': base64.b64encode(data).decode('ascii')
+        }, description, key)
+
+    def submit_file(self, path, description='', key=None):
+        """Queue a text file for the system print command (its content is read now); returns the job ID"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        return self._submit({
+            'kind': 'file',
+            'path': path,
+            'name': os.path.basename(path),
+            'data': base64.b64encode(data).decode('ascii')
+        }, description, key)
+
+    def get_job(self, job_id):
+        """Get a job's status: dict with id, description, status, attempts and error"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            return self._public(job) if job else None
+
+    def get_jobs(self):
+        """Get the status of all known jobs, oldest first"""
+        with self._condition:
+            return [self._public(job) for job in sorted(self._jobs.values(), key=lambda j: j['created'])]
+
+    @property
+    def pending(self):
+        """Number of jobs waiting to print"""
+        with self._condition:
+            return len(self._order)
+
+    def cancel(self, job_id):
+        """Remove a waiting or failed job; returns False if it is printing or unknown"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if not job or job['status'] == PRINTING:
+                return False
+            if job_id in self._order:
+                self._order.remove(job_id)
+            del self._jobs[job_id]
+            self._remove_file(job)
+            self._remove_print_copy(job)
+            return True
+
+    def retry(self, job_id):
+        """Queue a failed job again"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if not job or job['status'] != FAILED:
+                return False
+            job['status'] = QUEUED
+            job['attempts'] = 0
+            job['error'] = None
+            self._write_file(job)
+            self._order.append(job_id)
+            self._condition.notify()
+            return True
+
+    def _submit(self, payload, description, key):
+        with self._condition:
+            if key is not None:
+                for job_id in self._order:
+                    if self._jobs[job_id].get('key') == key:
+                        return job_id  # Same receipt is already waiting
+
+            job = {
+                'id': f"{time.time_ns():020d}_{uuid.uuid4().hex[:8]}",  # Sorts in submit order
+                'description': description,
+                'key': key,
+                'status': QUEUED,
+                'attempts': 0,
+                'error': None,
+                'created': time.time(),
+                **payload
+            }
+            self._write_file(job)
+            self._jobs[job['id']] = job
+            self._order.append(job['id'])
+            self._condition.notify()
+            return job['id']
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._order:
+                    self._condition.wait()
+                batch = self._take_batch()
+                for job in batch:
+                    job['status'] = PRINTING
+
+            try:
+                self._print(batch)
+            except Exception as e:
+                self._on_failure(batch, e)
+                continue
+
+            with self._condition:
+                for job in batch:
+                    job['status'] = DONE
+                    job['error'] = None
+                    self._remove_file(job)
+                    self._finished.append(job['id'])
+                while len(self._finished) > MAX_FINISHED_JOBS:
+                    forgotten = self._jobs.pop(self._finished.pop(0), None)
+                    if forgotten:
+                        # The print command may still be reading the copy right after printing
+                        self._remove_print_copy(forgotten)
+
+    def _take_batch(self):
+        """Take the next job, plus following raw jobs for the same printer (sent together)"""
+        first = self._jobs[self._order[0]]
+        count = 1
+        if first['kind'] == 'raw':
+            while count < len(self._order):
+                job = self._jobs[self._order[count]]
+                if job['kind'] != 'raw' or job['printer'] != first['printer']:
+                    break
+                count += 1
+        batch = [self._jobs[job_id] for job_id in self._order[:count]]
+        del self._order[:count]
+        return batch
+
+    def _print(self, batch):
+        first = batch[0]
+        if first['kind'] == 'raw':
+            data = b''.join(base64.b64decode(job['data']) for job in batch)
+            get_printer_sink(first['printer']).send(data)
+        else:
+            print_text_file(self._get_print_copy(first))
+
+    def _on_failure(self, batch, error):
+        with self._condition:
+            retry_ids = []
+            for job in batch:
+                if job['id'] not in self._jobs:
+                    continue  # Cancelled while printing
+                job['attempts'] += 1
+                job['error'] = str(error)
+                if job['attempts'] >= MAX_ATTEMPTS:
+                    job['status'] = FAILED
+                else:
+                    job['status'] = RETRYING
+                    retry_ids.append(job['id'])
+                self._write_file(job)
+            # Failed jobs go back to the front so receipts still print in order
+            self._order[:0] = retry_ids
+            attempts = max((job['attempts'] for job in batch), default=1)
+
+        if retry_ids:
+            time.sleep(min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY))
+
+    def _load_queue(self):
+        """Load jobs left in the queue directory by a previous session"""
+        try:
+            names = sorted(os.listdir(self.queue_dir))
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.queue_dir, name), 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+            except Exception:
+                continue
+            self._jobs[job['id']] = job
+            if job['status'] == FAILED:
+                continue
+            job['status'] = QUEUED
+            self._order.append(job['id'])
+        # Copies of files printed by jobs finished in a previous session
+        for name in names:
+            if name.endswith('.json') or name.endswith('.tmp'):
+                continue
+            if '_'.join(name.split('_', 2)[:2]) not in self._jobs:
+                try:
+                    os.remove(os.path.join(self.queue_dir, name))
+                except OSError:
+                    pass
+
+    def _print_copy_path(self, job):
+        return os.path.join(self.queue_dir, f"{job['id']}_{job['name']}")
+
+    def _get_print_copy(self, job):
+        """Path of the job's own copy of its file (written on first use)"""
+        if 'data' not in job:
+            return job['path']  # Queued before jobs kept a copy
+        path = self._print_copy_path(job)
+        if not os.path.exists(path):
+            os.makedirs(self.queue_dir, exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(base64.b64decode(job['data']))
+        return path
+
+    def _remove_print_copy(self, job):
+        if job['kind'] == 'file' and 'data' in job:
+            try:
+                os.remove(self._print_copy_path(job))
+            except OSError:
+                pass
+
+    def _job_path(self, job):
+        return os.path.join(self.queue_dir, f"{job['id']}.json")
+
+    def _write_file(self, job):
+        try:
+            os.makedirs(self.queue_dir, exist_ok=True)
+            path = self._job_path(job)
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(job, f)
+            os.replace(path + '.tmp', path)
+        except Exception:
+            pass  # The job still prints; it just would not survive a restart
+
+    def _remove_file(self, job):
+        try:
+            os.remove(self._job_path(job))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _public(job):
+        return {
+            'id': job['id'],
+            'description': job['description'],
+            'status': job['status'],
+            'attempts': job['attempts'],
+            'error': job['error']
+        }
+
+
+_spooler = None
+_spooler_lock = threading.Lock()
+
+
+def get_print_spooler():
+    """Get the shared print spooler (started on first use)"""
+    global _spooler
+    with _spooler_lock:
+        if _spooler is None:
+            _spooler = PrintSpooler()
+        return _spooler
@@ -0,0 +1,156 @@
+"""
+Rendered receipt cache for reprints
+Rendered receipts (text or ESC/POS) are stored once under data/receipt_cache, named by the hash
+of their content, and found through an index keyed by bill ID, bill-settings hash and kind.
+Reprints are served from the cache without fetching or rendering the bill again; the least
+recently used receipts are evicted when the cache grows past its size limit.
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+from config import DATA_DIR
+
+RECEIPT_CACHE_DIR = os.path.join(DATA_DIR, "receipt_cache")
+
+# Disk space the cached receipts may use
+MAX_RECEIPT_CACHE_BYTES = 16 * 1024 * 1024
+
+# Receipt kinds and their file extensions
+TEXT = 'text'
+ESCPOS = 'escpos'
+_EXTENSIONS = {TEXT: '.txt', ESCPOS: '.bin'}
+
+
+def settings_hash(settings):
+    """Short hash of bill settings (receipts rendered with other settings are not reused)"""
+    encoded = json.dumps(settings, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+
+class ReceiptCache:
+    """Content-addressed disk cache of rendered receipts with LRU eviction"""
+
+    def __init__(self, cache_dir=RECEIPT_CACHE_DIR, max_bytes=MAX_RECEIPT_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, "index.json")
+        # "bill_id|settings_hash|kind" -> {'hash': content hash, 'size': bytes}, least recently used first
+        self._index = OrderedDict()
+        self._refs = {}  # Content hash -> number of index entries using it
+        self._sizes = {}  # Content hash -> size in bytes
+        self.total_bytes = 0
+        self._load_index()
+
+    def get(self, bill_id, settings_key, kind):
+        """Get the cached receipt file path, or None"""
+        key = self._key(bill_id, settings_key, kind)
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        path = self._blob_path(entry['hash'], kind)
+        if not os.path.exists(path):
+            self._remove_entry(key)  # Deleted from disk behind our back
+            self._save_index()
+            return None
+        self._index.move_to_end(key)
+        self._save_index()
+        return path
+
+    def put(self, bill_id, settings_key, kind, data):
+        """Store a rendered receipt (bytes); returns its file path"""
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(content_hash, kind)
+        if not os.path.exists(path):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(path + '.tmp', path)
+
+        key = self._key(bill_id, settings_key, kind)
+        if key in self._index:
+            self._remove_entry(key)
+        self._add_entry(key, content_hash, len(data))
+        self._evict()
+        self._save_index()
+        return path
+
+    def discard(self, bill_id):
+        """Forget all cached receipts of a bill (edited or deleted)"""
+        prefix = f"{bill_id}|"
+        keys = [key for key in self._index if key.startswith(prefix)]
+        for key in keys:
+            self._remove_entry(key)
+        if keys:
+            self._save_index()
+
+    def clear(self):
+        """Forget all cached receipts"""
+        for key in list(self._index):
+            self._remove_entry(key)
+        self._save_index()
+
+    @staticmethod
+    def _key(bill_id, settings_key, kind):
+        return f"{bill_id}|{settings_key}|{kind}"
+
+    def _blob_path(self, content_hash, kind):
+        return os.path.join(self.cache_dir, content_hash + _EXTENSIONS[kind])
+
+    def _add_entry(self, key, content_hash, size):
+        self._index[key] = {'hash': content_hash, 'size': size}
+        if content_hash not in self._refs:
+            self._refs[content_hash] = 0
+            self._sizes[content_hash] = size
+            self.total_bytes += size
+        self._refs[content_hash] += 1
+
+    def _remove_entry(self, key):
+        entry = self._index.pop(key)
+        content_hash = entry['hash']
+        self._refs[content_hash] -= 1
+        if self._refs[content_hash] == 0:
+            # No other bill or settings share this content: delete the file
+            del self._refs[content_hash]
+            self.total_bytes -= self._sizes.pop(content_hash)
+            kind = key.rsplit('|', 1)[1]
+            try:
+                os.remove(self._blob_path(content_hash, kind))
+            except OSError:
+                pass
+
+    def _evict(self):
+        # Keep the most recent receipt even if it alone is over the limit
+        while self.total_bytes > self.max_bytes and len(self._index) > 1:
+            self._remove_entry(next(iter(self._index)))
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except Exception:
+            return  # No index yet (or unreadable): start empty
+        for key, entry in entries:
+            self._add_entry(key, entry['hash'], entry['size'])
+
+    def _save_index(self):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self.index_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(list(self._index.items()), f)
+            os.replace(self.index_path + '.tmp', self.index_path)
+        except Exception:
+            pass  # Cache is best effort
+
+
+_receipt_cache = None
+
+
+def get_receipt_cache():
+    """Get the shared receipt cache"""
+    global _receipt_cache
+    if _receipt_cache is None:
+        _receipt_cache = ReceiptCache()
+    return _receipt_cache
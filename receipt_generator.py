@@ -5,6 +5,11 @@ Receipt generator for printing bills and generating reports
 import os
 from datetime import datetime
 from config import RECEIPTS_DIR, BILLS_DIR, SHOP_NAME
+from bill_dates import format_bill_date
+from bill_settings import bill_settings
+from receipt_layout import get_receipt_template
+from receipt_cache import get_receipt_cache, settings_hash, TEXT, ESCPOS
+from print_spooler import get_print_spooler
 
 def generate_receipt(bill, user):
     """
@@ -15,42 +20,53 @@ def generate_receipt(bill, user):
     
     receipt_path = os.path.join(RECEIPTS_DIR, f"receipt_{bill['id']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
     
-    with open(receipt_path, 'w') as f:
-        # Header
-        f.write("=" * 50 + "\n")
-        f.write(f"    {SHOP_NAME} - Clothing Shop\n")
-        f.write("=" * 50 + "\n\n")
-        
-        # Bill info
-        f.write(f"Bill ID: #{bill['id']}\n")
-        f.write(f"Date: {datetime.fromisoformat(bill['date']).strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Staff: {user['name'] if user else 'Unknown'}\n")
-        f.write("-" * 50 + "\n\n")
-        
-        # Items
-        f.write("Items:\n")
-        f.write("-" * 50 + "\n")
-        f.write(f"{'Item':<30} {'Qty':<6} {'Price':<12} {'Total':<12}\n")
-        f.write("-" * 50 + "\n")
-        
-        for item in bill['items']:
-            item_name = item['name'][:28] if len(item['name']) <= 28 else item['name'][:25] + "..."
-            f.write(f"{item_name:<30} {item['quantity']:<6} ₹{item['price']:<11.2f} ₹{item['total']:<11.2f}\n")
-        
-        f.write("-" * 50 + "\n")
-        
-        # Total
-        f.write(f"\n{'Subtotal:':<48} ₹{bill['total']:.2f}\n")
-        f.write(f"{'Total:':<48} ₹{bill['total']:.2f}\n")
-        f.write(f"\nPayment Method: {bill['payment_method']}\n")
-        
-        # Footer
-        f.write("\n" + "=" * 50 + "\n")
-        f.write("    Thank you for shopping at DROP!\n")
-        f.write("=" * 50 + "\n")
+    # Same receipt template as the bill preview and the receipt printer
+    template = get_receipt_template(bill_settings.get()['char_width'])
+    receipt_text = template.render_text(
+        bill['id'], bill['items'], bill['total'], bill['payment_method'],
+        format_bill_date(bill, seconds=True), user['name'] if user else 'Unknown'
+    )
+    
+    with open(receipt_path, 'w', encoding='utf-8') as f:
+        f.write(receipt_text)
     
     return receipt_path
 
+def reprint_receipt(bill_id):
+    """
+    Queue a bill's receipt for printing, served from the receipt cache when it was rendered before
+    Returns the print job ID, or None if the bill does not exist
+    """
+    settings = bill_settings.get()
+    printer = settings.get('printer')
+    kind = ESCPOS if printer else TEXT
+    settings_key = settings_hash(settings)
+    cache = get_receipt_cache()
+    
+    receipt_path = cache.get(bill_id, settings_key, kind)
+    if receipt_path is None:
+        from database import db
+        bill = db.get_bill(bill_id)
+        if not bill:
+            return None
+        user = db.get_user(bill['user_id'])
+        template = get_receipt_template(settings['char_width'])
+        bill_args = (
+            bill['id'], bill['items'], bill['total'], bill['payment_method'],
+            format_bill_date(bill, seconds=True), user['name'] if user else 'Unknown'
+        )
+        if printer:
+            data = template.render_escpos(*bill_args, barcode_value=str(bill['id']))
+        else:
+            data = template.render_text(*bill_args).encode('utf-8')
+        receipt_path = cache.put(bill_id, settings_key, kind, data)
+    
+    spooler = get_print_spooler()
+    if printer:
+        with open(receipt_path, 'rb') as f:
+            return spooler.submit_raw(printer, f.read(), f"Receipt {bill_id}", key=f"receipt-{bill_id}")
+    return spooler.submit_file(receipt_path, f"Receipt {bill_id}", key=f"receipt-{bill_id}")
+
 def generate_text_report(bills):
     """
     Generate a sales report text file
@@ -87,7 +103,7 @@ def generate_text_report(bills):
         f.write("-" * 70 + "\n")
         
         for bill in bills:
-            date_str = datetime.fromisoformat(bill['date']).strftime('%Y-%m-%d %H:%M')
+            date_str = format_bill_date(bill)
             f.write(f"#{bill['id']:<9} {date_str:<20} {len(bill['items']):<8} ₹{bill['total']:<14.2f} {bill['payment_method']:<15}\n")
         
         f.write("\n" + "=" * 70 + "\n")
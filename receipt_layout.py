@@ -0,0 +1,307 @@
+"""
+Receipt layout model
+A receipt is laid out as a list of lines (text, style, align) for a character width.
+The same layout is turned into printable text (layout_to_text), ESC/POS bytes (escpos.py) and
+drawn on a single Canvas by ReceiptCanvasRenderer for the bill preview.
+
+ReceiptTemplate compiles the layout for a character width once: the shop header, rules and
+footer are laid out and rendered to text and ESC/POS up front, so filling in a bill only lays
+out its own lines (date, bill number, items, totals) and joins the pieces.
+"""
+
+import tkinter as tk
+from tkinter import font as tkfont
+from datetime import datetime
+
+from config import SHOP_NAME, SHOP_TAGLINE, SHOP_ADDRESS
+from escpos import INIT, compile_lines, receipt_ending
+
+THANK_YOU_MESSAGE = "Thank you for shopping at DROP!"
+
+# Sample bill for test prints and the settings preview
+SAMPLE_BILL_ITEMS = [
+    {'name': 'Test Item 1', 'quantity': 2, 'price': 25.00, 'total': 50.00},
+    {'name': 'Test Item 2', 'quantity': 1, 'price': 40.00, 'total': 40.00},
+    {'name': 'Sample Product Name', 'quantity': 3, 'price': 15.50, 'total': 46.50}
+]
+
+# Wrapped product name lines remembered per template
+MAX_CACHED_NAMES = 4096
+
+# Canvas fonts per line style (same fonts the label-based preview used)
+STYLE_FONTS = {
+    'title': ('Arial', 20, 'bold'),
+    'tagline': ('Arial', 9, 'italic'),
+    'small': ('Arial', 8),
+    'normal': ('Arial', 9),
+    'bold': ('Arial', 9, 'bold'),
+    'total': ('Arial', 11, 'bold')
+}
+
+
+def _line(text, style='normal', align='left'):
+    """A layout line; text None is a full-width rule, '' is a blank line"""
+    return (text, style, align)
+
+
+def wrap_address(address, width):
+    """Split the address into lines of at most width characters, breaking at commas"""
+    address = address.strip()
+    if len(address) <= width:
+        return [address]
+
+    lines = []
+    parts = address.split(',')
+    line = ""
+    for i, part in enumerate(parts):
+        part = part.strip()
+        if not part:
+            continue
+
+        # Add comma if not the last part
+        part_with_comma = part + (',' if i < len(parts) - 1 else '')
+
+        # Check if adding this part would exceed width
+        if line:
+            test_line = (line + ', ' + part_with_comma).strip()
+        else:
+            test_line = part_with_comma
+
+        if len(test_line) <= width:
+            if line:
+                line += ', ' + part_with_comma
+            else:
+                line = part_with_comma
+        else:
+            if line.strip():
+                lines.append(line.strip())
+            line = part_with_comma
+    if line.strip():
+        lines.append(line.strip())
+    return lines
+
+
+def wrap_product_name(product_name, width):
+    """Get the 'Product: name' line(s), wrapped to width characters"""
+    product_line = f"Product: {product_name}"
+    if len(product_line) <= width:
+        return [product_line]
+
+    lines = []
+    line = "Product: "
+    for word in product_name.split():
+        if len(line + word) <= width:
+            line += word + " "
+        else:
+            if line.strip() != "Product:":
+                lines.append(line.strip())
+            line = "  " + word + " "
+    if line.strip():
+        lines.append(line.strip())
+    return lines
+
+
+class _StaticSegment:
+    """Lines that are the same on every receipt, rendered once"""
+
+    def __init__(self, lines, char_width):
+        self.lines = lines
+        self.text = layout_to_text(lines, char_width) if lines else ''
+        self.escpos = compile_lines(lines, char_width)
+
+
+class ReceiptTemplate:
+    """Receipt layout compiled for one character width"""
+
+    def __init__(self, char_width):
+        self.char_width = char_width
+        self._name_lines = {}  # Product name -> wrapped 'Product:' lines
+
+        header = [
+            _line(None),
+            _line(SHOP_NAME, 'title'),
+            _line(SHOP_TAGLINE, 'tagline')
+        ]
+        header.extend(_line(address_line, 'small') for address_line in wrap_address(SHOP_ADDRESS, char_width))
+        header.append(_line(''))
+        footer = [
+            _line(None),
+            _line(THANK_YOU_MESSAGE, 'normal', 'center'),
+            _line(None)
+        ]
+
+        # Render plan: static segments and slots (methods laying out lines from the bill)
+        self._plan = [
+            _StaticSegment(header, char_width),
+            self._bill_info_lines,
+            _StaticSegment([_line(None), _line('')], char_width),
+            self._item_lines,
+            self._total_lines,
+            _StaticSegment(footer, char_width)
+        ]
+
+    def layout(self, bill_id, items, total, payment_method, date_str=None, staff_name=None):
+        """Lay out a bill as a list of (text, style, align) lines"""
+        lines = []
+        for segment in self._segments(bill_id, items, total, payment_method, date_str, staff_name):
+            lines.extend(segment if isinstance(segment, list) else segment.lines)
+        return lines
+
+    def render_text(self, bill_id, items, total, payment_method, date_str=None, staff_name=None):
+        """Render a bill as printable text"""
+        return ''.join(
+            segment.text if isinstance(segment, _StaticSegment) else ''.join(text + "\n" for text, _, _ in segment)
+            for segment in self._segments(bill_id, items, total, payment_method, date_str, staff_name)
+        )
+
+    def render_escpos(self, bill_id, items, total, payment_method, date_str=None, staff_name=None,
+                      barcode_value=None, cut=True):
+        """Render a bill as an ESC/POS byte stream"""
+        body = b''.join(
+            segment.escpos if isinstance(segment, _StaticSegment) else compile_lines(segment, self.char_width)
+            for segment in self._segments(bill_id, items, total, payment_method, date_str, staff_name)
+        )
+        return INIT + body + receipt_ending(barcode_value, cut)
+
+    def _segments(self, bill_id, items, total, payment_method, date_str, staff_name):
+        """Static segments as they are and the slots' lines for this bill, in receipt order"""
+        bill = {
+            'id': bill_id,
+            'items': items,
+            'total': total,
+            'payment_method': payment_method,
+            'date': date_str or datetime.now().strftime("%Y-%m-%d"),
+            'staff_name': staff_name
+        }
+        return [segment if isinstance(segment, _StaticSegment) else segment(bill) for segment in self._plan]
+
+    def _bill_info_lines(self, bill):
+        lines = [
+            _line(f"DATE: {bill['date']}"),
+            _line(f"BILL NO: {bill['id']}")
+        ]
+        if bill['staff_name']:
+            lines.append(_line(f"STAFF: {bill['staff_name']}"))
+        return lines
+
+    def _item_lines(self, bill):
+        lines = []
+        for item in bill['items']:
+            lines.extend(_line(product_line) for product_line in self._wrap_name(item['name']))
+            lines.extend([
+                _line(f"Rate: ₹{item['price']:.2f}"),
+                _line(f"Quantity: {item['quantity']}"),
+                _line(f"Total Price: ₹{item['total']:.2f}", 'bold'),
+                _line('')
+            ])
+        return lines
+
+    def _total_lines(self, bill):
+        return [
+            _line(f"TOTAL: ₹{bill['total']:.2f}", 'total'),
+            _line(''),
+            _line(f"Payment: {bill['payment_method']}"),
+            _line('')
+        ]
+
+    def _wrap_name(self, name):
+        name_lines = self._name_lines.get(name)
+        if name_lines is None:
+            if len(self._name_lines) >= MAX_CACHED_NAMES:
+                self._name_lines.clear()
+            name_lines = wrap_product_name(name, self.char_width)
+            self._name_lines[name] = name_lines
+        return name_lines
+
+
+# Compiled templates per character width (the only setting that changes the layout;
+# alignment and margins are applied when drawing)
+_templates = {}
+
+
+def get_receipt_template(char_width):
+    """Get the compiled receipt template for a character width"""
+    template = _templates.get(char_width)
+    if template is None:
+        template = ReceiptTemplate(char_width)
+        _templates[char_width] = template
+    return template
+
+
+def build_receipt_layout(bill_id, items, total, payment_method, char_width, date_str=None):
+    """Lay out a receipt as a list of (text, style, align) lines for char_width characters"""
+    return get_receipt_template(char_width).layout(bill_id, items, total, payment_method, date_str)
+
+
+def layout_to_text(lines, char_width):
+    """Turn a receipt layout into printable text (centered lines are padded with spaces)"""
+    text = []
+    for line_text, _, align in lines:
+        if line_text is None:
+            text.append("=" * char_width)
+        elif align == 'center':
+            padding = (char_width - len(line_text)) // 2
+            text.append(" " * padding + line_text if padding > 0 else line_text)
+        else:
+            text.append(line_text)
+    return "\n".join(text) + "\n"
+
+
+# Font and metrics per (Tk interpreter, style): (font, line height, character width)
+_font_metrics = {}
+
+
+def get_font_metrics(widget, style):
+    """Get (font, line height, average character width) for a style, measured once"""
+    key = (widget.tk, style)
+    metrics = _font_metrics.get(key)
+    if metrics is None:
+        font = tkfont.Font(root=widget, font=STYLE_FONTS[style])
+        metrics = (font, font.metrics('linespace'), font.measure('0'))
+        _font_metrics[key] = metrics
+    return metrics
+
+
+class ReceiptCanvasRenderer:
+    """Draws a receipt layout on one Canvas (one text item per line instead of one widget)"""
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+
+    def render(self, lines, char_width, alignment='Left', margins=(0, 0, 0, 0)):
+        """
+        Draw lines (replacing the previous drawing); margins are (top, right, bottom, left) pixels
+        Returns the drawn (width, height)
+        """
+        canvas = self.canvas
+        margin_top, margin_right, margin_bottom, margin_left = margins
+        canvas.delete('receipt')
+
+        _, _, normal_char_width = get_font_metrics(canvas, 'normal')
+        content_width = char_width * normal_char_width
+        left = margin_left + 4
+        center = left + content_width / 2
+
+        y = margin_top + 4
+        for text, style, align in lines:
+            font, line_height, _ = get_font_metrics(canvas, style)
+            if text is None:
+                canvas.create_line(left, y + line_height // 2, left + content_width, y + line_height // 2,
+                                   fill='#000000', tags='receipt')
+            elif text:
+                if align == 'center' or alignment == 'Center':
+                    item = canvas.create_text(center, y, text=text, font=font, anchor='n', fill='#000000',
+                                              justify=tk.CENTER, width=content_width, tags='receipt')
+                else:
+                    item = canvas.create_text(left, y, text=text, font=font, anchor='nw', fill='#000000',
+                                              width=content_width, tags='receipt')
+                # Lines too wide for the paper (e.g. double-size titles) wrap: move down past all of it
+                bbox = canvas.bbox(item)
+                if bbox:
+                    line_height = max(line_height, bbox[3] - bbox[1])
+            y += line_height
+
+        width = left + content_width + margin_right + 4
+        height = y + margin_bottom + 4
+        canvas.configure(scrollregion=(0, 0, width, height))
+        return width, height
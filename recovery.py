@@ -0,0 +1,257 @@
+"""
+Rebuild database.json from the individual bill files
+Use when database.json is lost or corrupted: every bill file in bills_json (including its
+YYYY/MM folders) and in the bills_json archive bundles is parsed on all CPU cores, validated and
+deduplicated by bill number (the copy with the latest timestamp wins; copies that differ are
+reported); bills deleted since their file was written (per the bill file manifest,
+bills_json_manifest.jsonl) are dropped, then the bills and the monthly sales rollup are written
+back to database.json. Users and inventory are kept from the current database.json when it is readable.
+
+Close the app first, then run:
+    python recovery.py [--workers N] [--dry-run]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from config import DATA_DIR, BILLS_JSON_DIR
+from bill_dates import backfill_bill_dates, get_bill_day, get_bill_timestamp
+from bill_index import format_bill_id, get_bill_numeric_id
+from bill_file_writer import BILL_FILE_MANIFEST
+
+DATABASE_FILE = os.path.join(DATA_DIR, "database.json")
+ARCHIVED_BILLS_DIR = os.path.join(DATA_DIR, "archive", "bills_json")
+
+# Bill files parsed per worker task (fewer, larger tasks keep inter-process overhead low)
+FILES_PER_TASK = 500
+
+
+def validate_bill(bill):
+    """Return the bill with its numeric_id set if it is a usable bill, otherwise None"""
+    if not isinstance(bill, dict) or not isinstance(bill.get('items'), list):
+        return None
+    if not isinstance(bill.get('total'), (int, float)) or 'user_id' not in bill:
+        return None
+    try:
+        numeric_id = get_bill_numeric_id(bill)
+    except (TypeError, ValueError):
+        return None
+    if not numeric_id:
+        return None
+    for item in bill['items']:
+        if not isinstance(item, dict) or 'name' not in item or 'quantity' not in item:
+            return None
+    bill['numeric_id'] = numeric_id
+    if not isinstance(bill.get('id'), str):
+        bill['id'] = format_bill_id(numeric_id)
+    backfill_bill_dates([bill])
+    return bill
+
+
+def _parse_files(paths):
+    """Worker: parse and validate bill files; returns (bills, invalid file count)"""
+    bills = []
+    invalid = 0
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                bill = validate_bill(json.loads(f.read()))
+        except (OSError, ValueError):
+            bill = None
+        if bill is None:
+            invalid += 1
+        else:
+            bills.append(bill)
+    return bills, invalid
+
+
+def _parse_bundle(bundle_path):
+    """Worker: parse and validate the bill files in an archive bundle"""
+    bills = []
+    invalid = 0
+    try:
+        with zipfile.ZipFile(bundle_path) as archive:
+            for name in archive.namelist():
+                try:
+                    bill = validate_bill(json.loads(archive.read(name)))
+                except (KeyError, ValueError):
+                    bill = None
+                if bill is None:
+                    invalid += 1
+                else:
+                    bills.append(bill)
+    except (OSError, zipfile.BadZipFile):
+        invalid += 1
+    return bills, invalid
+
+
+def find_bill_sources(bills_dir=BILLS_JSON_DIR, archive_dir=ARCHIVED_BILLS_DIR):
+    """Get (archive bundle paths, loose bill file paths), each oldest first"""
+    bundles = []
+    if os.path.isdir(archive_dir):
+        bundles = sorted(
+            os.path.join(archive_dir, name) for name in os.listdir(archive_dir) if name.endswith('.zip')
+        )
+    files = []
+    for root, _, file_names in os.walk(bills_dir):
+        files.extend(os.path.join(root, name) for name in file_names if name.endswith('.json'))
+    files.sort()
+    return bundles, files
+
+
+def load_deleted_bill_ids(manifest_path=BILL_FILE_MANIFEST):
+    """IDs of bills whose last bill file manifest record is a delete"""
+    deleted = set()
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            for record_text in f:
+                try:
+                    record = json.loads(record_text)
+                except ValueError:
+                    continue  # Torn last record
+                if record.get('deleted'):
+                    deleted.add(record['id'])
+                else:
+                    deleted.discard(record['id'])
+    except OSError:
+        pass  # No manifest: nothing is known to be deleted
+    return deleted
+
+
+def build_monthly_sales(bills):
+    """Rebuild the monthly sales rollup (month -> inventory item ID -> quantity) from bills"""
+    monthly_sales = {}
+    for bill in bills:
+        month = get_bill_day(bill)[:7]
+        if not month:
+            continue
+        month_sales = monthly_sales.setdefault(month, {})
+        for item in bill['items']:
+            item_id = item.get('inventory_id')
+            if item_id:
+                item_key = str(item_id)
+                month_sales[item_key] = month_sales.get(item_key, 0) + item['quantity']
+    return monthly_sales
+
+
+def recover_bills(bills_dir=BILLS_JSON_DIR, archive_dir=ARCHIVED_BILLS_DIR, workers=None,
+                  manifest_path=BILL_FILE_MANIFEST):
+    """
+    Parse all bill files in parallel
+    Returns (bills sorted by bill number, stats dict); for duplicate bill numbers the copy with
+    the latest timestamp wins (on a tie the loose file over archived copies). Copies with different
+    contents are listed in stats['conflict_ids']. Deleted bills are left out.
+    """
+    started = time.perf_counter()
+    bundles, files = find_bill_sources(bills_dir, archive_dir)
+    batches = [files[i:i + FILES_PER_TASK] for i in range(0, len(files), FILES_PER_TASK)]
+
+    by_number = {}
+    conflict_ids = set()
+    parsed = 0
+    invalid = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map keeps task order, so on equal timestamps later sources overwrite earlier ones
+        bundle_results = executor.map(_parse_bundle, bundles)
+        file_results = executor.map(_parse_files, batches)
+        results = list(bundle_results) + list(file_results)
+    for bills, invalid_count in results:
+        invalid += invalid_count
+        for bill in bills:
+            parsed += 1
+            current = by_number.get(bill['numeric_id'])
+            if current is not None and current != bill:
+                conflict_ids.add(format_bill_id(bill['numeric_id']))
+            if current is None or get_bill_timestamp(bill) >= get_bill_timestamp(current):
+                by_number[bill['numeric_id']] = bill
+
+    # Files of deleted bills can survive in archive bundles (or a missed delete)
+    deleted_ids = load_deleted_bill_ids(manifest_path)
+    deleted = 0
+    for number, bill in list(by_number.items()):
+        if str(bill['id']) in deleted_ids or format_bill_id(number) in deleted_ids:
+            del by_number[number]
+            deleted += 1
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        'bundles': len(bundles),
+        'files': len(files),
+        'parsed': parsed,
+        'invalid': invalid,
+        'duplicates': parsed - len(by_number) - deleted,
+        'deleted': deleted,
+        'conflicts': len(conflict_ids),
+        'conflict_ids': sorted(conflict_ids),
+        'bills': len(by_number),
+        'seconds': elapsed,
+        'bills_per_second': parsed / elapsed if elapsed > 0 else 0.0
+    }
+    return [by_number[number] for number in sorted(by_number)], stats
+
+
+def load_current_database(path=DATABASE_FILE):
+    """Get the current database contents, or an empty structure if it is missing or unreadable"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            return data
+    except (OSError, ValueError):
+        pass
+    return {'users': [], 'inventory': [], 'bills': [], 'staff': []}
+
+
+def rebuild_database(bills, path=DATABASE_FILE):
+    """Write database.json with the recovered bills and rollups; the old file is kept as a backup"""
+    data = load_current_database(path)
+    data['bills'] = bills
+    data['monthly_sales'] = build_monthly_sales(bills)
+    for key in ('users', 'inventory', 'staff'):
+        data.setdefault(key, [])
+
+    if os.path.exists(path):
+        shutil.copyfile(path, f"{path}.before-recovery-{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + '.tmp', path)
+    return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild database.json from the individual bill files")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--dry-run', action='store_true', help="parse and report only, write nothing")
+    args = parser.parse_args(argv)
+
+    print(f"Reading bills from {BILLS_JSON_DIR} and {ARCHIVED_BILLS_DIR} ...")
+    bills, stats = recover_bills(workers=args.workers)
+    print(f"Bundles: {stats['bundles']}  Files: {stats['files']}")
+    print(f"Bills parsed: {stats['parsed']}  Invalid: {stats['invalid']}  Duplicates: {stats['duplicates']}  "
+          f"Deleted: {stats['deleted']}  Conflicting copies: {stats['conflicts']}")
+    if stats['conflict_ids']:
+        print(f"⚠️  Bills with differing copies (latest kept): {', '.join(stats['conflict_ids'])}")
+    print(f"Recovered {stats['bills']} bills in {stats['seconds']:.1f}s ({stats['bills_per_second']:.0f} bills/s)")
+
+    if args.dry_run:
+        print("Dry run: database.json not changed")
+        return 0
+    if not bills:
+        print("No bills found: database.json not changed")
+        return 1
+    rebuild_database(bills)
+    print(f"Rebuilt {DATABASE_FILE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Scan input pipeline for the barcode entry
+Keystrokes are buffered by inter-key timing, complete barcodes are split off and queued,
+and queued scans are handed to the billing screen in one batch per Tk frame. Scanner bursts
+(10+ scans a second) are never merged, dropped or blocked by UI work. Pasted text goes through
+the same buffer, one scan per line.
+"""
+
+import re
+from collections import deque
+
+# Complete item barcode: DROP + 6 digits
+BARCODE_PATTERN = re.compile(r'DROP\d{6}')
+
+# Keys closer together than this are scanner input; a longer pause ends a scanner burst
+SCANNER_KEY_GAP_MS = 40
+
+# Shortest burst treated as a scan (a single fast key is just the start of typing)
+MIN_SCAN_LENGTH = 4
+
+SUBMIT_KEYS = ('Return', 'KP_Enter')
+# Also a submit key for scanners configured with a Tab suffix (opt-in: Tab normally moves focus)
+TAB_KEY = 'Tab'
+
+
+class ScanBuffer:
+    """
+    Buffers keystrokes for a barcode Entry and queues complete barcodes
+    on_scans is called with a list of barcode values, at most once per Tk frame
+    """
+
+    def __init__(self, entry, text_var, on_scans, key_gap_ms=SCANNER_KEY_GAP_MS, submit_on_tab=False):
+        self.entry = entry
+        self.text_var = text_var
+        self.on_scans = on_scans
+        self.key_gap_ms = key_gap_ms
+        self.submit_keys = SUBMIT_KEYS + (TAB_KEY,) if submit_on_tab else SUBMIT_KEYS
+        self._buffer = []
+        self._last_key_time = None
+        self._is_burst = False  # All keys in the buffer arrived at scanner speed
+        self._burst_timer = None
+        self._queue = deque()
+        self._drain_scheduled = False
+
+        entry.bind('<KeyPress>', self._on_key)
+        entry.bind('<<Paste>>', self._on_paste)
+
+    @property
+    def pending(self):
+        """Number of scans queued but not yet applied"""
+        return len(self._queue)
+
+    def submit(self):
+        """Queue the buffered text as a scan (Enter key or button)"""
+        value = ''.join(self._buffer).strip()
+        self._reset_buffer()
+        if value:
+            self._enqueue(value)
+
+    def feed(self, text):
+        """Add text to the buffer as if typed; complete barcodes and line breaks queue scans"""
+        self._is_burst = False
+        for char in text:
+            if char in '\r\n\t':
+                self.submit()
+                continue
+            if not char.isprintable():
+                continue
+            self._buffer.append(char.upper())
+            value = ''.join(self._buffer)
+            if BARCODE_PATTERN.fullmatch(value):
+                self._reset_buffer()
+                self._enqueue(value)
+        self._show_buffer()
+
+    def clear(self):
+        """Discard buffered keystrokes"""
+        self._reset_buffer()
+
+    def _on_key(self, event):
+        if event.keysym in self.submit_keys:
+            self.submit()
+            return 'break'
+        if event.keysym == 'Escape':
+            self._reset_buffer()
+            return 'break'
+        if event.keysym == 'BackSpace':
+            if self._buffer:
+                self._buffer.pop()
+                self._is_burst = False  # Edited by hand
+                self._show_buffer()
+            return 'break'
+        if not event.char or not event.char.isprintable():
+            return None  # Navigation and modifier keys keep their default behaviour
+
+        now = event.time
+        fast = self._last_key_time is not None and 0 <= now - self._last_key_time <= self.key_gap_ms
+        self._last_key_time = now
+        if self._buffer and not fast and self._is_burst:
+            # A pause ended the previous scanner burst before this key arrived
+            self._end_burst()
+
+        self._is_burst = fast or not self._buffer
+        self._buffer.append(event.char.upper())
+
+        # Split off a complete barcode as soon as it is in the buffer
+        value = ''.join(self._buffer)
+        if BARCODE_PATTERN.fullmatch(value):
+            self._reset_buffer()
+            self._enqueue(value)
+            return 'break'
+
+        self._show_buffer()
+        if self._is_burst:
+            # Scanners without an Enter suffix: end the burst once keys stop arriving
+            if self._burst_timer:
+                self.entry.after_cancel(self._burst_timer)
+            self._burst_timer = self.entry.after(self.key_gap_ms * 2, self._on_burst_timeout)
+        return 'break'
+
+    def _on_paste(self, event=None):
+        try:
+            text = self.entry.clipboard_get()
+        except Exception:
+            return 'break'  # Empty clipboard or not text
+        self.feed(text)
+        return 'break'
+
+    def _on_burst_timeout(self):
+        self._burst_timer = None
+        if self._is_burst:
+            self._end_burst()
+
+    def _end_burst(self):
+        """Queue a scanner burst; short bursts are left in the entry as typed text"""
+        if len(self._buffer) >= MIN_SCAN_LENGTH:
+            self.submit()
+        else:
+            self._is_burst = False
+
+    def _reset_buffer(self):
+        self._buffer = []
+        self._is_burst = False
+        if self._burst_timer:
+            self.entry.after_cancel(self._burst_timer)
+            self._burst_timer = None
+        self._show_buffer()
+
+    def _show_buffer(self):
+        self.text_var.set(''.join(self._buffer))
+        self.entry.icursor('end')
+
+    def _enqueue(self, value):
+        self._queue.append(value)
+        if not self._drain_scheduled:
+            self._drain_scheduled = True
+            self.entry.after_idle(self._drain)
+
+    def _drain(self):
+        """Apply all queued scans in one batch"""
+        self._drain_scheduled = False
+        batch = list(self._queue)
+        self._queue.clear()
+        if batch:
+            self.on_scans(batch)
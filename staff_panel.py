@@ -5,8 +5,9 @@ Features: Create bills, View billing history, View inventory
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-from datetime import datetime
 from database import db
+from bill_dates import get_bill_timestamp, format_bill_date
+from tree_sync import sync_treeview
 from billing_module import BillingModule
 
 class StaffPanel:
@@ -158,6 +159,15 @@ class StaffPanel:
             pady=8
         ).pack(side=tk.LEFT, padx=5)
         
+        self.print_status_label = tk.Label(
+            bottom_frame,
+            text="",
+            font=('Arial', 9),
+            bg=self.theme_manager.get_color('bg'),
+            fg=self.theme_manager.get_color('fg')
+        )
+        self.print_status_label.pack(side=tk.LEFT, padx=10)
+        
         self._refresh_history()
     
     def _create_inventory_tab(self):
@@ -214,36 +224,28 @@ class StaffPanel:
         self._refresh_inventory()
     
     def _refresh_history(self):
-        """Refresh billing history"""
-        for item in self.history_tree.get_children():
-            self.history_tree.delete(item)
-        
+        """Refresh billing history (only changed rows are updated)"""
         bills = db.get_bills_by_user(self.user['id'])
-        bills.sort(key=lambda x: x['date'], reverse=True)
+        bills.sort(key=get_bill_timestamp, reverse=True)
         
-        for bill in bills:
-            date_str = datetime.fromisoformat(bill['date']).strftime("%Y-%m-%d %H:%M")
-            self.history_tree.insert('', 'end', values=(
+        sync_treeview(self.history_tree, [
+            (bill['id'], (
                 bill['id'],
-                date_str,
+                format_bill_date(bill),
                 len(bill['items']),
                 f"₹{bill['total']:.2f}",
                 bill['payment_method']
             ))
+            for bill in bills
+        ])
     
     def _refresh_inventory(self):
-        """Refresh inventory list"""
-        for item in self.inventory_tree.get_children():
-            self.inventory_tree.delete(item)
-        
+        """Refresh inventory list (only changed rows are updated)"""
         inventory = db.get_all_inventory()
-        for item in inventory:
-            self.inventory_tree.insert('', 'end', values=(
-                item['id'],
-                item['name'],
-                item['category'],
-                f"₹{item['price']:.2f}"
-            ))
+        sync_treeview(self.inventory_tree, [
+            (item['id'], (item['id'], item['name'], item['category'], f"₹{item['price']:.2f}"))
+            for item in inventory
+        ])
     
     def _view_bill_details(self):
         """View details of selected bill"""
@@ -252,7 +254,7 @@ class StaffPanel:
             messagebox.showwarning("Warning", "Please select a bill to view")
             return
         
-        bill_id = int(self.history_tree.item(selection[0])['values'][0])
+        bill_id = self._get_bill_id(selection[0])
         bill = db.get_bill(bill_id)
         
         if not bill:
@@ -268,7 +270,7 @@ class StaffPanel:
         
         tk.Label(main_frame, text=f"Bill #{bill_id}", font=('Arial', 18, 'bold'), bg=self.theme_manager.get_color('bg'), fg=self.theme_manager.get_color('fg')).pack(pady=10)
         
-        date_str = datetime.fromisoformat(bill['date']).strftime("%Y-%m-%d %H:%M:%S")
+        date_str = format_bill_date(bill, seconds=True)
         info_text = f"Date: {date_str}\nPayment: {bill['payment_method']}"
         tk.Label(main_frame, text=info_text, bg=self.theme_manager.get_color('bg'), fg=self.theme_manager.get_color('fg'), justify=tk.LEFT).pack(pady=10)
         
@@ -295,20 +297,21 @@ class StaffPanel:
             messagebox.showwarning("Warning", "Please select a bill to print")
             return
         
-        bill_id = int(self.history_tree.item(selection[0])['values'][0])
-        bill = db.get_bill(bill_id)
+        bill_id = self._get_bill_id(selection[0])
         
-        if not bill:
+        from receipt_generator import reprint_receipt
+        if reprint_receipt(bill_id) is None:
             return
-        
-        from receipt_generator import generate_receipt
-        receipt_path = generate_receipt(bill, db.get_user(bill['user_id']))
-        messagebox.showinfo("Success", f"Receipt generated successfully!\nSaved to: {receipt_path}")
+        self.print_status_label.config(text=f"Receipt #{bill_id} queued for printing")
+    
+    @staticmethod
+    def _get_bill_id(row_id):
+        """Bill ID of a history row (row IDs are bill IDs as text; old bills have numeric IDs)"""
+        return int(row_id) if row_id.isdigit() else row_id
     
     def _on_bill_created(self):
-        """Callback when a new bill is created"""
+        """Callback when a new bill is saved (the billing screen shows the save status)"""
         self._refresh_history()
-        messagebox.showinfo("Success", "Bill created successfully!")
     
     def _toggle_theme(self):
         """Toggle theme"""
@@ -318,12 +321,26 @@ class StaffPanel:
     def _logout(self):
         """Logout and return to login screen"""
         if messagebox.askyesno("Logout", "Are you sure you want to logout?"):
+            if not self._wait_for_pending_bills():
+                return
             self.root.destroy()
             self.login_root.deiconify()
     
     def _on_closing(self):
         """Handle window closing"""
         if messagebox.askyesno("Exit", "Are you sure you want to exit?"):
+            if not self._wait_for_pending_bills():
+                return
             self.root.destroy()
             self.login_root.destroy()
+    
+    def _wait_for_pending_bills(self):
+        """Wait for bills still being saved; returns False if the user chose to keep waiting"""
+        if self.billing_module.wait_for_pending_bills():
+            return True
+        return messagebox.askyesno(
+            "Bills Not Saved",
+            "Some bills are still being saved. Close anyway?\n"
+            "They are kept on disk and saved the next time the app starts."
+        )
 
@@ -0,0 +1,166 @@
+"""
+Tests for the in-memory indexes, the LRU cache and bill recovery
+Run from the project folder: python -m pytest -q
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bill_index import BillIdIndex
+from cache_util import LRUCache
+from item_search import ItemSearchIndex
+import recovery
+
+
+def _bill(numeric_id, total=10.0, timestamp=1000):
+    return {'id': f"DR{numeric_id:04d}", 'user_id': 1, 'items': [], 'total': total, 'timestamp': timestamp}
+
+
+class BillIdIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = BillIdIndex([_bill(n) for n in (1, 99, 100, 150, 200, 201, 1000, 12000)])
+
+    def _ids(self, query):
+        return [bill['id'] for bill in self.index.search(query)]
+
+    def test_prefix_stays_within_the_prefix(self):
+        self.assertEqual(self._ids('DR02'), ['DR0200', 'DR0201'])
+        self.assertEqual(self._ids('DR1'), ['DR1000', 'DR12000'])
+
+    def test_prefix_upper_bound_includes_the_last_ids(self):
+        # The '\uffff' upper bound must not cut off the highest IDs under a prefix
+        index = BillIdIndex([_bill(n) for n in (9998, 9999, 99999)])
+        self.assertEqual([bill['id'] for bill in index.search('DR9999')], ['DR9999', 'DR99999'])
+
+    def test_numeric_query_puts_the_exact_match_first(self):
+        self.assertEqual(self._ids('100'), ['DR0100', 'DR1000'])
+        self.assertEqual(self._ids('1')[0], 'DR0001')
+
+    def test_range_bounds_are_inclusive(self):
+        self.assertEqual(self._ids('DR0100-DR0200'), ['DR0100', 'DR0150', 'DR0200'])
+        self.assertEqual(self._ids('200-100'), ['DR0100', 'DR0150', 'DR0200'])
+        self.assertEqual(self._ids('101-149'), [])
+
+    def test_add_and_remove_keep_lookups_in_sync(self):
+        self.index.add(_bill(120))
+        self.assertEqual(self._ids('DR0100-DR0150'), ['DR0100', 'DR0120', 'DR0150'])
+        self.assertTrue(self.index.remove('DR0120'))
+        self.assertIsNone(self.index.get('DR0120'))
+        self.assertEqual(self._ids('DR012'), [])
+        self.assertEqual(self.index.max_numeric_id(), 12000)
+
+
+class ItemSearchIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = ItemSearchIndex([
+            {'id': 1, 'name': 'Cola', 'category': 'Drinks'},
+            {'id': 2, 'name': 'Coca Cola Zero', 'category': 'Drinks'},
+            {'id': 3, 'name': 'Chocolate', 'category': 'Snacks'},
+            {'id': 4, 'name': 'Shirt', 'category': 'Cola Merch'},
+        ])
+
+    def test_name_prefix_ranks_above_category_and_substring(self):
+        self.assertEqual(self.index.search('cola'), [1, 2, 4, 3])
+
+    def test_trigram_substring_match(self):
+        # Substring-only matches all score the same; shorter names first
+        self.assertEqual(self.index.search('ola'), [1, 4, 3, 2])
+        self.assertEqual(self.index.search('hoc'), [3])
+
+    def test_short_tokens_match_prefixes_only(self):
+        self.assertEqual(self.index.search('ol'), [])
+
+    def test_every_query_word_must_match(self):
+        self.assertEqual(self.index.search('cola zero'), [2])
+        self.assertEqual(self.index.search('cola shirt'), [4])
+
+    def test_rebuild_clears_cached_results(self):
+        self.assertEqual(self.index.search('cola'), [1, 2, 4, 3])
+        self.index.rebuild([{'id': 5, 'name': 'Cola Light', 'category': 'Drinks'}])
+        self.assertEqual(self.index.search('cola'), [5])
+
+
+class LRUCacheTest(unittest.TestCase):
+
+    def test_evicts_the_least_recently_used_entry(self):
+        cache = LRUCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)  # 'b' is now the least recently used
+        cache.put('c', 3)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(len(cache), 2)
+
+    def test_put_refreshes_an_existing_key(self):
+        cache = LRUCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.put('a', 10)
+        cache.put('c', 3)
+        self.assertEqual(cache.get('a'), 10)
+        self.assertIsNone(cache.get('b'))
+
+
+class RecoveryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.bills_dir = os.path.join(self.folder, 'bills_json')
+        self.manifest_path = os.path.join(self.folder, 'bills_json_manifest.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def _write_bill(self, name, bill):
+        path = os.path.join(self.bills_dir, *name.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(bill, f)
+
+    def _recover(self):
+        return recovery.recover_bills(
+            self.bills_dir, os.path.join(self.folder, 'archive'), workers=1, manifest_path=self.manifest_path
+        )
+
+    def test_latest_copy_wins_and_conflicts_are_reported(self):
+        self._write_bill('2026/01/DR0001.json', _bill(1, total=20.0, timestamp=2000))
+        self._write_bill('DR0001.json', _bill(1, total=10.0, timestamp=1000))  # Legacy flat copy
+        self._write_bill('2026/01/DR0002.json', _bill(2))
+        self._write_bill('DR0002.json', _bill(2))
+        bills, stats = self._recover()
+        self.assertEqual([(bill['id'], bill['total']) for bill in bills], [('DR0001', 20.0), ('DR0002', 10.0)])
+        self.assertEqual(stats['duplicates'], 2)
+        self.assertEqual(stats['conflict_ids'], ['DR0001'])
+
+    def test_deleted_bills_are_dropped(self):
+        self._write_bill('2026/01/DR0001.json', _bill(1))
+        self._write_bill('2026/01/DR0002.json', _bill(2))
+        self._write_bill('2026/01/DR0003.json', _bill(3))
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            for record in ({'id': 'DR0002', 'deleted': True}, {'id': 'DR0003', 'deleted': True},
+                           {'id': 'DR0003', 'file': '2026/01/DR0003.json'}):
+                f.write(json.dumps(record) + "\n")
+        bills, stats = self._recover()
+        self.assertEqual([bill['id'] for bill in bills], ['DR0001', 'DR0003'])
+        self.assertEqual(stats['deleted'], 1)
+
+    def test_invalid_files_are_counted(self):
+        self._write_bill('2026/01/DR0001.json', _bill(1))
+        self._write_bill('2026/01/DR0002.json', {'id': 'DR0002'})
+        bills, stats = self._recover()
+        self.assertEqual([bill['id'] for bill in bills], ['DR0001'])
+        self.assertEqual(stats['invalid'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Diff-based Treeview refresh
+Rows are keyed by stable IDs so a refresh only inserts, updates, moves or deletes the rows that changed
+"""
+
+import weakref
+
+# Last values written per Treeview row, so unchanged rows are never touched
+_row_values = weakref.WeakKeyDictionary()
+
+
+def sync_treeview(tree, rows):
+    """
+    Reconcile a Treeview with rows, given in display order as (row_id, values) pairs
+    Row IDs become the Treeview item IDs; values is a tuple of column values. If a row ID is
+    given more than once, only its last row is shown
+    Returns the number of rows inserted, updated, moved or deleted
+    """
+    last_rows = {}
+    for row_id, values in reversed(list(rows)):
+        last_rows.setdefault(str(row_id), values)
+    rows = list(last_rows.items())[::-1]
+    known_values = _row_values.setdefault(tree, {})
+    current = tree.get_children()
+    new_ids = {row_id for row_id, _ in rows}
+    touched = 0
+
+    # Delete rows that are gone
+    removed = [row_id for row_id in current if row_id not in new_ids]
+    if removed:
+        tree.delete(*removed)
+        touched += len(removed)
+        removed_set = set(removed)
+        current = [row_id for row_id in current if row_id not in removed_set]
+
+    existing = set(current)
+    for row_id in list(known_values):
+        if row_id not in existing:
+            del known_values[row_id]
+
+    # Walk the new rows in order; current[position] is the next row already in place
+    position = 0
+    moved = set()
+    for index, (row_id, values) in enumerate(rows):
+        values = tuple(values)
+        while position < len(current) and current[position] in moved:
+            position += 1
+
+        if position < len(current) and current[position] == row_id:
+            position += 1
+        elif row_id in existing:
+            tree.move(row_id, '', index)
+            moved.add(row_id)
+            touched += 1
+        else:
+            tree.insert('', index, iid=row_id, values=values)
+            existing.add(row_id)
+            known_values[row_id] = values
+            touched += 1
+            continue
+
+        if known_values.get(row_id) != values:
+            tree.item(row_id, values=values)
+            known_values[row_id] = values
+            touched += 1
+
+    return touched